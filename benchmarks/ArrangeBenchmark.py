@@ -0,0 +1,87 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy
+
+##  Create random convex parts, with a hull and a head hull each.
+#
+#   The hulls are regular polygons with a random size and number of sides. In one at a time
+#   mode, the head hulls are the hulls grown by the area the print head covers, which extends
+#   further to one side, like a print head with its fan on one side. Otherwise the head hulls
+#   are the hulls, like ConvexHullDecorator.getConvexHullHead returns when no head hull is set.
+#
+#   \param count The number of parts.
+#   \param one_at_a_time Whether the parts are printed one at a time.
+#   \param min_size The minimum diameter of a part, in mm.
+#   \param max_size The maximum diameter of a part, in mm.
+#   \param seed The seed of the random generator.
+#   \return A list of (hull, head hull) tuples, as numpy arrays of (x, z) points.
+def createParts(count, one_at_a_time = False, min_size = 10.0, max_size = 40.0, seed = 0):
+    from cura import ConvexHullJob
+
+    random = numpy.random.RandomState(seed)
+    head = numpy.array([[-20, -10], [10, -10], [10, 10], [-20, 10]], dtype = numpy.float64)
+
+    parts = []
+    for i in range(count):
+        sides = random.randint(3, 13)
+        angles = random.uniform(0, 2 * numpy.pi) + numpy.arange(sides) * (2 * numpy.pi / sides)
+        radius = random.uniform(min_size, max_size) / 2
+        hull = numpy.stack((numpy.cos(angles), numpy.sin(angles)), axis = 1) * radius + random.uniform(-50, 50, 2)
+        parts.append((hull, ConvexHullJob.getMinkowskiHulls(hull, [head])[0] if one_at_a_time else hull))
+    return parts
+
+##  Place random parts on a build plate with a disallowed area and report the placements per second.
+#
+#   Like CuraApplication.arrangeAll, the parts are placed largest first. The placed parts are
+#   checked so that no head hull overlaps the hull of another part or the disallowed area.
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark arranging parts on the build plate.")
+    parser.add_argument("--parts", type = int, default = 60, help = "Number of parts to place.")
+    parser.add_argument("--width", type = float, default = 230.0, help = "Width of the build plate, in mm.")
+    parser.add_argument("--depth", type = float, default = 210.0, help = "Depth of the build plate, in mm.")
+    parser.add_argument("--cell-size", type = float, default = 2.0, help = "Size of the grid cells, in mm.")
+    parser.add_argument("--one-at-a-time", action = "store_true", help = "Give the parts head hulls, like when printing one at a time.")
+    args = parser.parse_args()
+
+    # Make Cura importable when this is run as a script.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from cura import Arrange
+    from cura import PolygonIntersection
+
+    minimum = numpy.array([-args.width / 2, -args.depth / 2])
+    maximum = numpy.array([args.width / 2, args.depth / 2])
+    disallowed_area = numpy.array([[minimum[0], maximum[1] - 10], [maximum[0], maximum[1] - 10], [maximum[0], maximum[1]], [minimum[0], maximum[1]]])
+
+    parts = createParts(args.parts, args.one_at_a_time)
+    parts.sort(key = lambda part: -numpy.prod(part[1].max(axis = 0) - part[1].min(axis = 0)))
+
+    start_time = time.time()
+    arrange = Arrange.Arrange(minimum, maximum, args.cell_size)
+    arrange.occupy(disallowed_area)
+    placed = []
+    for hull, head in parts:
+        offset = arrange.place(hull, head)
+        if offset is not None:
+            placed.append((hull + offset, head + offset))
+    place_time = time.time() - start_time
+
+    print("Placed %d of %d parts in %.3f s: %.0f placements per second." % (len(placed), len(parts), place_time, len(parts) / place_time))
+    if len(placed) < len(parts):
+        print("Parts that do not fit count as placements, since a position was searched for them as well.")
+
+    hulls = [hull for hull, head in placed] + [disallowed_area]
+    heads = [head for hull, head in placed]
+    hits = PolygonIntersection.getIntersectionMatrix(heads, hulls)
+    hits[numpy.arange(len(placed)), numpy.arange(len(placed))] = False
+    outside = [hull for hull in hulls[:-1] if (hull < minimum).any() or (hull > maximum).any()]
+    print("%d head hulls overlap another hull or the disallowed area, %d hulls are outside the build plate." % (hits.any(axis = 1).sum(), len(outside)))
+    return 1 if hits.any() or outside else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+##  Measure the memory that is allocated while creating the lines of a g-code, and the time it takes.
+#
+#   \param create A function that creates the lines.
+#   \return A tuple of the lines, the allocated memory and the peak of the allocated memory in bytes, and the time in seconds.
+def _measure(create):
+    tracemalloc.start()
+    try:
+        start_time = time.time()
+        lines = create()
+        create_time = time.time() - start_time
+        size, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return lines, size, peak, create_time
+
+##  Time accessing random lines, like resends do.
+#
+#   \return The time per line in seconds.
+def _timeRandomAccess(lines, count = 100000):
+    indices = random.Random(0).sample(range(len(lines)), min(count, len(lines)))
+    start_time = time.time()
+    for index in indices:
+        lines[index]
+    return (time.time() - start_time) / len(indices)
+
+##  Report the memory that the lines of a synthetic g-code take while printing.
+#
+#   The lines are created like the printer connection did before GCodeLines, by splitting every
+#   layer into a list of strings, and with GCodeLines from the layers and from a g-code file.
+#   The layers themselves are not counted, since the scene keeps them anyway.
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark the memory of the g-code lines of a print.")
+    parser.add_argument("--lines", type = int, default = 5000000, help = "Number of lines of the g-code.")
+    args = parser.parse_args()
+
+    # GCodeLines only needs numpy, so it is imported without the plug-in, which needs Qt and Uranium.
+    benchmarks_path = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.join(os.path.dirname(benchmarks_path), "plugins", "USBPrinting"))
+    sys.path.insert(0, benchmarks_path)
+    from GCodeLines import GCodeLines
+    from PrintBenchmark import createGCode
+
+    gcode_list = createGCode(args.lines)
+    print("%d lines in %d layers of %d MB in total." % (args.lines, len(gcode_list), sum(len(layer) for layer in gcode_list) // (1024 * 1024)))
+
+    def splitLayers():
+        lines = ["M110"]
+        for layer in gcode_list:
+            lines.extend(layer.split("\n"))
+        return lines
+
+    lines, size, peak, create_time = _measure(splitLayers)
+    print("List of strings: %d MB, created in %.2f s, %.2f us per random line." % (size // (1024 * 1024), create_time, 1000000 * _timeRandomAccess(lines)))
+    line_count = len(lines)
+    del lines
+
+    lines, size, peak, create_time = _measure(lambda: GCodeLines(["M110"] + gcode_list))
+    print("GCodeLines from layers: %d MB, peak %d MB, created in %.2f s, %.2f us per random line." % (size // (1024 * 1024), peak // (1024 * 1024), create_time, 1000000 * _timeRandomAccess(lines)))
+    if len(lines) != line_count:
+        print("GCodeLines has %d lines instead of %d." % (len(lines), line_count))
+        return 1
+    del lines
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, "benchmark.gcode")
+        with open(file_name, "w") as f:
+            f.writelines(gcode_list)
+
+        lines, size, peak, create_time = _measure(lambda: GCodeLines.fromFile(file_name, ["M110"]))
+        try:
+            print("GCodeLines from file: %d MB, peak %d MB, created in %.2f s, %.2f us per random line." % (size // (1024 * 1024), peak // (1024 * 1024), create_time, 1000000 * _timeRandomAccess(lines)))
+            # The file does not have the empty line at the end of every layer, only the one at the end of the file.
+            if len(lines) != line_count - len(gcode_list) + 1:
+                print("GCodeLines has %d lines instead of %d." % (len(lines), line_count - len(gcode_list) + 1))
+                return 1
+        finally:
+            lines.close()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
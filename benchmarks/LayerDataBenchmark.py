@@ -0,0 +1,161 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy
+
+##  Create layer data for a synthetic slice, with polygons of random types and sizes.
+#
+#   \param layer_data_module The module with the LayerData class to use.
+#   \param point_count The number of points of the slice.
+#   \param polygons_per_layer The number of polygons in every layer.
+#   \param max_polygon_points The maximum number of points of a polygon.
+#   \param seed The seed of the random generator, so every module gets the same slice.
+def createLayerData(layer_data_module, point_count, polygons_per_layer = 500, max_polygon_points = 60, seed = 0):
+    random = numpy.random.RandomState(seed)
+    layer_data = layer_data_module.LayerData()
+
+    layer = 0
+    added = 0
+    while added < point_count:
+        for i in range(polygons_per_layer):
+            count = min(int(random.randint(2, max_polygon_points + 1)), max(2, point_count - added))
+            points = random.random_sample((count, 3)).astype(numpy.float32) * 200
+            points[:, 1] = layer * 0.1
+            layer_data.addPolygon(layer, int(random.randint(0, 10)), points, 400)
+            added += count
+            if added >= point_count:
+                break
+        layer += 1
+
+    return layer_data
+
+##  Load a LayerData module from a file, for example a LayerData.py of another revision.
+def _loadLayerDataModule(path):
+    spec = importlib.util.spec_from_file_location("LayerDataBenchmark_compare", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+##  Time building the mesh data of a synthetic slice.
+#
+#   \return A tuple of the time in seconds and the built layer data.
+def _benchmarkBuild(layer_data_module, point_count, max_polygon_points):
+    layer_data = createLayerData(layer_data_module, point_count, max_polygon_points = max_polygon_points)
+    start_time = time.time()
+    layer_data.build()
+    return time.time() - start_time, layer_data
+
+##  Time creating the meshes of a number of layers, like the layer view does when the current layer changes.
+#
+#   \return A tuple of the time in seconds, the number of segments and a list of the created meshes.
+def _benchmarkLayerMeshes(layer_data_module, point_count, max_polygon_points, layer_count):
+    layer_data = createLayerData(layer_data_module, point_count, max_polygon_points = max_polygon_points)
+    layers = [layer_data.getLayer(layer) for layer in sorted(layer_data.getLayers())[:layer_count]]
+    segment_count = sum(len(polygon.data) - 1 for layer in layers for polygon in layer.polygons)
+
+    meshes = []
+    start_time = time.time()
+    for layer in layers:
+        meshes.append(layer.createMesh())
+        meshes.append(layer.createJumps())
+    return time.time() - start_time, segment_count, meshes
+
+##  Measure the memory that the layer data of a synthetic slice takes before it is built.
+#
+#   \return The number of bytes that is allocated for the layer data.
+def _benchmarkMemory(layer_data_module, point_count, max_polygon_points):
+    tracemalloc.start()
+    try:
+        layer_data = createLayerData(layer_data_module, point_count, max_polygon_points = max_polygon_points)
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+##  Build the layer data of a synthetic slice and report the time it takes.
+#
+#   With --compare, the same slice is built with the LayerData.py of another revision as well,
+#   and the output of both is checked to be identical.
+def _runBuild(LayerData, args):
+    build_time, layer_data = _benchmarkBuild(LayerData, args.points, args.max_polygon_points)
+    element_count = sum(layer_data.getElementCounts().values())
+    print("Built %d points in %d layers in %.3f s: %.0f points/s." % (args.points, len(layer_data.getLayers()), build_time, args.points / build_time))
+
+    if args.compare:
+        compare_time, compare_data = _benchmarkBuild(_loadLayerDataModule(args.compare), args.points, args.max_polygon_points)
+        print("Built the same points with %s in %.3f s: %.1f times slower." % (args.compare, compare_time, compare_time / build_time))
+
+        # Vertices that are not used by any element are not part of the output.
+        vertex_count = element_count // 2
+        identical = layer_data.getElementCounts() == compare_data.getElementCounts()
+        identical = identical and numpy.array_equal(layer_data.getVertices()[:vertex_count], compare_data.getVertices()[:vertex_count])
+        identical = identical and numpy.array_equal(layer_data.getColors()[:vertex_count], compare_data.getColors()[:vertex_count])
+        identical = identical and numpy.array_equal(layer_data.getIndices()[:element_count], compare_data.getIndices()[:element_count])
+        print("Output is %s." % ("identical" if identical else "different"))
+        if not identical:
+            return 1
+
+    return 0
+
+##  Create the meshes of the bottom layers of a synthetic slice and report the time it takes.
+#
+#   With --compare, the meshes are created with the LayerData.py of another revision as well,
+#   and the meshes of both are checked to be the same.
+def _runLayerMeshes(LayerData, args):
+    mesh_time, segment_count, meshes = _benchmarkLayerMeshes(LayerData, args.points, args.max_polygon_points, args.layers)
+    print("Created the meshes of %d layers with %d segments in %.3f s: %.0f segments/s." % (args.layers, segment_count, mesh_time, segment_count / mesh_time))
+
+    if args.compare:
+        compare_time, segment_count, compare_meshes = _benchmarkLayerMeshes(_loadLayerDataModule(args.compare), args.points, args.max_polygon_points, args.layers)
+        print("Created the same meshes with %s in %.3f s: %.1f times slower." % (args.compare, compare_time, compare_time / mesh_time))
+
+        identical = True
+        for mesh, compare_mesh in zip(meshes, compare_meshes):
+            identical = identical and numpy.allclose(mesh.getVertices(), compare_mesh.getVertices(), atol = 1e-5, equal_nan = True)
+            identical = identical and numpy.array_equal(mesh.getColors(), compare_mesh.getColors())
+        print("Meshes are %s." % ("the same" if identical else "different"))
+        if not identical:
+            return 1
+
+    return 0
+
+##  Report the memory per point that the layer data of a synthetic slice takes.
+#
+#   With --compare, the memory of the LayerData.py of another revision is reported as well.
+def _runMemory(LayerData, args):
+    size = _benchmarkMemory(LayerData, args.points, args.max_polygon_points)
+    print("Layer data of %d points takes %d bytes: %.1f bytes per point." % (args.points, size, size / args.points))
+
+    if args.compare:
+        compare_size = _benchmarkMemory(_loadLayerDataModule(args.compare), args.points, args.max_polygon_points)
+        print("Layer data of %s takes %d bytes: %.1f bytes per point." % (args.compare, compare_size, compare_size / args.points))
+
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark layer data.")
+    parser.add_argument("benchmark", nargs = "?", choices = ["build", "layer_meshes", "memory"], default = "build", help = "Build the mesh data of all layers, create the meshes of single layers like the layer view does, or measure the memory of the layer data.")
+    parser.add_argument("--points", type = int, default = 10000000, help = "Number of points of the synthetic slice.")
+    parser.add_argument("--max-polygon-points", type = int, default = 60, help = "Maximum number of points of a polygon.")
+    parser.add_argument("--layers", type = int, default = 5, help = "Number of layers to create meshes of.")
+    parser.add_argument("--compare", help = "Path of a LayerData.py to compare with, for example from another revision.")
+    args = parser.parse_args()
+
+    # Make Cura importable when this is run as a script.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from cura import LayerData
+
+    if args.benchmark == "layer_meshes":
+        return _runLayerMeshes(LayerData, args)
+    if args.benchmark == "memory":
+        return _runMemory(LayerData, args)
+    return _runBuild(LayerData, args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy
+
+##  Create the footprints of objects that are placed in rows on the build plate.
+#
+#   Every object has a square boundary and a head hull that extends far to the left and a
+#   little to the right, like a print head with its fan on one side. Objects are spaced so
+#   that their boundary is hit by the head hulls of the objects to their right, so they
+#   need to be printed from left to right within a row.
+#
+#   \param count The number of objects.
+#   \param seed The seed of the random generator for the jitter of the positions.
+#   \return A tuple of a list of boundaries and a list of head hulls, as numpy arrays of points.
+def createFootprints(count, seed = 0):
+    random = numpy.random.RandomState(seed)
+    columns = int(numpy.ceil(numpy.sqrt(count)))
+
+    boundary = numpy.array([[-10, -10], [10, -10], [10, 10], [-10, 10]], dtype = numpy.float64)
+    head = numpy.array([[-50, -15], [15, -15], [15, 15], [-50, 15]], dtype = numpy.float64)
+
+    boundaries = []
+    heads = []
+    for index in range(count):
+        position = numpy.array([index % columns * 30, index // columns * 40], dtype = numpy.float64) + random.uniform(-2, 2, 2)
+        boundaries.append(boundary + position)
+        heads.append(head + position)
+    return boundaries, heads
+
+##  Check that no object in an order hits an object that is printed before it.
+def _isValidOrder(hit_map, order):
+    if order is None or sorted(order) != list(range(len(hit_map))):
+        return False
+    order = numpy.array(order)
+    # hit_map[a][b] means a needs to be printed before b, so it should not hold for any b before a.
+    ordered = hit_map[numpy.ix_(order, order)]
+    return not numpy.tril(ordered, -1).any()
+
+##  Compute the hit map and the print order of synthetic footprints and report the time it takes.
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark ordering objects for printing one at a time.")
+    parser.add_argument("--counts", type = int, nargs = "+", default = [10, 50, 200], help = "Numbers of objects to order.")
+    parser.add_argument("--repeat", type = int, default = 10, help = "Number of times every count is timed.")
+    args = parser.parse_args()
+
+    # Make Cura importable when this is run as a script.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from cura import PolygonIntersection
+    from cura.OneAtATimeIterator import OneAtATimeIterator
+
+    iterator = OneAtATimeIterator(None)
+    for count in args.counts:
+        boundaries, heads = createFootprints(count)
+
+        hit_map_time = 0.0
+        order_time = 0.0
+        for i in range(args.repeat):
+            start_time = time.time()
+            hit_map = PolygonIntersection.getIntersectionMatrix(boundaries, heads)
+            numpy.fill_diagonal(hit_map, False)
+            hit_map_time += time.time() - start_time
+
+            start_time = time.time()
+            order = iterator._findOrder(hit_map)
+            order_time += time.time() - start_time
+
+        print("%d objects with %d hits: hit map in %.3f ms, order in %.3f ms, order is %s." % (count, hit_map.sum(), 1000 * hit_map_time / args.repeat, 1000 * order_time / args.repeat, "valid" if _isValidOrder(hit_map, order) else "invalid"))
+        if not _isValidOrder(hit_map, order):
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import os
+import queue
+import sys
+import time
+
+##  Create a g-code with many short moves, split into layers like the g-code from the engine.
+def createGCode(move_count, moves_per_layer = 1000):
+    gcode_list = []
+    for first in range(0, move_count, moves_per_layer):
+        layer = [";LAYER:%d" % (first // moves_per_layer)]
+        for i in range(first, min(first + moves_per_layer, move_count)):
+            layer.append("G1 X%.3f Y%.3f E%.5f" % (100 + (i % 200) * 0.1, 100 + (i % 97) * 0.1, i * 0.002))
+        gcode_list.append("\n".join(layer) + "\n")
+    return gcode_list
+
+##  Create the application that the printer connection runs in.
+#
+#   The application is a plain Uranium application without a user interface. Signals that are
+#   emitted from other threads than the main thread are queued by it, and the slots are called
+#   when the main thread processes the events, like the Qt application of Cura does.
+def _createApplication():
+    from UM.Application import Application
+
+    class BenchmarkApplication(Application):
+        def __init__(self):
+            self._events = queue.Queue()
+            super().__init__(name = "cura", version = "master")
+
+        def addCommandLineOptions(self, parser):
+            super().addCommandLineOptions(parser)
+            parser.description = "Benchmark printing over USB against a simulated Marlin printer."
+            parser.add_argument("--moves", type = int, default = 20000, help = "Number of moves to print.")
+            parser.add_argument("--send-window", type = int, default = 1, help = "Number of lines sent ahead of the acknowledgements.")
+            parser.add_argument("--rx-buffer-size", type = int, default = 128, help = "Size of the receive buffer of the printer.")
+            parser.add_argument("--planner-buffer-size", type = int, default = 16)
+            parser.add_argument("--move-time", type = float, default = 0.0002, help = "Time every move takes, in seconds.")
+            parser.add_argument("--error-rate", type = float, default = 0.0, help = "Chance that a line is corrupted.")
+            parser.add_argument("--latency", type = float, default = 0.002, help = "Delay of the responses of the printer, in seconds.")
+            parser.add_argument("--temperature", type = int, default = 200, help = "Temperature that the print waits for with M109.")
+            parser.add_argument("--bed-temperature", type = int, default = 60, help = "Temperature of the bed that the print waits for with M190.")
+            parser.add_argument("--heat-rate", type = float, default = 30.0, help = "Speed at which the printer heats up, in degrees per second.")
+            parser.add_argument("--wait-report-interval", type = float, default = 1.0, help = "Time between temperature reports while heating up, in seconds, or 0 to not report.")
+
+        def functionEvent(self, event):
+            self._events.put(event)
+
+        ##  Call the slots of the queued signals, waiting at most a certain time for them.
+        def processEvents(self, timeout):
+            try:
+                event = self._events.get(timeout = timeout)
+                while True:
+                    event.call()
+                    event = self._events.get_nowait()
+            except queue.Empty:
+                pass
+
+    return BenchmarkApplication()
+
+##  Get a percentile of a list of values.
+def _getPercentile(values, percentile):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+##  Print a synthetic g-code to a simulated printer through the printer connection and report the throughput.
+#
+#   The print starts by waiting for the bed and the nozzle to heat up, like the g-code from the engine.
+def main():
+    # Make the plug-in importable when this is run as a script.
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "plugins"))
+
+    from PyQt5.QtCore import QCoreApplication
+    from UM.Preferences import Preferences
+    from USBPrinting.MarlinEmulator import MarlinEmulator
+    from USBPrinting.PrinterConnection import PrinterConnection
+
+    # The printer connection is a QObject and emits Qt signals from its threads, which need a Qt application as well.
+    qt_application = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    application = _createApplication()
+    option = application.getCommandLineOption
+
+    preferences = Preferences.getInstance()
+    preferences.addPreference("usb_printing/send_window", 1)
+    preferences.addPreference("usb_printing/rx_buffer_size", 127)
+    preferences.addPreference("usb_printing/baud_rates", "")
+    preferences.setValue("usb_printing/send_window", option("send_window"))
+    preferences.setValue("usb_printing/rx_buffer_size", option("rx_buffer_size") - 1)
+
+    emulator = MarlinEmulator(rx_buffer_size = option("rx_buffer_size"), planner_buffer_size = option("planner_buffer_size"), move_time = option("move_time"), error_rate = option("error_rate"), latency = option("latency"),
+                              heat_rate = option("heat_rate"), wait_report_interval = option("wait_report_interval") or None, seed = 0)
+    port = emulator.start()
+    connection = PrinterConnection(port)
+
+    try:
+        start_time = time.time()
+        connection.connect()
+        while not connection.isConnected():
+            if time.time() - start_time > 60:
+                print("Could not connect to the simulated printer on %s." % port)
+                return 1
+            application.processEvents(0.01)
+        connect_time = time.time() - start_time
+
+        moves = option("moves")
+        gcode_list = ["M190 S%d\nM109 S%d\n" % (option("bed_temperature"), option("temperature"))] + createGCode(moves)
+
+        emulator.resetStatistics()
+        start_time = time.time()
+        connection.printGCode(gcode_list)
+        while emulator.getStatistics()["moves"] < moves:
+            if connection.hasError():
+                print("Printing failed: %s" % connection.error)
+                return 1
+            application.processEvents(0.01)
+        print_time = time.time() - start_time
+
+        statistics = emulator.getStatistics()
+        latencies = statistics["latencies"]
+        recovery_times = statistics["recovery_times"]
+        move_time = print_time - statistics["wait_time"]
+        print("Connected in %.2f s." % connect_time)
+        print("Heated up in %.2f s with %d temperature reports, the connection read %.1f for the nozzle and %.1f for the bed." % (statistics["wait_time"], statistics["wait_reports"], connection.extruderTemperature, connection.bedTemperature))
+        print("Printed %d lines in %.2f s after heating up: %.0f lines/s." % (statistics["lines"], move_time, statistics["lines"] / move_time))
+        print("Latency per line: mean %.3f ms, 95th percentile %.3f ms." % (1000 * sum(latencies) / max(1, len(latencies)), 1000 * _getPercentile(latencies, 95)))
+        print("Planner empty for %.2f s." % statistics["starved_time"])
+        print("%d lines corrupted, %d resend requests, %d bytes lost to buffer overflows." % (statistics["corrupted"], statistics["errors"], statistics["overflow_bytes"]))
+        if recovery_times:
+            print("Recovery time: mean %.3f ms, maximum %.3f ms." % (1000 * sum(recovery_times) / len(recovery_times), 1000 * max(recovery_times)))
+        return 0
+    finally:
+        connection.cancelPrint()
+        connection.close()
+        emulator.stop()
+
+if __name__ == "__main__":
+    sys.exit(main())
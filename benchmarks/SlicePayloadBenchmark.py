@@ -0,0 +1,149 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import argparse
+import math
+import os
+import socket
+import sys
+import time
+
+import numpy
+
+##  Create the mesh data of a synthetic object.
+#
+#   \param triangle_count The number of triangles of the mesh.
+#   \param seed The seed of the random generator.
+def createMeshData(triangle_count, seed = 0):
+    from UM.Mesh.MeshData import MeshData
+
+    random = numpy.random.RandomState(seed)
+    mesh_data = MeshData()
+    mesh_data.addVertices(random.uniform(-10, 10, (triangle_count * 3, 3)).astype(numpy.float32))
+    return mesh_data
+
+##  Connect a stand-in engine to a socket of the backend.
+#
+#   \param capabilities The capabilities that the stand-in engine reports.
+#   \return A tuple of the listening socket, the socket of the backend and the StandInEngine.
+def _connectEngine(capabilities):
+    from CuraEngineBackend import StandInEngine
+
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    engine = StandInEngine.StandInEngine(respond = False, capabilities = capabilities)
+    engine.connect("127.0.0.1", server.getsockname()[1])
+    connection = server.accept()[0]
+
+    # Read the capabilities like the backend does before it slices.
+    if capabilities:
+        StandInEngine.receiveMessage(connection)
+    return server, connection, engine
+
+##  Create the messages of a slice of a number of objects with the slice job and send them to a stand-in engine.
+#
+#   Every object is rotated and moved, so the transformations that the engine applies are checked as well.
+#
+#   \param connection The socket of the backend that the stand-in engine is connected to.
+#   \param engine The StandInEngine.
+#   \param meshes A list with the mesh data of every object. Objects can share mesh data, like copies do.
+#   \param capabilities The capabilities of the engine, which decide the form of the slice message.
+#   \param engine_mesh_ids The IDs of the meshes that the engine kept from the previous slice.
+#   \param offset The distance that the first object is moved, in millimeters.
+#   \return The record of the stand-in engine for the slice, with the time the slice job took added as "job_time"
+#           and the IDs of the meshes that the slice referred to as "mesh_ids".
+def _sendSlice(connection, engine, meshes, capabilities, engine_mesh_ids = (), offset = 0):
+    from CuraEngineBackend import StandInEngine
+    from CuraEngineBackend import StartSliceJob
+
+    snapshots = []
+    for index, mesh_data in enumerate(meshes):
+        angle = index * math.pi / 7
+        transformation = numpy.identity(4)
+        transformation[0:3, 0:3] = [[math.cos(angle), 0, math.sin(angle)], [0, 1, 0], [-math.sin(angle), 0, math.cos(angle)]]
+        transformation[0:3, 3] = [index * 25 + (offset if index == 0 else 0), 0, 0]
+        snapshots.append(StartSliceJob.ObjectSnapshot(index + 1, mesh_data, transformation, []))
+
+    job = StartSliceJob.StartSliceJob({ "layer_height": 0.1 }, [snapshots], {}, "", capabilities, engine_mesh_ids)
+    start_time = time.time()
+    job.run()
+    job_time = time.time() - start_time
+
+    StandInEngine.sendMessage(connection, job.getSettingsMessage())
+    StandInEngine.sendMessage(connection, job.getSliceMessage())
+    slice_count = len(engine.getSlices()) + 1
+    if not engine.waitForSlices(slice_count, 10):
+        return None
+
+    record = engine.getSlices()[slice_count - 1]
+    record["job_time"] = job_time
+    record["mesh_ids"] = job.getMeshIds()
+    return record
+
+##  Send slices of copies of one mesh and of distinct meshes over a loopback socket, and report the payload.
+#
+#   The slices are sent to an engine without capabilities, which gets the vertices of every object, to an
+#   engine that accepts references to meshes, which gets every distinct mesh once, and to an engine that also
+#   keeps the meshes of the previous slice, which only gets meshes it does not have. The last scenario slices
+#   distinct meshes again after moving one of them, and reports the second slice. The payload is measured by
+#   a stand-in engine on the other end of the socket, so it includes everything the backend sends for a
+#   slice. The vertices that the engine slices are compared between the engines.
+def main():
+    parser = argparse.ArgumentParser(description = "Measure the payload that is sent to the engine for copies of a mesh.")
+    parser.add_argument("--objects", type = int, default = 20, help = "Number of objects on the build plate.")
+    parser.add_argument("--triangles", type = int, default = 20000, help = "Number of triangles of every mesh.")
+    args = parser.parse_args()
+
+    # Make the plug-in and Cura importable when this is run as a script.
+    root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, root_path)
+    sys.path.insert(0, os.path.join(root_path, "plugins"))
+
+    from CuraEngineBackend.StartSliceJob import MeshCacheCapability, MeshReferencesCapability
+
+    mesh_data = createMeshData(args.triangles)
+    mesh_size = len(mesh_data.getVertices().tobytes())
+    distinct_meshes = [createMeshData(args.triangles, seed) for seed in range(args.objects)]
+    scenarios = [
+        ("copies of one mesh", [mesh_data] * args.objects, mesh_size, None),
+        ("distinct meshes", distinct_meshes, mesh_size * args.objects, None),
+        ("distinct meshes, one moved 1 mm", distinct_meshes, mesh_size * args.objects, 1)
+    ]
+    modes = [
+        ("vertices per object", ()),
+        ("mesh references", (MeshReferencesCapability, )),
+        ("mesh references and cache", (MeshReferencesCapability, MeshCacheCapability))
+    ]
+
+    expected_vertices = {}
+    for mode_name, capabilities in modes:
+        for name, meshes, distinct_size, offset in scenarios:
+            # Every scenario gets a new engine, so it does not have meshes of the other scenarios.
+            server, connection, engine = _connectEngine(capabilities)
+            try:
+                record = _sendSlice(connection, engine, meshes, capabilities)
+                if record is not None and offset is not None:
+                    engine_mesh_ids = record["mesh_ids"] if MeshCacheCapability in capabilities else ()
+                    record = _sendSlice(connection, engine, meshes, capabilities, engine_mesh_ids, offset)
+                if record is None:
+                    print("The stand-in engine did not receive the slice of %s." % name)
+                    return 1
+
+                vertices = engine.getVertices()
+                expected = expected_vertices.setdefault(name, vertices)
+                if record["missing_meshes"] or vertices.keys() != expected.keys():
+                    print("The stand-in engine did not get the vertices of all %s with %s." % (name, mode_name))
+                    return 1
+                difference = max(float(numpy.max(numpy.abs(vertices[object_id] - expected[object_id]))) for object_id in vertices)
+
+                print("%d %s with %s: %d bytes sent, %d bytes of vertex data, %.2f times the vertex data of the distinct meshes, slice job took %.3f s, vertices differ at most %g mm." % (record["objects"], name, mode_name, record["bytes"], record["vertex_bytes"], record["bytes"] / distinct_size, record["job_time"], difference))
+            finally:
+                connection.close()
+                engine.close()
+                server.close()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
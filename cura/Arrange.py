@@ -0,0 +1,183 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from . import ConvexHullJob
+
+import numpy
+
+##  Places convex polygons on the build plate so that they do not overlap.
+#
+#   The build plate is rasterized into grids of cells that are occupied or free. To place
+#   a polygon, it is rasterized as well and the overlap with the occupied cells is computed
+#   for every position on the plate at once, by correlating the grids with FFTs. Of all
+#   free positions, the one closest to the center of the build plate is used.
+#
+#   Every object has a hull and a head hull, the area the print head covers while printing
+#   the object. Like the collision checks of the platform physics, an object may only be
+#   placed where its head hull does not overlap the hulls of other objects and its hull
+#   does not overlap the head hulls of other objects. So one grid holds the occupied hulls
+#   and another the occupied head hulls.
+#
+#   Polygons are dilated by half a cell before they are rasterized, so a polygon
+#   always covers every cell it touches and placed polygons can not overlap.
+class Arrange:
+    ##  Create an empty build plate.
+    #
+    #   \param minimum The (x, z) coordinates of the corner of the build plate with the lowest coordinates.
+    #   \param maximum The (x, z) coordinates of the corner of the build plate with the highest coordinates.
+    #   \param cell_size The size of the grid cells, in mm.
+    def __init__(self, minimum, maximum, cell_size = 2.0):
+        self._minimum = numpy.array(minimum, dtype = numpy.float64)
+        self._maximum = numpy.array(maximum, dtype = numpy.float64)
+        self._cell_size = cell_size
+
+        columns = max(1, int((self._maximum[0] - self._minimum[0]) / cell_size))
+        rows = max(1, int((self._maximum[1] - self._minimum[1]) / cell_size))
+        self._occupied_hulls = numpy.zeros((rows, columns), dtype = numpy.float64)
+        self._occupied_heads = numpy.zeros((rows, columns), dtype = numpy.float64)
+        self._spectra = {} # FFTs of the occupied grids, by grid ID, until the grid changes.
+
+        half_cell = cell_size / 2
+        self._cell_square = numpy.array([[-half_cell, -half_cell], [half_cell, -half_cell], [half_cell, half_cell], [-half_cell, half_cell]], dtype = numpy.float64)
+
+    ##  Create a build plate with the size and disallowed areas of a build volume.
+    #
+    #   \param build_volume The BuildVolume to use.
+    #   \param cell_size The size of the grid cells, in mm.
+    @classmethod
+    def fromBuildVolume(cls, build_volume, cell_size = 2.0):
+        box = build_volume.getBoundingBox()
+        arrange = cls((box.minimum.x, box.minimum.z), (box.maximum.x, box.maximum.z), cell_size)
+        for area in build_volume.getDisallowedAreas():
+            arrange.occupy(area.getPoints())
+        return arrange
+
+    def getCellSize(self):
+        return self._cell_size
+
+    ##  Mark the area of an object as occupied.
+    #
+    #   \param hull A numpy array with the (x, z) points of the hull of the object. Only its convex hull is used.
+    #   \param head A numpy array with the (x, z) points of the head hull of the object. If None, the hull is used.
+    def occupy(self, hull, head = None):
+        self._occupyGrid(self._occupied_hulls, hull)
+        self._occupyGrid(self._occupied_heads, hull if head is None else head)
+
+    ##  Find the position for an object that is closest to the center of the build plate and does not overlap occupied areas.
+    #
+    #   \param hull A numpy array with the (x, z) points of the hull of the object. Only its convex hull is used.
+    #   \param head A numpy array with the (x, z) points of the head hull of the object. If None, the hull is used.
+    #   \return The (x, z) offset to move the object by, or None if the object does not fit anywhere.
+    def findPosition(self, hull, head = None):
+        if head is None:
+            head = hull
+        polygons = [self._dilate(hull), self._dilate(head)]
+        if any(polygon is None for polygon in polygons):
+            return None
+
+        # Rasterize both polygons on the same cells, so their overlaps are computed for the same positions.
+        corner = self._minimum + numpy.floor((numpy.min([polygon.min(axis = 0) for polygon in polygons], axis = 0) - self._minimum) / self._cell_size) * self._cell_size
+        maximum = numpy.max([polygon.max(axis = 0) for polygon in polygons], axis = 0)
+        shape = numpy.ceil((maximum - corner) / self._cell_size).astype(int) + 1
+        hull_mask = self._rasterize(polygons[0], corner, shape)
+        head_mask = self._rasterize(polygons[1], corner, shape)
+
+        rows, columns = self._occupied_hulls.shape
+        if hull_mask.shape[0] > rows or hull_mask.shape[1] > columns:
+            return None
+
+        # Number of occupied cells the masks overlap, with the masks placed at every cell of the build plate.
+        overlap = self._correlate(self._occupied_hulls, head_mask) + self._correlate(self._occupied_heads, hull_mask)
+        overlap = overlap[:rows - hull_mask.shape[0] + 1, :columns - hull_mask.shape[1] + 1]
+
+        free = overlap < 0.5
+        if not free.any():
+            return None
+
+        # Distance of the center of the masks to the center of the build plate, for every position.
+        size = numpy.array([hull_mask.shape[1], hull_mask.shape[0]]) * self._cell_size
+        center = (self._maximum + self._minimum) / 2 - size / 2 - self._minimum
+        x = numpy.arange(overlap.shape[1]) * self._cell_size - center[0]
+        z = numpy.arange(overlap.shape[0]) * self._cell_size - center[1]
+        distance = numpy.where(free, z[:, numpy.newaxis] ** 2 + x[numpy.newaxis, :] ** 2, numpy.inf)
+
+        row, column = numpy.unravel_index(numpy.argmin(distance), distance.shape)
+        return self._minimum + numpy.array([column, row]) * self._cell_size - corner
+
+    ##  Find a position for an object and mark the object as occupied at that position.
+    #
+    #   \param hull A numpy array with the (x, z) points of the hull of the object. Only its convex hull is used.
+    #   \param head A numpy array with the (x, z) points of the head hull of the object. If None, the hull is used.
+    #   \return The (x, z) offset to move the object by, or None if the object does not fit anywhere.
+    def place(self, hull, head = None):
+        offset = self.findPosition(hull, head)
+        if offset is None:
+            return None
+
+        hull = numpy.asarray(hull, dtype = numpy.float64) + offset
+        head = hull if head is None else numpy.asarray(head, dtype = numpy.float64) + offset
+        self.occupy(hull, head)
+        return offset
+
+    ##  Mark the area of a polygon as occupied in one of the grids.
+    def _occupyGrid(self, grid, points):
+        polygon = self._dilate(points)
+        if polygon is None:
+            return
+
+        corner = self._minimum + numpy.floor((polygon.min(axis = 0) - self._minimum) / self._cell_size) * self._cell_size
+        shape = numpy.ceil((polygon.max(axis = 0) - corner) / self._cell_size).astype(int) + 1
+        mask = self._rasterize(polygon, corner, shape)
+
+        # Clip the mask to the build plate.
+        row, column = self._getCell(corner)
+        rows, columns = grid.shape
+        top, left = max(0, -row), max(0, -column)
+        bottom, right = min(mask.shape[0], rows - row), min(mask.shape[1], columns - column)
+        if top >= bottom or left >= right:
+            return
+
+        target = grid[row + top:row + bottom, column + left:column + right]
+        numpy.maximum(target, mask[top:bottom, left:right], out = target)
+        self._spectra.pop(id(grid), None)
+
+    ##  Correlate an occupied grid with a mask.
+    #
+    #   \return For every position of the mask on the grid, the number of occupied cells it overlaps.
+    def _correlate(self, grid, mask):
+        spectrum = self._spectra.get(id(grid))
+        if spectrum is None:
+            spectrum = numpy.fft.rfft2(grid)
+            self._spectra[id(grid)] = spectrum
+        return numpy.fft.irfft2(spectrum * numpy.conj(numpy.fft.rfft2(mask, s = grid.shape)), s = grid.shape)
+
+    ##  Dilate a polygon by half a cell.
+    #
+    #   \return A numpy array with the points of the dilated convex hull of the polygon, or None if it has no points.
+    def _dilate(self, points):
+        points = numpy.asarray(points, dtype = numpy.float64)
+        if len(points) == 0:
+            return None
+        return ConvexHullJob.getMinkowskiHulls(points, [self._cell_square])[0]
+
+    ##  Rasterize a convex polygon.
+    #
+    #   \param polygon A numpy array with the points of the polygon, in counter-clockwise order.
+    #   \param corner The (x, z) coordinates of the corner of the grid with the lowest coordinates. It should be
+    #                 aligned to the cells of the build plate.
+    #   \param shape The number of (columns, rows) of the grid.
+    #   \return A grid of the cells covered by the polygon, as numpy array of zeros and ones.
+    def _rasterize(self, polygon, corner, shape):
+        # Check which cell centers are inside the polygon.
+        x = corner[0] + (numpy.arange(shape[0]) + 0.5) * self._cell_size
+        z = corner[1] + (numpy.arange(shape[1]) + 0.5) * self._cell_size
+        inside = numpy.ones((shape[1], shape[0]), dtype = bool)
+        for start, end in zip(polygon, numpy.roll(polygon, -1, axis = 0)):
+            edge = end - start
+            inside &= edge[0] * (z[:, numpy.newaxis] - start[1]) - edge[1] * (x[numpy.newaxis, :] - start[0]) >= 0
+
+        return inside.astype(numpy.float64)
+
+    def _getCell(self, position):
+        cell = numpy.rint((position - self._minimum) / self._cell_size).astype(int)
+        return cell[1], cell[0]
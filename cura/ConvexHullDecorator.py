@@ -1,5 +1,7 @@
 from UM.Scene.SceneNodeDecorator import SceneNodeDecorator
 from UM.Application import Application
+from UM.Math.Polygon import Polygon
+from UM.Math.Vector import Vector
 
 class ConvexHullDecorator(SceneNodeDecorator):
     def __init__(self):
@@ -15,10 +17,20 @@ class ConvexHullDecorator(SceneNodeDecorator):
         self._convex_hull_node = None
         self._convex_hull_job = None
 
+        # The world transformation of the node the convex hull was calculated with.
+        self._convex_hull_transformation = None
+
         self._profile = None
         Application.getInstance().getMachineManager().activeProfileChanged.connect(self._onActiveProfileChanged)
         self._onActiveProfileChanged()
     
+    ##  Create a decorator for a copy of the node.
+    #
+    #   The hulls, the hull node and the transformation they were calculated with belong to the original node,
+    #   so they are not copied. The copy gets its own hulls when they are calculated for its node.
+    def __deepcopy__(self, memo):
+        return ConvexHullDecorator()
+
     def getConvexHull(self):
         return self._convex_hull
     
@@ -47,6 +59,46 @@ class ConvexHullDecorator(SceneNodeDecorator):
     def setConvexHullJob(self, job):
         self._convex_hull_job = job
     
+    def getConvexHullTransformation(self):
+        return self._convex_hull_transformation
+
+    def setConvexHullTransformation(self, transformation):
+        self._convex_hull_transformation = transformation
+
+    ##  Move the convex hulls along with the node if the node was only translated in the XZ plane.
+    #
+    #   Translating a node does not change the shape of its hulls, so the hulls are offset
+    #   instead of calculated again from all vertices.
+    #
+    #   \return True if the hulls match the current transformation of the node, False if they need to be calculated again.
+    def translateConvexHull(self):
+        if not self._convex_hull or self._convex_hull_transformation is None:
+            return False
+
+        # The hull of a group is made from the hulls of its children, those are calculated again when a child moves.
+        node = self.getNode()
+        if node.callDecoration("isGroup") or (node.getParent() and node.getParent().callDecoration("isGroup")):
+            return False
+
+        old_matrix = self._convex_hull_transformation
+        new_matrix = node.getWorldTransformation().getData()
+        # Rotation and scale, as well as the height which decides which vertices end up below the build plate, should be unchanged.
+        if not (new_matrix[0:3, 0:3] == old_matrix[0:3, 0:3]).all() or new_matrix[1, 3] != old_matrix[1, 3]:
+            return False
+
+        offset = new_matrix[[0, 2], 3] - old_matrix[[0, 2], 3]
+        if offset.any():
+            self._convex_hull = Polygon(self._convex_hull.getPoints() + offset)
+            if self._convex_hull_head:
+                self._convex_hull_head = Polygon(self._convex_hull_head.getPoints() + offset)
+            if self._convex_hull_boundary:
+                self._convex_hull_boundary = Polygon(self._convex_hull_boundary.getPoints() + offset)
+            if self._convex_hull_node:
+                self._convex_hull_node.translate(Vector(offset[0], 0, offset[1]))
+
+        self._convex_hull_transformation = new_matrix.copy()
+        return True
+
     def getConvexHullNode(self):
         return self._convex_hull_node
     
@@ -6,8 +6,27 @@ from UM.Application import Application
 from UM.Math.Polygon import Polygon
 
 import numpy
-import copy
+import threading
+import weakref
+import collections
 from . import ConvexHullNode
+from . import MeshHash
+
+##  Convex hulls of meshes in the local space of the mesh, by mesh hash and height filter.
+#
+#   Meshes are often only moved, rotated around the Y axis or scaled. The hull of such
+#   a transformed mesh is the transformed local hull, so the hull only needs to be
+#   computed from all vertices once per mesh. Copies of a mesh share the hull.
+_local_hulls = collections.OrderedDict()
+_max_local_hulls = 1000
+_local_hull_locks = weakref.WeakKeyDictionary()
+_local_hulls_lock = threading.Lock()
+
+##  Head polygons by machine instance, see getHeadPolygons.
+_head_polygons = weakref.WeakKeyDictionary()
+
+##  Quad that is used to outset the convex hull a little, to compensate for rounding errors.
+_rounding_quad = numpy.array([[-1, -1], [-1, 1], [1, 1], [1, -1]], dtype = numpy.float64)
 
 class ConvexHullJob(Job):
     def __init__(self, node):
@@ -19,6 +38,7 @@ class ConvexHullJob(Job):
         if not self._node:
             return
         ## If the scene node is a group, use the hull of the children to calculate its hull.
+        matrix = None
         if self._node.callDecoration("isGroup"):
             hull = Polygon(numpy.zeros((0, 2), dtype=numpy.int32))
             for child in self._node.getChildren():
@@ -35,30 +55,40 @@ class ConvexHullJob(Job):
             if not self._node.getMeshData():
                 return
             mesh = self._node.getMeshData()
-            vertex_data = mesh.getTransformed(self._node.getWorldTransformation()).getVertices()
-            # Don't use data below 0. TODO; We need a better check for this as this gives poor results for meshes with long edges.
-            vertex_data = vertex_data[vertex_data[:,1]>0]
-            hull = Polygon(numpy.rint(vertex_data[:, [0, 2]]).astype(int))
+            matrix = self._node.getWorldTransformation().getData().copy()
+            # The local hull can only be used when the world X and Z coordinates do not depend on the local Y
+            # coordinate and the world Y coordinate only depends on the local Y coordinate.
+            if matrix[0, 1] == 0 and matrix[2, 1] == 0 and matrix[1, 0] == 0 and matrix[1, 2] == 0:
+                points = getLocalHull(mesh, matrix[1, 1], matrix[1, 3])
+                points = points.dot(matrix[[0, 2]][:, [0, 2]].T) + matrix[[0, 2], 3]
+                hull = Polygon(numpy.rint(points).astype(int))
+            else:
+                vertex_data = mesh.getTransformed(self._node.getWorldTransformation()).getVertices()
+                # Don't use data below 0. TODO; We need a better check for this as this gives poor results for meshes with long edges.
+                vertex_data = vertex_data[vertex_data[:,1]>0]
+                hull = Polygon(numpy.rint(vertex_data[:, [0, 2]]).astype(int))
 
         # First, calculate the normal convex hull around the points
-        hull = hull.getConvexHull()
+        hull_points = _getConvexHullPoints(hull.getPoints().astype(numpy.float64))
 
         # Then, do a Minkowski hull with a simple 1x1 quad to outset and round the normal convex hull.
         # This is done because of rounding errors.
-        hull = hull.getMinkowskiHull(Polygon(numpy.array([[-1, -1], [-1, 1], [1, 1], [1, -1]], numpy.float32)))
+        hull_points = getMinkowskiHulls(hull_points, [_rounding_quad])[0]
+        hull = Polygon(hull_points)
 
         profile = Application.getInstance().getMachineManager().getActiveProfile()
         if profile:
             if profile.getSettingValue("print_sequence") == "one_at_a_time" and not self._node.getParent().callDecoration("isGroup"):
                 # Printing one at a time and it's not an object in a group
-                self._node.callDecoration("setConvexHullBoundary", copy.deepcopy(hull))
-                head_hull = hull.getMinkowskiHull(Polygon(numpy.array(profile.getSettingValue("machine_head_with_fans_polygon"),numpy.float32)))
-                self._node.callDecoration("setConvexHullHead", head_hull)
-                hull = hull.getMinkowskiHull(Polygon(numpy.array(profile.getSettingValue("machine_head_polygon"),numpy.float32)))
+                self._node.callDecoration("setConvexHullBoundary", hull)
+                head_with_fans_points, head_points = getMinkowskiHulls(hull_points, getHeadPolygons(profile))
+                self._node.callDecoration("setConvexHullHead", Polygon(head_with_fans_points))
+                hull = Polygon(head_points)
             else:
                 self._node.callDecoration("setConvexHullHead", None)
         hull_node = ConvexHullNode.ConvexHullNode(self._node, hull, Application.getInstance().getController().getScene().getRoot())
         self._node.callDecoration("setConvexHullNode", hull_node)
+        self._node.callDecoration("setConvexHullTransformation", matrix)
         self._node.callDecoration("setConvexHull", hull)
         self._node.callDecoration("setConvexHullJob", None)
 
@@ -70,3 +100,123 @@ class ConvexHullJob(Job):
             hull_node = self._node.getParent().callDecoration("getConvexHullNode")
             if hull_node:
                 hull_node.setParent(None)
+
+##  Get the convex hull of a mesh in the XZ plane of its local space.
+#
+#   Only the vertices that end up above the build plate are used, like when computing
+#   the hull in world space. Results are cached, so nodes with identical meshes and
+#   nodes that are moved only compute it once.
+#
+#   \param mesh The MeshData to get the hull of.
+#   \param scale_y The factor the local Y coordinate is multiplied by in world space.
+#   \param offset_y The world Y coordinate of the local origin.
+#   \return A numpy array with the points of the hull, in counter-clockwise order.
+def getLocalHull(mesh, scale_y, offset_y):
+    key = (MeshHash.getMeshHash(mesh), float(scale_y), float(offset_y))
+    with _local_hulls_lock:
+        lock = _local_hull_locks.get(mesh)
+        if lock is None:
+            lock = threading.Lock()
+            _local_hull_locks[mesh] = lock
+
+    # Only one job computes the hull of a mesh at a time, so other jobs for the same mesh can use its result.
+    with lock:
+        with _local_hulls_lock:
+            points = _local_hulls.get(key)
+            if points is not None:
+                _local_hulls.move_to_end(key)
+                return points
+
+        vertices = mesh.getVertices()
+        # Don't use data below 0. TODO; We need a better check for this as this gives poor results for meshes with long edges.
+        vertices = vertices[vertices[:, 1] * scale_y + offset_y > 0]
+        points = _getConvexHullPoints(vertices[:, [0, 2]].astype(numpy.float64))
+
+        with _local_hulls_lock:
+            _local_hulls[key] = points
+            # Forget the hulls that were used least recently.
+            while len(_local_hulls) > _max_local_hulls:
+                _local_hulls.popitem(last = False)
+
+        return points
+
+##  Get the polygons of the print head of the active machine instance.
+#
+#   The polygons are converted to numpy arrays once per machine instance, and again only when they change.
+#
+#   \param profile The active profile.
+#   \return A list with the head polygon including fans and the head polygon without fans, as numpy arrays.
+def getHeadPolygons(profile):
+    settings = (profile.getSettingValue("machine_head_with_fans_polygon"), profile.getSettingValue("machine_head_polygon"))
+
+    machine_instance = Application.getInstance().getMachineManager().getActiveMachineInstance()
+    cached = _head_polygons.get(machine_instance) if machine_instance else None
+    if cached and cached[0] == settings:
+        return cached[1]
+
+    polygons = [numpy.array(polygon, dtype = numpy.float64).reshape(-1, 2) for polygon in settings]
+    if machine_instance:
+        _head_polygons[machine_instance] = (settings, polygons)
+    return polygons
+
+##  Compute the Minkowski hulls of a convex polygon with a number of other polygons.
+#
+#   The Minkowski hull is the convex hull of the sums of all pairs of points of the
+#   polygons. The sums for all polygons are computed in a single broadcast.
+#
+#   \param points A numpy array with the points of a convex polygon.
+#   \param polygons A list of numpy arrays with the points of the other polygons.
+#   \return A list of numpy arrays with the points of the Minkowski hulls, in the order of the polygons.
+def getMinkowskiHulls(points, polygons):
+    # Pad the polygons to the same length by repeating their last point, so they can be stacked.
+    length = max(len(polygon) for polygon in polygons)
+    stacked = numpy.array([numpy.concatenate((polygon, numpy.repeat(polygon[-1:], length - len(polygon), axis = 0))) for polygon in polygons])
+
+    sums = points[numpy.newaxis, :, numpy.newaxis, :] + stacked[:, numpy.newaxis, :, :]
+    return [_getConvexHullPoints(polygon_sums.reshape(-1, 2)) for polygon_sums in sums]
+
+##  Compute the convex hull of a set of 2D points.
+#
+#   Points inside the polygon formed by the extreme points in a number of directions
+#   can not be on the hull and are discarded first, with few directions for all points
+#   and more directions for the points that are left. That leaves only few points for
+#   the monotone chain algorithm.
+#
+#   \param points A numpy array of shape (N, 2).
+#   \return A numpy array with the points of the hull, in counter-clockwise order.
+def _getConvexHullPoints(points):
+    if len(points) < 3:
+        return points
+
+    for direction_count in (8, 64):
+        angles = numpy.arange(direction_count) * (2 * numpy.pi / direction_count)
+        directions = numpy.stack((numpy.cos(angles), numpy.sin(angles)), axis = 1)
+        extremes = points[numpy.argmax(points.dot(directions.T), axis = 0)]
+        inside = numpy.ones(len(points), dtype = bool)
+        for start, end in zip(extremes, numpy.roll(extremes, -1, axis = 0)):
+            edge = end - start
+            if not edge.any():
+                continue
+            inside &= edge[0] * (points[:, 1] - start[1]) - edge[1] * (points[:, 0] - start[0]) > 0
+        points = numpy.concatenate((points[~inside], extremes))
+
+    points = numpy.unique(points, axis = 0) # Sorted by X, then by Y.
+    if len(points) < 3:
+        return points
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower = []
+    for point in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+
+    upper = []
+    for point in points[::-1]:
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+
+    return numpy.array(lower[:-1] + upper[:-1])
@@ -74,6 +74,10 @@ class ConvexHullNode(SceneNode):
         return True
 
     def _onNodePositionChanged(self, node):
+        # A node that was only moved keeps its hull, the hull is moved along with it.
+        if node.callDecoration("translateConvexHull"):
+            return
+
         if node.callDecoration("getConvexHull"): 
             node.callDecoration("setConvexHull", None)
             node.callDecoration("setConvexHullNode", None)
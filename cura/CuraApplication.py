@@ -44,6 +44,7 @@ from . import CameraAnimation
 from . import PrintInformation
 from . import CuraActions
 from . import MultiMaterialDecorator
+from . import Arrange
 
 from PyQt5.QtCore import pyqtSlot, QUrl, Qt, pyqtSignal, pyqtProperty, QEvent, Q_ENUMS
 from PyQt5.QtGui import QColor, QIcon
@@ -285,17 +286,31 @@ class CuraApplication(QtApplication):
             node = Selection.getSelectedObject(0)
 
         if node:
+            if node.getParent() and node.getParent().callDecoration("isGroup"):
+                node = node.getParent() #Copy the group node.
+
+            # Place the copies next to the other objects right away, using the hulls of the original.
+            arrange = None
+            if node.callDecoration("getConvexHull"):
+                arrange = Arrange.Arrange.fromBuildVolume(self._volume)
+                for other_node in self._getArrangeableNodes():
+                    arrange.occupy(other_node.callDecoration("getConvexHull").getPoints(), other_node.callDecoration("getConvexHullHead").getPoints())
+
             op = GroupedOperation()
             for i in range(count):
-                if node.getParent() and node.getParent().callDecoration("isGroup"):
-                    new_node = copy.deepcopy(node.getParent()) #Copy the group node.
-                    new_node.callDecoration("setConvexHull",None)
+                new_node = copy.deepcopy(node)
+                # The copies share the mesh data of the original instead of a copy of it, mesh data is not changed after loading.
+                # The convex hull decorators of the copies start without hulls, so every copy gets its own.
+                for original_child, new_child in zip(DepthFirstIterator(node), DepthFirstIterator(new_node)):
+                    new_child.setMeshData(original_child.getMeshData())
 
-                    op.addOperation(AddSceneNodeOperation(new_node,node.getParent().getParent()))
-                else:
-                    new_node = copy.deepcopy(node)
-                    new_node.callDecoration("setConvexHull", None)
-                    op.addOperation(AddSceneNodeOperation(new_node, node.getParent()))
+                if arrange:
+                    offset = arrange.place(node.callDecoration("getConvexHull").getPoints(), node.callDecoration("getConvexHullHead").getPoints())
+                    if offset is not None:
+                        position = node.getPosition()
+                        new_node.setPosition(Vector(position.x + offset[0], position.y, position.z + offset[1]))
+
+                op.addOperation(AddSceneNodeOperation(new_node, node.getParent()))
 
             op.push()
 
@@ -360,6 +375,58 @@ class CuraApplication(QtApplication):
 
             op.push()
     
+    ##  Arrange all objects on the build plate, so they do not overlap each other or the disallowed areas.
+    #
+    #   Objects are placed from large to small, each as close to the center of the build plate as possible.
+    #   Objects that do not fit anymore are not moved.
+    @pyqtSlot()
+    def arrangeAll(self):
+        nodes = self._getArrangeableNodes()
+        if not nodes:
+            return
+
+        # Place the largest objects first, smaller objects fit better in the remaining gaps.
+        def getHullArea(node):
+            points = node.callDecoration("getConvexHullHead").getPoints()
+            return numpy.prod(numpy.max(points, axis = 0) - numpy.min(points, axis = 0))
+        nodes.sort(key = getHullArea, reverse = True)
+
+        arrange = Arrange.Arrange.fromBuildVolume(self._volume)
+        op = GroupedOperation()
+        not_placed = 0
+        for node in nodes:
+            # Like the collision checks of the platform physics, the head hull of an object should not overlap the hulls of
+            # other objects, and its hull should not overlap the head hulls of other objects.
+            offset = arrange.place(node.callDecoration("getConvexHull").getPoints(), node.callDecoration("getConvexHullHead").getPoints())
+            if offset is None:
+                not_placed += 1
+                continue
+
+            position = node.getPosition()
+            op.addOperation(SetTransformOperation(node, Vector(position.x + offset[0], position.y, position.z + offset[1])))
+
+        if not_placed:
+            Logger.log("w", "Unable to find a place on the build plate for %s objects", not_placed)
+
+        op.push()
+
+    ##  Get the objects that can be arranged on the build plate.
+    #
+    #   These are the nodes with mesh data and the groups, that are not in a group themselves and have a convex hull.
+    def _getArrangeableNodes(self):
+        nodes = []
+        for node in DepthFirstIterator(self.getController().getScene().getRoot()):
+            if type(node) is not SceneNode:
+                continue
+            if not node.getMeshData() and not node.callDecoration("isGroup"):
+                continue #Node that doesnt have a mesh and is not a group.
+            if node.getParent() and node.getParent().callDecoration("isGroup"):
+                continue #Grouped nodes are arranged with their parent (the group).
+            if not node.callDecoration("getConvexHull"):
+                continue #Node that does not have a convex hull (yet).
+            nodes.append(node)
+        return nodes
+
     ## Reset all transformations on nodes with mesh data. 
     @pyqtSlot()
     def resetAll(self):
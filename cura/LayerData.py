@@ -2,30 +2,103 @@
 # Cura is released under the terms of the AGPLv3 or higher.
 
 from UM.Mesh.MeshData import MeshData
-from UM.Mesh.MeshBuilder import MeshBuilder
 from UM.Math.Color import Color
-from UM.Math.Vector import Vector
 
 import numpy
 import math
 import copy
 
+##  Layer data of a sliced object.
+#
+#   All polygons of all layers are stored in a few contiguous arrays: one array
+#   with the points of all polygons, and per-polygon arrays with the index of
+#   their first point, their type, their line width and the layer they belong to.
+#   The Layer and Polygon objects returned by this class are light-weight views
+#   on those arrays that are created when they are requested.
 class LayerData(MeshData):
     def __init__(self):
         super().__init__()
         self._layers = {}
+        self._layer_ids = []
         self._element_counts = {}
 
+        self._points = numpy.empty((0, 3), numpy.float32)
+        self._point_count = 0
+
+        # Polygon i uses the points from _polygon_starts[i] up to _polygon_starts[i + 1].
+        self._polygon_starts = numpy.zeros(1, numpy.int64)
+        self._polygon_types = numpy.empty(0, numpy.uint8)
+        self._polygon_line_widths = numpy.empty(0, numpy.float32)
+        self._polygon_layers = numpy.empty(0, numpy.int32)
+        self._polygon_count = 0
+
+        # Number of times the storage of points and polygons was allocated.
+        self._allocation_count = 0
+
+        # Cached tuple of (polygon count, polygon indices sorted by layer, index of the first polygon of each layer).
+        self._layer_index = None
+
     def addLayer(self, layer):
         if layer not in self._layers:
-            self._layers[layer] = Layer(layer)
+            self._layers[layer] = Layer(self, layer, len(self._layer_ids))
+            self._layer_ids.append(layer)
 
     def addPolygon(self, layer, type, data, line_width):
+        points = self.addPolygons(layer, [type], [line_width], [len(data)])
+        points[:] = data
+
+    ##  Add a number of polygons to a layer.
+    #
+    #   \param layer The ID of the layer to add the polygons to.
+    #   \param types The types of the polygons.
+    #   \param line_widths The line widths of the polygons, in micron.
+    #   \param counts The number of points of each polygon.
+    #   \return A writable (N, 3) array for the points of the new polygons. It is only valid until
+    #           the next polygons are added, so it should be filled before that.
+    def addPolygons(self, layer, types, line_widths, counts):
         if layer not in self._layers:
             self.addLayer(layer)
 
-        p = Polygon(self, type, data, line_width)
-        self._layers[layer].polygons.append(p)
+        counts = numpy.asarray(counts, numpy.int64)
+        point_count = int(counts.sum())
+        polygon_begin = self._polygon_count
+        polygon_end = polygon_begin + len(counts)
+        self.reserve(self._point_count + point_count, polygon_end)
+
+        self._polygon_starts[polygon_begin + 1:polygon_end + 1] = self._point_count + numpy.cumsum(counts)
+        self._polygon_types[polygon_begin:polygon_end] = types
+        self._polygon_line_widths[polygon_begin:polygon_end] = numpy.asarray(line_widths, numpy.float32) / 1000
+        self._polygon_layers[polygon_begin:polygon_end] = self._layers[layer].index
+
+        points = self._points[self._point_count:self._point_count + point_count]
+        self._point_count += point_count
+        self._polygon_count = polygon_end
+        return points
+
+    ##  Make sure there is room for a number of points and polygons without reallocating.
+    #
+    #   Adding polygons grows the storage as needed, but reserving the
+    #   total size in advance avoids copying and over-allocating.
+    #
+    #   \param point_count The total number of points to make room for.
+    #   \param polygon_count The total number of polygons to make room for.
+    def reserve(self, point_count, polygon_count):
+        old_arrays = (self._points, self._polygon_starts, self._polygon_types, self._polygon_line_widths, self._polygon_layers)
+
+        self._points = _grow(self._points, point_count)
+        self._polygon_starts = _grow(self._polygon_starts, polygon_count + 1)
+        self._polygon_types = _grow(self._polygon_types, polygon_count)
+        self._polygon_line_widths = _grow(self._polygon_line_widths, polygon_count)
+        self._polygon_layers = _grow(self._polygon_layers, polygon_count)
+
+        new_arrays = (self._points, self._polygon_starts, self._polygon_types, self._polygon_line_widths, self._polygon_layers)
+        self._allocation_count += sum(1 for old, new in zip(old_arrays, new_arrays) if old is not new)
+
+    ##  Get the number of times the storage of points and polygons was allocated.
+    #
+    #   Every array that is grown counts as one allocation.
+    def getAllocationCount(self):
+        return self._allocation_count
 
     def getLayer(self, layer):
         if layer in self._layers:
@@ -37,6 +110,36 @@ class LayerData(MeshData):
     def getElementCounts(self):
         return self._element_counts
 
+    ##  Get the points of all polygons.
+    def getPoints(self):
+        return self._points[:self._point_count]
+
+    ##  Get the index of the first point of each polygon.
+    #
+    #   This has one more entry than there are polygons, the last entry is the total number of points.
+    def getPolygonStarts(self):
+        return self._polygon_starts[:self._polygon_count + 1]
+
+    def getPolygonTypes(self):
+        return self._polygon_types[:self._polygon_count]
+
+    ##  Get the line width of each polygon, in millimeter.
+    def getPolygonLineWidths(self):
+        return self._polygon_line_widths[:self._polygon_count]
+
+    ##  Get the indices of the polygons that belong to a layer.
+    #
+    #   \param index The index of the layer, in the order the layers were added.
+    def getLayerPolygons(self, index):
+        layer_index = self._layer_index
+        if layer_index is None or layer_index[0] != self._polygon_count:
+            layer_index = self._createLayerIndex()
+
+        count, order, layer_starts = layer_index
+        if index + 1 >= len(layer_starts):
+            return order[0:0]
+        return order[layer_starts[index]:layer_starts[index + 1]]
+
     def setLayerHeight(self, layer, height):
         if layer not in self._layers:
             self.addLayer(layer)
@@ -49,32 +152,160 @@ class LayerData(MeshData):
 
         self._layers[layer].setThickness(thickness)
 
+    ##  Build the mesh data for all layers that have not been built yet.
+    #
+    #   This can be called multiple times while layers are being added, in which
+    #   case the newly added layers are appended to the existing mesh data. Layers
+    #   are built in the order they were added, so they should be added from the
+    #   bottom up. Polygons added to a layer after it was built are ignored.
     def build(self):
+        layers = []
         vertex_count = 0
         for layer, data in self._layers.items():
+            if layer in self._element_counts:
+                continue
+
+            layers.append((layer, data))
             vertex_count += data.vertexCount()
 
+        if not layers:
+            return
+
         vertices = numpy.empty((vertex_count, 3), numpy.float32)
         colors = numpy.empty((vertex_count, 4), numpy.float32)
         indices = numpy.empty((vertex_count, 2), numpy.int32)
 
+        # Replace the element counts as a whole so the renderer never sees a partially updated dict.
+        element_counts = dict(self._element_counts)
         offset = 0
-        for layer, data in self._layers.items():
+        for layer, data in layers:
             offset = data.build(offset, vertices, colors, indices)
-            self._element_counts[layer] = data.elementCount
+            element_counts[layer] = data.elementCount
+
+        # The new vertices are appended after the existing ones, so offset the indices to match.
+        indices += self.getVertexCount()
+
+        # Infill and travel moves are not built, so not all allocated vertices are used.
+        self.addVertices(vertices[:offset])
+        self.addColors(colors[:offset])
+        self.addIndices(indices[:offset].flatten())
+
+        self._element_counts = element_counts
+
+    ##  Get all data of this object as numpy arrays, so it can be stored.
+    #
+    #   This includes the built mesh data, so all layers should be built first.
+    #   \return A dict with names as keys and numpy arrays as values.
+    #   \sa fromArrays
+    def getArrays(self):
+        layers = [self._layers[layer] for layer in self._layer_ids]
+        return {
+            "points": self.getPoints(),
+            "polygon_starts": self.getPolygonStarts(),
+            "polygon_types": self.getPolygonTypes(),
+            "polygon_line_widths": self.getPolygonLineWidths(),
+            "polygon_layers": self._polygon_layers[:self._polygon_count],
+            "layer_ids": numpy.array(self._layer_ids, numpy.int64),
+            "layer_heights": numpy.array([layer.height for layer in layers], numpy.float32),
+            "layer_thicknesses": numpy.array([layer.thickness for layer in layers], numpy.float32),
+            "layer_element_counts": numpy.array([layer.elementCount for layer in layers], numpy.int64),
+            "vertices": self.getVertices() if self.getVertices() is not None else numpy.empty((0, 3), numpy.float32),
+            "colors": self.getColors() if self.getColors() is not None else numpy.empty((0, 4), numpy.float32),
+            "indices": self.getIndices() if self.getIndices() is not None else numpy.empty(0, numpy.int32)
+        }
+
+    ##  Create a copy of the layers that are built so far.
+    #
+    #   Points, polygons and mesh data are only ever appended to, so the copy shares
+    #   the arrays of this object instead of copying them. Layers that are added or
+    #   built afterwards do not show up in the copy, which makes it safe to hand to
+    #   the renderer while this object is still being filled.
+    #
+    #   \return A new LayerData object.
+    def createSnapshot(self):
+        return type(self).fromArrays(self.getArrays())
+
+    ##  Create a LayerData object from arrays created by getArrays().
+    #
+    #   The arrays are used as-is, so they can for example be memory-mapped from disk.
+    #   All layers of the result are considered built.
+    #
+    #   \param arrays A dict with names as keys and numpy arrays as values.
+    #   \return A new LayerData object.
+    @classmethod
+    def fromArrays(cls, arrays):
+        result = cls()
+        for layer, height, thickness, element_count in zip(arrays["layer_ids"], arrays["layer_heights"], arrays["layer_thicknesses"], arrays["layer_element_counts"]):
+            layer = int(layer)
+            result.addLayer(layer)
+            result.setLayerHeight(layer, float(height))
+            result.setLayerThickness(layer, float(thickness))
+            result.getLayer(layer).setElementCount(int(element_count))
+            result._element_counts[layer] = int(element_count)
+
+        result._points = arrays["points"]
+        result._point_count = len(arrays["points"])
+        result._polygon_starts = arrays["polygon_starts"]
+        result._polygon_types = arrays["polygon_types"]
+        result._polygon_line_widths = arrays["polygon_line_widths"]
+        result._polygon_layers = arrays["polygon_layers"]
+        result._polygon_count = len(arrays["polygon_types"])
+
+        if len(arrays["vertices"]) > 0:
+            result.addVertices(arrays["vertices"])
+            result.addColors(arrays["colors"])
+            result.addIndices(arrays["indices"])
+
+        return result
 
-        self.addVertices(vertices)
-        self.addColors(colors)
-        self.addIndices(indices.flatten())
+    ##  Get the indices of the points of a number of polygons, in order.
+    #
+    #   \param polygons The indices of the polygons.
+    #   \return A tuple of the point indices and the number of points of each polygon.
+    def getPointIndices(self, polygons):
+        starts = self._polygon_starts[polygons]
+        counts = self._polygon_starts[polygons + 1] - starts
+        offsets = numpy.cumsum(counts) - counts
+        return numpy.repeat(starts - offsets, counts) + numpy.arange(counts.sum()), counts
+
+    def _createLayerIndex(self):
+        count = self._polygon_count
+        layers = self._polygon_layers[:count]
+        if numpy.all(layers[1:] >= layers[:-1]):
+            order = numpy.arange(count)
+        else:
+            order = numpy.argsort(layers, kind = "mergesort") # Mergesort is stable, so polygons stay in the order they were added.
+
+        layer_starts = numpy.searchsorted(layers[order], numpy.arange(len(self._layer_ids) + 1))
+        layer_index = (count, order, layer_starts)
+        self._layer_index = layer_index
+        return layer_index
+
+##  Grow an array so it has room for at least a certain number of items.
+#
+#   The array is at least doubled in size to make repeated growing cheap.
+def _grow(array, size):
+    if size <= len(array):
+        return array
 
+    result = numpy.empty((max(size, len(array) * 2), ) + array.shape[1:], array.dtype)
+    result[:len(array)] = array
+    return result
+
+##  A single layer of a LayerData object.
 class Layer():
-    def __init__(self, id):
+    def __init__(self, layer_data, id, index):
+        self._layer_data = layer_data
         self._id = id
+        self._index = index
         self._height = 0.0
         self._thickness = 0.0
-        self._polygons = []
         self._element_count = 0
 
+    @property
+    def index(self):
+        return self._index
+
     @property
     def height(self):
         return self._height
@@ -85,7 +316,7 @@ class Layer():
 
     @property
     def polygons(self):
-        return self._polygons
+        return [Polygon(self._layer_data, polygon) for polygon in self._layer_data.getLayerPolygons(self._index)]
 
     @property
     def elementCount(self):
@@ -97,88 +328,125 @@ class Layer():
     def setThickness(self, thickness):
         self._thickness = thickness
 
-    def vertexCount(self):
-        result = 0
-        for polygon in self._polygons:
-            result += polygon.vertexCount()
+    def setElementCount(self, element_count):
+        self._element_count = element_count
 
-        return result
+    def vertexCount(self):
+        polygons = self._layer_data.getLayerPolygons(self._index)
+        starts = self._layer_data.getPolygonStarts()
+        return int((starts[polygons + 1] - starts[polygons]).sum())
 
     def build(self, offset, vertices, colors, indices):
-        result = offset
-        for polygon in self._polygons:
-            if polygon.type == Polygon.InfillType or polygon.type == Polygon.MoveCombingType or polygon.type == Polygon.MoveRetractionType:
-                continue
+        polygons = self._layer_data.getLayerPolygons(self._index)
+        types = self._layer_data.getPolygonTypes()[polygons]
+        polygons = polygons[(types != Polygon.InfillType) & (types != Polygon.MoveCombingType) & (types != Polygon.MoveRetractionType)]
 
-            polygon.build(result, vertices, colors, indices)
-            result += polygon.vertexCount()
-            self._element_count += polygon.elementCount
+        point_indices, counts = self._layer_data.getPointIndices(polygons)
+        polygons = polygons[counts > 0]
+        counts = counts[counts > 0]
+        if len(polygons) == 0:
+            return offset
+
+        # Build all polygons of this layer in one go instead of per polygon and per vertex.
+        begins = offset + numpy.cumsum(counts) - counts
+        ends = begins + counts - 1
+        result = offset + len(point_indices)
+
+        vertices[offset:result, :] = self._layer_data.getPoints()[point_indices]
+        colors[offset:result, :] = numpy.repeat(Polygon.getBuildColors(self._layer_data.getPolygonTypes()[polygons]), counts, axis = 0)
+
+        # Each vertex is connected to the next one, except for the last vertex of a polygon which connects back to its first vertex.
+        indices[offset:result, 0] = numpy.arange(offset, result)
+        indices[offset:result, 1] = numpy.arange(offset + 1, result + 1)
+        indices[ends, 1] = begins
+
+        self._element_count += len(point_indices) * 2 # Each vertex is used twice
 
         return result
 
     def createMesh(self):
         return self.createMeshOrJumps(True)
-        
+
     def createJumps(self):
         return self.createMeshOrJumps(False)
-        
-    def createMeshOrJumps(self, make_mesh):
-        builder = MeshBuilder()
-
-        for polygon in self._polygons:
-            if make_mesh and (polygon.type == Polygon.MoveCombingType or polygon.type == Polygon.MoveRetractionType):
-                continue
-            if not make_mesh and not (polygon.type == Polygon.MoveCombingType or polygon.type == Polygon.MoveRetractionType):
-                continue
-            
-            poly_color = polygon.getColor()
-
-            points = numpy.copy(polygon.data)
-            if polygon.type == Polygon.InfillType or polygon.type == Polygon.SkinType or polygon.type == Polygon.SupportInfillType:
-                points[:,1] -= 0.01
-            if polygon.type == Polygon.MoveCombingType or polygon.type == Polygon.MoveRetractionType:
-                points[:,1] += 0.01
-
-            # Calculate normals for the entire polygon using numpy.
-            normals = numpy.copy(points)
-            normals[:,1] = 0.0 # We are only interested in 2D normals
-
-            # Calculate the edges between points.
-            # The call to numpy.roll shifts the entire array by one so that
-            # we end up subtracting each next point from the current, wrapping
-            # around. This gives us the edges from the next point to the current
-            # point.
-            normals[:] = normals[:] - numpy.roll(normals, -1, axis = 0)
-            # Calculate the length of each edge using standard Pythagoras
-            lengths = numpy.sqrt(normals[:,0] ** 2 + normals[:,2] ** 2)
-            # The normal of a 2D vector is equal to its x and y coordinates swapped
-            # and then x inverted. This code does that.
-            normals[:,[0, 2]] = normals[:,[2, 0]]
-            normals[:,0] *= -1
-
-            # Normalize the normals.
-            normals[:,0] /= lengths
-            normals[:,2] /= lengths
-
-            # Scale all by the line width of the polygon so we can easily offset.
-            normals *= (polygon.lineWidth / 2)
-
-            #TODO: Use numpy magic to perform the vertex creation to speed up things.
-            for i in range(len(points)):
-                start = points[i - 1]
-                end = points[i]
-
-                normal = normals[i - 1]
-
-                point1 = Vector(data = start - normal)
-                point2 = Vector(data = start + normal)
-                point3 = Vector(data = end + normal)
-                point4 = Vector(data = end - normal)
-
-                builder.addQuad(point1, point2, point3, point4, color = poly_color)
-
-        return builder.getData()
 
+    def createMeshOrJumps(self, make_mesh):
+        polygons = self._layer_data.getLayerPolygons(self._index)
+        types = self._layer_data.getPolygonTypes()[polygons]
+        is_move = (types == Polygon.MoveCombingType) | (types == Polygon.MoveRetractionType)
+        if make_mesh:
+            polygons = polygons[~is_move]
+        else:
+            polygons = polygons[is_move]
+
+        mesh = MeshData()
+        point_indices, counts = self._layer_data.getPointIndices(polygons)
+        polygons = polygons[counts > 0]
+        counts = counts[counts > 0]
+        if len(polygons) == 0:
+            return mesh
+
+        # All points of all polygons are processed in one go. Per-polygon values are
+        # expanded to per-point values by repeating them for every point of the polygon.
+        types = self._layer_data.getPolygonTypes()[polygons]
+        begins = numpy.cumsum(counts) - counts
+        ends = begins + counts - 1
+
+        points = self._layer_data.getPoints()[point_indices]
+        points[:,1] += numpy.repeat(Polygon.getHeightOffsets(types), counts)
+
+        # Indices of the next and previous point of every point, wrapping around within each polygon.
+        next_indices = numpy.arange(1, len(points) + 1)
+        next_indices[ends] = begins
+        previous_indices = numpy.arange(-1, len(points) - 1)
+        previous_indices[begins] = ends
+
+        # Calculate normals for all polygons using numpy.
+        normals = numpy.copy(points)
+        normals[:,1] = 0.0 # We are only interested in 2D normals
+
+        # Calculate the edges between points.
+        # Subtracting each next point from the current one gives us the edges
+        # from the next point to the current point.
+        normals[:] = normals[:] - normals[next_indices]
+        # Calculate the length of each edge using standard Pythagoras
+        lengths = numpy.sqrt(normals[:,0] ** 2 + normals[:,2] ** 2)
+        # The normal of a 2D vector is equal to its x and y coordinates swapped
+        # and then x inverted. This code does that.
+        normals[:,[0, 2]] = normals[:,[2, 0]]
+        normals[:,0] *= -1
+
+        # Normalize the normals.
+        normals[:,0] /= lengths
+        normals[:,2] /= lengths
+
+        # Scale all by the line width of their polygon so we can easily offset.
+        normals *= numpy.repeat(self._layer_data.getPolygonLineWidths()[polygons] / 2, counts)[:, numpy.newaxis]
+
+        # Create a quad for each edge, going from the previous point to the current point.
+        # Every quad is made of two triangles, so it takes six vertices.
+        starts = points[previous_indices]
+        start_normals = normals[previous_indices]
+
+        point1 = starts - start_normals
+        point2 = starts + start_normals
+        point3 = points + start_normals
+        point4 = points - start_normals
+
+        quads = numpy.empty((len(points), 6, 3), numpy.float32)
+        quads[:, 0] = point1
+        quads[:, 1] = point3
+        quads[:, 2] = point2
+        quads[:, 3] = point1
+        quads[:, 4] = point4
+        quads[:, 5] = point3
+
+        mesh.addVertices(quads.reshape((-1, 3)))
+        mesh.addColors(numpy.repeat(Polygon.getColors(types), counts * 6, axis = 0))
+
+        return mesh
+
+##  A single polygon of a LayerData object.
 class Polygon():
     NoneType = 0
     Inset0Type = 1
@@ -191,72 +459,83 @@ class Polygon():
     MoveCombingType = 8
     MoveRetractionType = 9
 
-    def __init__(self, mesh, type, data, line_width):
+    # The color of each polygon type, indexed by type. Types that are not listed are white.
+    _type_colors = numpy.ones((256, 4), numpy.float32)
+    _type_colors[Inset0Type] = [1.0, 0.0, 0.0, 1.0]
+    _type_colors[InsetXType] = [0.0, 1.0, 0.0, 1.0]
+    _type_colors[SkinType] = [1.0, 1.0, 0.0, 1.0]
+    _type_colors[SupportType] = [0.0, 1.0, 1.0, 1.0]
+    _type_colors[SkirtType] = [0.0, 1.0, 1.0, 1.0]
+    _type_colors[InfillType] = [1.0, 0.74, 0.0, 1.0]
+    _type_colors[SupportInfillType] = [0.0, 1.0, 1.0, 1.0]
+    _type_colors[MoveCombingType] = [0.0, 0.0, 1.0, 1.0]
+    _type_colors[MoveRetractionType] = [0.5, 0.5, 1.0, 1.0]
+
+    # The vertical offset used when creating a mesh of each polygon type, so overlapping types do not z-fight.
+    _type_height_offsets = numpy.zeros(256, numpy.float32)
+    _type_height_offsets[InfillType] = -0.01
+    _type_height_offsets[SkinType] = -0.01
+    _type_height_offsets[SupportInfillType] = -0.01
+    _type_height_offsets[MoveCombingType] = 0.01
+    _type_height_offsets[MoveRetractionType] = 0.01
+
+    def __init__(self, layer_data, index):
         super().__init__()
-        self._mesh = mesh
-        self._type = type
-        self._data = data
-        self._line_width = line_width / 1000
+        self._layer_data = layer_data
+        self._index = index
 
     def build(self, offset, vertices, colors, indices):
-        self._begin = offset
-
-        color = self.getColor()
-        color.setValues(color.r * 0.5, color.g * 0.5, color.b * 0.5, color.a)
-
-        for i in range(len(self._data)):
-            vertices[offset + i, :] = self._data[i, :]
-            colors[offset + i, 0] = color.r
-            colors[offset + i, 1] = color.g
-            colors[offset + i, 2] = color.b
-            colors[offset + i, 3] = color.a
+        begin = offset
+        end = offset + self.vertexCount() - 1
 
-        self._end = self._begin + len(self._data) - 1
+        vertices[begin:end + 1, :] = self.data
+        colors[begin:end + 1, :] = self.getBuildColors(self.type)
 
-        for i in range(self._begin, self._end):
-            indices[i, 0] = i
-            indices[i, 1] = i + 1
-
-        indices[self._end, 0] = self._end
-        indices[self._end, 1] = self._begin
+        indices[begin:end + 1, 0] = numpy.arange(begin, end + 1)
+        indices[begin:end, 1] = numpy.arange(begin + 1, end + 1)
+        indices[end, 1] = begin
 
     def getColor(self):
-        if self._type == self.Inset0Type:
-            return Color(1.0, 0.0, 0.0, 1.0)
-        elif self._type == self.InsetXType:
-            return Color(0.0, 1.0, 0.0, 1.0)
-        elif self._type == self.SkinType:
-            return Color(1.0, 1.0, 0.0, 1.0)
-        elif self._type == self.SupportType:
-            return Color(0.0, 1.0, 1.0, 1.0)
-        elif self._type == self.SkirtType:
-            return Color(0.0, 1.0, 1.0, 1.0)
-        elif self._type == self.InfillType:
-            return Color(1.0, 0.74, 0.0, 1.0)
-        elif self._type == self.SupportInfillType:
-            return Color(0.0, 1.0, 1.0, 1.0)
-        elif self._type == self.MoveCombingType:
-            return Color(0.0, 0.0, 1.0, 1.0)
-        elif self._type == self.MoveRetractionType:
-            return Color(0.5, 0.5, 1.0, 1.0)
-        else:
-            return Color(1.0, 1.0, 1.0, 1.0)
+        color = self._type_colors[self.type]
+        return Color(color[0], color[1], color[2], color[3])
+
+    ##  Get the colors of a number of polygon types.
+    #
+    #   \param types A numpy array of polygon types.
+    #   \return A numpy array with a row of red, green, blue and alpha components per type.
+    @classmethod
+    def getColors(cls, types):
+        return cls._type_colors[types]
+
+    ##  Get the colors used for a number of polygon types in the built layer mesh.
+    #
+    #   This is the same as getColors() but with the color components darkened.
+    @classmethod
+    def getBuildColors(cls, types):
+        return cls._type_colors[types] * numpy.array([0.5, 0.5, 0.5, 1.0], numpy.float32)
+
+    ##  Get the vertical offset used when creating a mesh for a number of polygon types.
+    @classmethod
+    def getHeightOffsets(cls, types):
+        return cls._type_height_offsets[types]
 
     def vertexCount(self):
-        return len(self._data)
+        starts = self._layer_data.getPolygonStarts()
+        return int(starts[self._index + 1] - starts[self._index])
 
     @property
     def type(self):
-        return self._type
+        return int(self._layer_data.getPolygonTypes()[self._index])
 
     @property
     def data(self):
-        return self._data
+        starts = self._layer_data.getPolygonStarts()
+        return self._layer_data.getPoints()[starts[self._index]:starts[self._index + 1]]
 
     @property
     def elementCount(self):
-        return ((self._end - self._begin) + 1) * 2 #The range of vertices multiplied by 2 since each vertex is used twice
+        return self.vertexCount() * 2 #The range of vertices multiplied by 2 since each vertex is used twice
 
     @property
     def lineWidth(self):
-        return self._line_width
+        return float(self._layer_data.getPolygonLineWidths()[self._index])
@@ -0,0 +1,31 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import hashlib
+import threading
+import weakref
+
+##  Digests of the vertex data of meshes, by MeshData object.
+_hashes = weakref.WeakKeyDictionary()
+_hashes_lock = threading.Lock()
+
+##  Get a digest of the vertices of a mesh.
+#
+#   Identical meshes, for example copies of the same object or a file that was loaded
+#   twice, have the same digest, so results computed for one can be used for the others.
+#   The digest is computed once per MeshData object, since mesh data is not changed
+#   after it is loaded.
+#
+#   \param mesh_data The MeshData to get the digest of.
+#   \return The SHA-1 digest of the vertex data, as bytes.
+def getMeshHash(mesh_data):
+    with _hashes_lock:
+        digest = _hashes.get(mesh_data)
+    if digest is not None:
+        return digest
+
+    vertices = mesh_data.getVertices()
+    digest = hashlib.sha1(vertices.tobytes() if vertices is not None else b"").digest()
+    with _hashes_lock:
+        _hashes[mesh_data] = digest
+    return digest
@@ -3,9 +3,12 @@
 
 from UM.Scene.Iterator import Iterator
 from UM.Scene.SceneNode import SceneNode
-from functools import cmp_to_key
 from UM.Application import Application
 
+from . import PolygonIntersection
+
+import numpy
+
 ## Iterator that returns a list of nodes in the order that they need to be printed
 #  If there is no solution an empty list is returned.
 #  Take note that the list of nodes can have children (that may or may not contain mesh data)
@@ -33,78 +36,42 @@ class OneAtATimeIterator(Iterator.Iterator):
         self._original_node_list = node_list[:]
         
         ## Initialise the hit map (pre-compute all hits between all objects)
-        self._hit_map = [[self._checkHit(j,i) for i in node_list] for j in node_list]
-        
-        # Check if we have to files that block eachother. If this is the case, there is no solution!
-        for a in range(0,len(node_list)):
-            for b in range(0,len(node_list)):
-                if a != b and self._hit_map[a][b] and self._hit_map[b][a]:
-                    return 
-        
-        # Sort the original list so that items that block the most other objects are at the beginning.
-        # This does not decrease the worst case running time, but should improve it in most cases.
-        sorted(node_list, key = cmp_to_key(self._calculateScore))
+        # An object whose boundary hits the head hull of another object needs to be printed before it.
+        boundaries = [node.callDecoration("getConvexHullBoundary").getPoints() for node in node_list]
+        heads = [node.callDecoration("getConvexHullHead").getPoints() for node in node_list]
+        self._hit_map = PolygonIntersection.getIntersectionMatrix(boundaries, heads)
+        numpy.fill_diagonal(self._hit_map, False)
 
-        todo_node_list = [_objectOrder([], node_list)]
-        while len(todo_node_list) > 0:
-            current = todo_node_list.pop()
-            for node in current.todo:
-                # Check if the object can be placed with what we have and still allows for a solution in the future
-                if not self._checkHitMultiple(node, current.order) and not self._checkBlockMultiple(node, current.todo):
-                    # We found a possible result. Create new todo & order list.
-                    new_todo_list = current.todo[:]
-                    new_todo_list.remove(node)
-                    new_order = current.order[:] + [node]
-                    if len(new_todo_list) == 0: 
-                        # We have no more nodes to check, so quit looking.
-                        todo_node_list = None
-                        self._node_stack = new_order
-                        
-                        return
-                    todo_node_list.append(_objectOrder(new_order, new_todo_list))
-        self._node_stack = [] #No result found!        
+        order = self._findOrder(self._hit_map)
+        if order is None:
+            self._node_stack = [] #No result found!
+            return
 
-    
-    # Check if first object can be printed before the provided list (using the hit map)
-    def _checkHitMultiple(self, node, other_nodes):
-        node_index = self._original_node_list.index(node)
-        for other_node in other_nodes:
-            if self._hit_map[node_index][self._original_node_list.index(other_node)]:
-                return True
-        return False
-    
-    def _checkBlockMultiple(self, node, other_nodes):
-        node_index = self._original_node_list.index(node)
-        for other_node in other_nodes:
-            if self._hit_map[self._original_node_list.index(other_node)][node_index] and node_index != self._original_node_list.index(other_node):
-                return True
-        return False
-    
-    ##  Calculate score simply sums the number of other objects it 'blocks'
-    def _calculateScore(self, a, b):
-        score_a = sum(self._hit_map[self._original_node_list.index(a)])
-        score_b = sum(self._hit_map[self._original_node_list.index(b)])
-        return score_a - score_b
-    
-    #   Checks if A can be printed before B
-    def _checkHit(self, a, b):
-        if a == b:
-            return False
-        
-        overlap = a.callDecoration("getConvexHullBoundary").intersectsPolygon(b.callDecoration("getConvexHullHead"))
-        if overlap:
-            return True
-        else: 
-            return False
-        
+        self._node_stack = [node_list[index] for index in order]
 
-## Internal object used to keep track of a possible order in which to print objects.      
-class _objectOrder():
-    def __init__(self, order, todo):
-        """
-        :param order:   List of indexes in which to print objects, ordered by printing order.
-        :param todo:    List of indexes which are not yet inserted into the order list.
-        """
-        self.order = order
-        self.todo = todo
-        
+    ##  Find an order in which to print the objects, such that no object hits an object that was printed before it.
+    #
+    #   This is a topological sort of the graph in which every hit is an edge. When there are multiple objects that
+    #   can be printed next, the one that blocks the most other objects is picked.
+    #
+    #   \param hit_map Square boolean numpy array. hit_map[a][b] is True if a needs to be printed before b.
+    #   \return A list with the indices of the objects in the order to print them, or None if the hits form a cycle.
+    def _findOrder(self, hit_map):
+        # Number of objects that still need to be printed before each object.
+        blocked_by = hit_map.sum(axis = 0)
+        # Sort the objects so that items that block the most other objects are at the beginning.
+        score = hit_map.sum(axis = 1)
+        done = numpy.zeros(len(hit_map), dtype = bool)
+
+        order = []
+        for _ in range(len(hit_map)):
+            candidates = numpy.where(done | (blocked_by > 0), -1, score)
+            index = int(numpy.argmax(candidates))
+            if candidates[index] < 0:
+                return None # Every remaining object needs another remaining object to be printed first.
+
+            order.append(index)
+            done[index] = True
+            blocked_by -= hit_map[index]
+
+        return order
@@ -12,15 +12,20 @@ from UM.Math.AxisAlignedBox import AxisAlignedBox
 from UM.Application import Application
 from UM.Scene.Selection import Selection
 from UM.Preferences import Preferences
+from UM.Logger import Logger
 
 from cura.ConvexHullDecorator import ConvexHullDecorator
 
 from . import PlatformPhysicsOperation
 from . import ConvexHullJob
+from . import ConvexHullNode
+from . import SpatialHash
+from . import PolygonIntersection
 
 import time
 import threading
 import copy
+import numpy
 
 class PlatformPhysics:
     def __init__(self, controller, volume):
@@ -33,6 +38,15 @@ class PlatformPhysics:
 
         self._enabled = True
 
+        # Grid of the bounding boxes of the convex hulls, to quickly find the nodes a node might collide with.
+        self._hull_grid = SpatialHash.SpatialHash()
+
+        # Nodes that changed since the last pass, and the parent of every node during the last pass.
+        # Only changed nodes and the nodes near them are checked again.
+        self._dirty_nodes = set()
+        self._all_dirty = True
+        self._known_nodes = {}
+
         self._change_timer = QTimer()
         self._change_timer.setInterval(100)
         self._change_timer.setSingleShot(True)
@@ -41,25 +55,51 @@ class PlatformPhysics:
         Preferences.getInstance().addPreference("physics/automatic_push_free", True)
 
     def _onSceneChanged(self, source):
+        # A changed convex hull means the node it belongs to needs to be checked again.
+        if type(source) is ConvexHullNode.ConvexHullNode:
+            source = source.getWatchedNode()
+
+        if source is self._build_volume:
+            self._all_dirty = True
+        else:
+            self._dirty_nodes.add(source)
+
         self._change_timer.start()
 
     def _onChangeTimerFinished(self):
         if not self._enabled:
             return
 
+        start_time = time.time()
+
         root = self._controller.getScene().getRoot()
-        for node in BreadthFirstIterator(root):
-            if node is root or type(node) is not SceneNode:
+        nodes = [node for node in BreadthFirstIterator(root) if node is not root and type(node) is SceneNode]
+        self._updateHullGrid(nodes)
+        # Collisions are handled in the order the nodes were iterated in, so the result does not depend on the order of the grid.
+        node_order = { node: index for index, node in enumerate(nodes) }
+
+        checked_nodes = self._getNodesToCheck(nodes)
+        # Nodes stay dirty until they have been checked, so nodes that were skipped are checked in the next pass.
+        self._dirty_nodes = set(checked_nodes)
+        self._all_dirty = False
+        self._known_nodes = { node: node.getParent() for node in nodes }
+
+        hull_hits = self._getHullHits(checked_nodes)
+
+        build_volume_bounding_box = copy.deepcopy(self._build_volume.getBoundingBox())
+        build_volume_bounding_box.setBottom(-9001) # Ignore intersections with the bottom
+
+        for node in nodes:
+            if node not in checked_nodes:
                 continue
+            self._dirty_nodes.discard(node)
 
             bbox = node.getBoundingBox()
             if not bbox or not bbox.isValid():
+                self._dirty_nodes.add(node)
                 self._change_timer.start()
                 continue
 
-            build_volume_bounding_box = copy.deepcopy(self._build_volume.getBoundingBox())
-            build_volume_bounding_box.setBottom(-9001) # Ignore intersections with the bottom
-
             # Mark the node as outside the build volume if the bounding box test fails.
             if build_volume_bounding_box.intersectsBox(bbox) != AxisAlignedBox.IntersectionResult.FullIntersection:
                 node._outside_buildarea = True
@@ -87,29 +127,32 @@ class PlatformPhysics:
             elif Selection.isSelected(node):
                 pass
             elif Preferences.getInstance().getValue("physics/automatic_push_free"):
-                # Check for collisions between convex hulls
-                for other_node in BreadthFirstIterator(root):
-                    # Ignore root, ourselves and anything that is not a normal SceneNode.
-                    if other_node is root or type(other_node) is not SceneNode or other_node is node:
+                # Check for collisions between convex hulls.
+                # Only nodes whose hull bounding box overlaps that of this node can collide with it.
+                node_box = self._hull_grid.getBox(node)
+                candidates = self._hull_grid.query(node_box) if node_box else []
+                for other_node in sorted(candidates, key = node_order.get):
+                    # Ignore ourselves.
+                    if other_node is node:
                         continue
-                    
-                    # Ignore colissions of a group with it's own children
-                    if other_node in node.getAllChildren() or node in other_node.getAllChildren():
-                        continue
-                    
+
                     # Ignore colissions within a group
                     if other_node.getParent().callDecoration("isGroup") is not None or node.getParent().callDecoration("isGroup") is not None:
                         continue
                         #if node.getParent().callDecoration("isGroup") is other_node.getParent().callDecoration("isGroup"):
                         #    continue
-                    
+
+                    # Ignore colissions of a group with it's own children
+                    if other_node in node.getAllChildren() or node in other_node.getAllChildren():
+                        continue
+
                     # Ignore nodes that do not have the right properties set.
                     if not other_node.callDecoration("getConvexHull") or not other_node.getBoundingBox():
                         continue
 
-                    # Check to see if the bounding boxes intersect. If not, we can ignore the node as there is no way the hull intersects.
-                    #if node.getBoundingBox().intersectsBox(other_node.getBoundingBox()) == AxisAlignedBox.IntersectionResult.NoIntersection:
-                    #    continue
+                    # Only compute the overlap distance for hulls that intersect.
+                    if (node, other_node) not in hull_hits:
+                        continue
 
                     # Get the overlap distance for both convex hulls. If this returns None, there is no intersection.
                     try:
@@ -145,6 +188,106 @@ class PlatformPhysics:
                 op = PlatformPhysicsOperation.PlatformPhysicsOperation(node, move_vector)
                 op.push()
 
+        Logger.log("d", "Platform physics checked %s of %s nodes in %s seconds", len(checked_nodes), len(nodes), time.time() - start_time)
+
+    ##  Find the pairs of nodes whose convex hulls intersect, for all pairs that can collide in this pass.
+    #
+    #   A pair intersects if the head hull of the first node intersects the convex hull of the second node or the other
+    #   way around. Only the candidates that the hull grid finds for the checked nodes are tested, all at once. The exact
+    #   overlap is only computed for the pairs that intersect.
+    #
+    #   \param checked_nodes The nodes that are checked in this pass.
+    #   \return A set of (node, other_node) tuples.
+    def _getHullHits(self, checked_nodes):
+        hull_nodes = []
+        node_indices = {}
+        pairs = []
+        for node in checked_nodes:
+            box = self._hull_grid.getBox(node)
+            if not box or not node.callDecoration("getConvexHull"):
+                continue
+
+            for other_node in self._hull_grid.query(box):
+                if other_node is node or not other_node.callDecoration("getConvexHull"):
+                    continue
+
+                for pair_node in (node, other_node):
+                    if pair_node not in node_indices:
+                        node_indices[pair_node] = len(hull_nodes)
+                        hull_nodes.append(pair_node)
+                pairs.append((node_indices[node], node_indices[other_node]))
+
+        if not pairs:
+            return set()
+
+        hulls = [node.callDecoration("getConvexHull").getPoints() for node in hull_nodes]
+        heads = [node.callDecoration("getConvexHullHead").getPoints() for node in hull_nodes]
+
+        hits = PolygonIntersection.getPairIntersections(heads, hulls, pairs) | PolygonIntersection.getPairIntersections(hulls, heads, pairs)
+        return { (hull_nodes[pairs[index][0]], hull_nodes[pairs[index][1]]) for index in numpy.nonzero(hits)[0] }
+
+    ##  Get the nodes that need to be checked in this pass.
+    #
+    #   These are the nodes that changed since the last pass, new nodes, nodes that were moved to another parent and
+    #   the nodes whose convex hull is near the convex hull of any of those, since they may need to be pushed away.
+    #
+    #   \param nodes The scene nodes that are currently in the scene.
+    #   \return A set of scene nodes.
+    def _getNodesToCheck(self, nodes):
+        if self._all_dirty:
+            return set(nodes)
+
+        changed_nodes = set()
+        for node in nodes:
+            if node in self._dirty_nodes or node not in self._known_nodes or self._known_nodes[node] is not node.getParent():
+                changed_nodes.add(node)
+
+        checked_nodes = set(changed_nodes)
+        for node in changed_nodes:
+            box = self._hull_grid.getBox(node)
+            if box:
+                checked_nodes.update(self._hull_grid.query(box))
+
+        return checked_nodes
+
+    ##  Update the grid of convex hull bounding boxes with the current hulls of the nodes.
+    #
+    #   Nodes that moved are moved in the grid, nodes that were removed from the scene or have no hull are removed from it.
+    #
+    #   \param nodes The scene nodes that are currently in the scene.
+    def _updateHullGrid(self, nodes):
+        current_nodes = set()
+        for node in nodes:
+            box = self._getHullBox(node)
+            if box is None:
+                continue
+
+            self._hull_grid.update(node, box)
+            current_nodes.add(node)
+
+        for node in self._hull_grid.getObjects():
+            if node not in current_nodes:
+                self._hull_grid.remove(node)
+
+    ##  Get the bounding box of the convex hull of a node, including the hull of the print head if it has one.
+    #
+    #   \return A tuple (min_x, min_y, max_x, max_y), or None if the node has no valid convex hull.
+    def _getHullBox(self, node):
+        hull = node.callDecoration("getConvexHull")
+        if not hull:
+            return None
+
+        points = hull.getPoints()
+        head_hull = node.callDecoration("getConvexHullHead")
+        if head_hull and len(head_hull.getPoints()) > 0:
+            points = numpy.concatenate((points, head_hull.getPoints()))
+        if len(points) == 0:
+            return None
+
+        minimum = points.min(axis = 0)
+        maximum = points.max(axis = 0)
+        return (float(minimum[0]), float(minimum[1]), float(maximum[0]), float(maximum[1]))
+
     def _onToolOperationStarted(self, tool):
         self._enabled = False
 
@@ -0,0 +1,138 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import numpy
+
+##  Maximum number of values in the intermediate arrays of getIntersectionMatrix, to limit memory use.
+_max_chunk_values = 4 * 1024 * 1024
+
+##  Check which convex polygons of one list intersect which convex polygons of another list.
+#
+#   This uses the separating axis theorem for all pairs at once: two convex polygons
+#   do not intersect if the projections of both on the normal of one of their edges
+#   do not overlap. Polygons that only touch do not intersect.
+#
+#   \param polygons_a A list of numpy arrays with the points of convex polygons, in order.
+#   \param polygons_b A list of numpy arrays with the points of convex polygons, in order.
+#   \return A boolean numpy array of shape (len(polygons_a), len(polygons_b)). Element [i][j] is True if polygon i of
+#           polygons_a intersects polygon j of polygons_b.
+def getIntersectionMatrix(polygons_a, polygons_b):
+    result = numpy.zeros((len(polygons_a), len(polygons_b)), dtype = bool)
+    if len(polygons_a) == 0 or len(polygons_b) == 0:
+        return result
+
+    points_a, empty_a = _padPolygons(polygons_a)
+    points_b, empty_b = _padPolygons(polygons_b)
+    normals_a, valid_a = _getEdgeNormals(points_a)
+    normals_b, valid_b = _getEdgeNormals(points_b)
+
+    # Projections of each polygon on its own edge normals, of shape (polygons, normals).
+    own_min_a, own_max_a = _project(points_a[:, numpy.newaxis], normals_a[:, numpy.newaxis])
+    own_min_a, own_max_a = own_min_a[:, 0], own_max_a[:, 0]
+    own_min_b, own_max_b = _project(points_b[:, numpy.newaxis], normals_b[:, numpy.newaxis])
+    own_min_b, own_max_b = own_min_b[:, 0], own_max_b[:, 0]
+
+    values_per_row = len(polygons_b) * points_a.shape[1] * points_b.shape[1]
+    chunk_size = max(1, _max_chunk_values // values_per_row)
+    for start in range(0, len(polygons_a), chunk_size):
+        end = min(start + chunk_size, len(polygons_a))
+
+        # Project the polygons of b on the normals of the polygons of a, of shape (chunk, len(polygons_b), normals).
+        min_b, max_b = _project(points_b[numpy.newaxis], normals_a[start:end, numpy.newaxis])
+        separated = (max_b <= own_min_a[start:end, numpy.newaxis]) | (own_max_a[start:end, numpy.newaxis] <= min_b)
+        separated_a = (separated & valid_a[start:end, numpy.newaxis]).any(axis = 2)
+
+        # Project the polygons of a on the normals of the polygons of b.
+        min_a, max_a = _project(points_a[start:end, numpy.newaxis], normals_b[numpy.newaxis])
+        separated = (max_a <= own_min_b[numpy.newaxis]) | (own_max_b[numpy.newaxis] <= min_a)
+        separated_b = (separated & valid_b[numpy.newaxis]).any(axis = 2)
+
+        result[start:end] = ~(separated_a | separated_b)
+
+    result[empty_a] = False
+    result[:, empty_b] = False
+    return result
+
+##  Check which pairs of convex polygons intersect, for a list of pairs.
+#
+#   This uses the same separating axis test as getIntersectionMatrix, but only for the
+#   given pairs, so the work grows with the number of pairs instead of with the
+#   product of the lengths of both lists.
+#
+#   \param polygons_a A list of numpy arrays with the points of convex polygons, in order.
+#   \param polygons_b A list of numpy arrays with the points of convex polygons, in order.
+#   \param pairs A sequence of (index_a, index_b) tuples, or an integer numpy array of shape (pairs, 2).
+#   \return A boolean numpy array of length len(pairs). Element [k] is True if polygon pairs[k][0] of polygons_a
+#           intersects polygon pairs[k][1] of polygons_b.
+def getPairIntersections(polygons_a, polygons_b, pairs):
+    pairs = numpy.asarray(pairs, dtype = numpy.int64).reshape(-1, 2)
+    result = numpy.zeros(len(pairs), dtype = bool)
+    if len(pairs) == 0:
+        return result
+
+    points_a, empty_a = _padPolygons(polygons_a)
+    points_b, empty_b = _padPolygons(polygons_b)
+    normals_a, valid_a = _getEdgeNormals(points_a)
+    normals_b, valid_b = _getEdgeNormals(points_b)
+
+    # Projections of each polygon on its own edge normals, of shape (polygons, normals).
+    own_min_a, own_max_a = _project(points_a, normals_a)
+    own_min_b, own_max_b = _project(points_b, normals_b)
+
+    values_per_pair = points_a.shape[1] * points_b.shape[1]
+    chunk_size = max(1, _max_chunk_values // values_per_pair)
+    for start in range(0, len(pairs), chunk_size):
+        end = min(start + chunk_size, len(pairs))
+        index_a = pairs[start:end, 0]
+        index_b = pairs[start:end, 1]
+
+        # Project polygon b of every pair on the normals of polygon a, of shape (chunk, normals).
+        min_b, max_b = _project(points_b[index_b], normals_a[index_a])
+        separated = (max_b <= own_min_a[index_a]) | (own_max_a[index_a] <= min_b)
+        separated_a = (separated & valid_a[index_a]).any(axis = 1)
+
+        # Project polygon a of every pair on the normals of polygon b.
+        min_a, max_a = _project(points_a[index_a], normals_b[index_b])
+        separated = (max_a <= own_min_b[index_b]) | (own_max_b[index_b] <= min_a)
+        separated_b = (separated & valid_b[index_b]).any(axis = 1)
+
+        result[start:end] = ~(separated_a | separated_b | empty_a[index_a] | empty_b[index_b])
+
+    return result
+
+##  Stack polygons with different numbers of points into one array.
+#
+#   Shorter polygons are padded by repeating their last point, which does not change
+#   their projections.
+#
+#   \return A tuple with an array of shape (polygons, points, 2) and a boolean array that is True for empty polygons.
+def _padPolygons(polygons):
+    length = max(1, max(len(polygon) for polygon in polygons))
+    points = numpy.zeros((len(polygons), length, 2), dtype = numpy.float64)
+    empty = numpy.zeros(len(polygons), dtype = bool)
+    for index, polygon in enumerate(polygons):
+        if len(polygon) == 0:
+            empty[index] = True
+            continue
+        points[index, :len(polygon)] = polygon
+        points[index, len(polygon):] = polygon[-1]
+    return points, empty
+
+##  Get the normals of the edges of padded polygons.
+#
+#   \return A tuple with an array of shape (polygons, points, 2) and a boolean array that is False for the normals of
+#           edges without length, which can not separate polygons.
+def _getEdgeNormals(points):
+    edges = numpy.roll(points, -1, axis = 1) - points
+    normals = numpy.stack((-edges[:, :, 1], edges[:, :, 0]), axis = 2)
+    valid = (normals != 0).any(axis = 2)
+    return normals, valid
+
+##  Project points on normals.
+#
+#   \param points Array of shape (..., points, 2).
+#   \param normals Array of shape (..., normals, 2), broadcastable against the points.
+#   \return The minimum and maximum of the projections, of shape (..., normals).
+def _project(points, normals):
+    projections = numpy.matmul(normals, numpy.swapaxes(points, -1, -2))
+    return projections.min(axis = -1), projections.max(axis = -1)
@@ -0,0 +1,100 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import math
+
+##  A uniform grid over 2D axis-aligned bounding boxes.
+#
+#   Objects are stored in every grid cell their bounding box overlaps, so finding
+#   the objects that may overlap a box only needs to look at the cells that box
+#   covers instead of at all objects. Objects can be moved by updating their box,
+#   which only touches the cells of the old and new box.
+class SpatialHash:
+    ##  Create an empty grid.
+    #
+    #   \param cell_size The size of the grid cells. This should be about the size of a typical box.
+    def __init__(self, cell_size = 20.0):
+        self._cell_size = cell_size
+        self._cells = {}
+        self._boxes = {}
+
+    def getCellSize(self):
+        return self._cell_size
+
+    ##  Get all objects in the grid.
+    def getObjects(self):
+        return list(self._boxes.keys())
+
+    ##  Get the bounding box of an object.
+    #
+    #   \return A tuple (min_x, min_y, max_x, max_y), or None if the object is not in the grid.
+    def getBox(self, obj):
+        return self._boxes.get(obj)
+
+    ##  Add an object to the grid, or move it if it is already in the grid.
+    #
+    #   \param obj The object to add. It should be hashable.
+    #   \param box The bounding box of the object, a tuple (min_x, min_y, max_x, max_y).
+    def update(self, obj, box):
+        old_box = self._boxes.get(obj)
+        if old_box == box:
+            return
+
+        if old_box is not None:
+            old_cells = self._getCells(old_box)
+            new_cells = self._getCells(box)
+            if old_cells == new_cells:
+                self._boxes[obj] = box
+                return
+            self.remove(obj)
+
+        self._boxes[obj] = box
+        for cell in self._getCells(box):
+            self._cells.setdefault(cell, set()).add(obj)
+
+    ##  Remove an object from the grid.
+    #
+    #   Removing an object that is not in the grid does nothing.
+    def remove(self, obj):
+        box = self._boxes.pop(obj, None)
+        if box is None:
+            return
+
+        for cell in self._getCells(box):
+            objects = self._cells.get(cell)
+            if objects is None:
+                continue
+            objects.discard(obj)
+            if not objects:
+                del self._cells[cell]
+
+    ##  Get the objects whose bounding box overlaps a box.
+    #
+    #   Boxes that only touch are considered to overlap.
+    #
+    #   \param box The box to check, a tuple (min_x, min_y, max_x, max_y).
+    #   \return A set of objects.
+    def query(self, box):
+        candidates = set()
+        for cell in self._getCells(box):
+            objects = self._cells.get(cell)
+            if objects:
+                candidates.update(objects)
+
+        min_x, min_y, max_x, max_y = box
+        result = set()
+        for obj in candidates:
+            other_min_x, other_min_y, other_max_x, other_max_y = self._boxes[obj]
+            if other_min_x <= max_x and min_x <= other_max_x and other_min_y <= max_y and min_y <= other_max_y:
+                result.add(obj)
+
+        return result
+
+    ##  Get the cells a box covers, as a list of (column, row) tuples.
+    def _getCells(self, box):
+        min_x, min_y, max_x, max_y = box
+        first_column = math.floor(min_x / self._cell_size)
+        last_column = math.floor(max_x / self._cell_size)
+        first_row = math.floor(min_y / self._cell_size)
+        last_row = math.floor(max_y / self._cell_size)
+        return [(column, row) for column in range(first_column, last_column + 1) for row in range(first_row, last_row + 1)]
@@ -17,10 +17,15 @@ from cura.OneAtATimeIterator import OneAtATimeIterator
 from . import Cura_pb2
 from . import ProcessSlicedObjectListJob
 from . import ProcessGCodeJob
+from . import LayerDataCache
+from . import LoadSliceResultJob
+from . import SliceCache
+from . import StartSliceJob
+from . import StoreSliceResultJob
 
 import os
 import sys
-import numpy
+import time
 
 from PyQt5.QtCore import QTimer
 
@@ -48,7 +53,32 @@ class CuraEngineBackend(Backend):
         Application.getInstance().getController().activeViewChanged.connect(self._onActiveViewChanged)
         self._onActiveViewChanged()
         self._stored_layer_data = None
+        self._stored_layer_cache_key = None
 
+        # The output of the engine and the processed layer data are cached on disk, keyed by a hash of everything that is sent to the engine.
+        Preferences.getInstance().addPreference("backend/slice_cache_size", 256) # In megabytes
+        Preferences.getInstance().addPreference("backend/layer_cache_size", 512) # In megabytes
+        self._slice_cache = SliceCache.SliceCache(Resources.getStoragePath(Resources.Resources, "slice_cache"), Preferences.getInstance().getValue("backend/slice_cache_size") * 1024 * 1024)
+        self._layer_cache = LayerDataCache.LayerDataCache(Resources.getStoragePath(Resources.Resources, "layer_cache"), Preferences.getInstance().getValue("backend/layer_cache_size") * 1024 * 1024)
+        self._slice_cache_key = None
+        self._slice_result = None
+        self._slice_object_ids = []
+
+        self._scene_lock_time = 0.0
+
+        # Serialized vertex data of the objects that were sliced last, so objects that did not change are not transformed again.
+        self._vertex_data_cache = {}
+        self._start_slice_job = None
+
+        # Capabilities that the running engine reported. Engines that do not report any get the vertices of every object.
+        self._engine_capabilities = frozenset()
+        # Meshes that the running engine kept from the last slice that was sent to it, if it keeps them.
+        self._engine_mesh_ids = frozenset()
+
+        # Job that loads a cached slice result, with the job that created the messages to send if the result can not be loaded.
+        self._load_slice_result_job = None
+        self._pending_start_slice_job = None
+        Preferences.getInstance().preferenceChanged.connect(self._onPreferenceChanged)
 
         self._profile = None
         Application.getInstance().getMachineManager().activeProfileChanged.connect(self._onActiveProfileChanged)
@@ -64,6 +94,7 @@ class CuraEngineBackend(Backend):
         self._message_handlers[Cura_pb2.GCodeLayer] = self._onGCodeLayerMessage
         self._message_handlers[Cura_pb2.GCodePrefix] = self._onGCodePrefixMessage
         self._message_handlers[Cura_pb2.ObjectPrintTime] = self._onObjectPrintTimeMessage
+        self._message_handlers[Cura_pb2.EngineCapabilities] = self._onEngineCapabilitiesMessage
 
         self._slicing = False
         self._restart = False
@@ -92,6 +123,12 @@ class CuraEngineBackend(Backend):
 
         return [Preferences.getInstance().getValue("backend/location"), "connect", "127.0.0.1:{0}".format(self._port), "-j", active_machine.getMachineDefinition().getPath(), "-vv"]
 
+    ##  Get the time the scene was locked during the last preparation of a slice.
+    #
+    #   \return The time in seconds.
+    def getSceneLockTime(self):
+        return self._scene_lock_time
+
     ##  Emitted when we get a message containing print duration and material amount. This also implies the slicing has finished.
     #   \param time The amount of time the print will take.
     #   \param material_amount The amount of material the print will use.
@@ -117,12 +154,25 @@ class CuraEngineBackend(Backend):
         if not self._enabled:
             return
 
+        if self._start_slice_job:
+            # Nothing was sent to the engine yet, so cancelling the job is enough to stop the previous slice.
+            self._start_slice_job.cancel()
+            self._start_slice_job = None
+            self._slicing = False
+
+        if self._load_slice_result_job:
+            # Nothing was sent to the engine either, the loaded result is ignored when the job finishes.
+            self._load_slice_result_job = None
+            self._pending_start_slice_job = None
+            self._slicing = False
+
         if self._slicing:
             if not kwargs.get("force_restart", True):
                 return
 
             self._slicing = False
             self._restart = True
+            self._slice_result = None
             if self._process is not None:
                 Logger.log("d", "Killing engine process")
                 try:
@@ -191,10 +241,6 @@ class CuraEngineBackend(Backend):
             else:
                 self._message.setProgress(-1)
 
-        self._sendSettings(kwargs.get("profile", self._profile))
-
-        self._scene.acquireLock()
-
         # Set the gcode as an empty list. This will be filled with strings by GCodeLayer messages.
         # This is done so the gcode can be fragmented in memory and does not need a continues memory space.
         # (AKA. This prevents MemoryErrors)
@@ -204,30 +250,83 @@ class CuraEngineBackend(Backend):
 
         self._save_polygons = kwargs.get("save_polygons", True)
 
-        slice_message = Cura_pb2.Slice()
+        settings = kwargs.get("profile", self._profile).getAllSettingValues(include_machine = True)
+
+        # Only capture the state of the nodes while the scene is locked, the messages are created by a job.
+        lock_start_time = time.time()
+        self._scene.acquireLock()
 
+        snapshot_groups = []
         for group in object_groups:
-            group_message = slice_message.object_lists.add()
-            for object in group:
-                mesh_data = object.getMeshData().getTransformed(object.getWorldTransformation())
+            snapshots = []
+            for node in group:
+                snapshots.append(StartSliceJob.ObjectSnapshot(id(node), node.getMeshData(), node.getWorldTransformation().getData().copy(), self._getPerObjectSettings(node)))
+            snapshot_groups.append(snapshots)
 
-                obj = group_message.objects.add()
-                obj.id = id(object)
-                
-                verts = numpy.array(mesh_data.getVertices())
-                verts[:,[1,2]] = verts[:,[2,1]]
-                verts[:,1] *= -1
-                obj.vertices = verts.tostring()
+        self._scene.releaseLock()
+        self._scene_lock_time = time.time() - lock_start_time
+        Logger.log("d", "Scene was locked for %s seconds while preparing the slice.", self._scene_lock_time)
 
-                self._handlePerObjectSettings(object, obj)
+        self._start_slice_job = StartSliceJob.StartSliceJob(settings, snapshot_groups, self._vertex_data_cache, self._getEngineId(), self._engine_capabilities, self._engine_mesh_ids)
+        self._start_slice_job.finished.connect(self._onStartSliceJobFinished)
+        self._start_slice_job.start()
 
-            # Hack to add per-object settings also to the "MeshGroup" in CuraEngine
-            # We really should come up with a better solution for this.
-            self._handlePerObjectSettings(group[0], group_message)
+    def _onStartSliceJobFinished(self, job):
+        # Ignore jobs that were replaced by a newer slice.
+        if job is not self._start_slice_job or job.isCancelled():
+            return
+        self._start_slice_job = None
 
-        self._scene.releaseLock()
+        # Drop the vertex data of objects that are no longer sliced.
+        self._vertex_data_cache = job.getVertexDataCache()
+
+        self._slice_cache_key = job.getCacheKey()
+        self._slice_object_ids = job.getObjectIds()
+
+        # Reading and parsing a cached result takes a while for large slices, so that is done by a job.
+        if self._slice_cache.hasEntry(self._slice_cache_key):
+            self._slice_result = None
+            self._pending_start_slice_job = job
+            self._load_slice_result_job = LoadSliceResultJob.LoadSliceResultJob(self._slice_cache, self._slice_cache_key, self._slice_object_ids, self._save_gcode)
+            self._load_slice_result_job.finished.connect(self._onLoadSliceResultJobFinished)
+            self._load_slice_result_job.start()
+            return
+
+        self._sendSliceMessages(job)
+
+    def _onLoadSliceResultJobFinished(self, job):
+        # Ignore jobs that were replaced by a newer slice.
+        if job is not self._load_slice_result_job:
+            return
+        self._load_slice_result_job = None
+        start_slice_job = self._pending_start_slice_job
+        self._pending_start_slice_job = None
+
+        if job.getResult() is None:
+            self._sendSliceMessages(start_slice_job)
+            return
+
+        Logger.log("d", "Using cached slice result %s instead of running the engine.", job.getCacheKey())
+        self._replaySliceResult(job.getResult(), job.getGCodeList())
+
+    ##  Send the messages created by a StartSliceJob to the engine.
+    #
+    #   If the engine was replaced since the job started, the messages may not be in a form it accepts or refer to
+    #   meshes it does not have, so the slice is started again.
+    def _sendSliceMessages(self, job):
+        if job.getEngineCapabilities() != self._engine_capabilities or job.getEngineMeshIds() != self._engine_mesh_ids:
+            Logger.log("d", "The engine changed while preparing the slice, preparing it again.")
+            self._slicing = False
+            self.slice()
+            return
+
+        self._slice_result = SliceCache.SliceResult()
         Logger.log("d", "Sending data to engine for slicing.")
-        self._socket.sendMessage(slice_message)
+        self._socket.sendMessage(job.getSettingsMessage())
+        self._socket.sendMessage(job.getSliceMessage())
+
+        if StartSliceJob.MeshCacheCapability in self._engine_capabilities:
+            self._engine_mesh_ids = job.getMeshIds()
 
     def _onSceneChanged(self, source):
         if type(source) is not SceneNode:
@@ -257,12 +356,16 @@ class CuraEngineBackend(Backend):
         self._onChanged()
 
     def _onSlicedObjectListMessage(self, message):
+        if self._slice_result is not None:
+            self._slice_result.setSlicedObjectList(message, self._slice_object_ids)
+
         if self._save_polygons:
             if self._layer_view_active:
-                job = ProcessSlicedObjectListJob.ProcessSlicedObjectListJob(message)
+                job = ProcessSlicedObjectListJob.ProcessSlicedObjectListJob(message, self._layer_cache, self._slice_cache_key)
                 job.start()
             else :
                 self._stored_layer_data = message
+                self._stored_layer_cache_key = self._slice_cache_key
 
     def _onProgressMessage(self, message):
         if message.amount >= 0.99:
@@ -280,18 +383,92 @@ class CuraEngineBackend(Backend):
             self.processingProgress.emit(message.amount)
 
     def _onGCodeLayerMessage(self, message):
+        if self._slice_result is not None:
+            self._slice_result.addGCodeLayer(message.data)
+            self._checkSliceResultSize()
+
         if self._save_gcode:
             job = ProcessGCodeJob.ProcessGCodeLayerJob(message)
             job.start()
 
     def _onGCodePrefixMessage(self, message):
+        if self._slice_result is not None:
+            self._slice_result.setGCodePrefix(message.data)
+
         if self._save_gcode:
             self._scene.gcode_list.insert(0, message.data.decode("utf-8", "replace"))
 
     def _onObjectPrintTimeMessage(self, message):
+        if self._slice_result is not None:
+            # The print time is the last output of the engine for a slice, so the result is stored now.
+            self._slice_result.setPrintTime(message.time, message.material_amount)
+            self._slice_result.setFinished()
+            self._storeSliceResult()
+
         self.printDurationMessage.emit(message.time, message.material_amount)
         self.processingProgress.emit(1.0)
 
+    def _onEngineCapabilitiesMessage(self, message):
+        self._engine_capabilities = frozenset(message.capabilities)
+        Logger.log("d", "Engine reported capabilities: %s", ", ".join(sorted(self._engine_capabilities)))
+
+    ##  Store the output of the engine in the slice cache once the engine finished the slice.
+    #
+    #   The result is written by a job, so the main thread does not wait for the disk.
+    def _storeSliceResult(self):
+        if self._checkSliceResultSize():
+            return
+
+        if not self._slice_result.isComplete():
+            Logger.log("w", "Not caching slice result %s, the engine finished without sending all of it.", self._slice_cache_key)
+            self._slice_result = None
+            return
+
+        job = StoreSliceResultJob.StoreSliceResultJob(self._slice_cache, self._slice_cache_key, self._slice_result)
+        job.start()
+        self._slice_result = None
+
+    ##  Stop collecting the output of the engine if it does not fit in the slice cache.
+    #
+    #   \return True if the output is no longer collected.
+    def _checkSliceResultSize(self):
+        if self._slice_result.getSize() <= self._slice_cache.getMaxSize():
+            return False
+
+        Logger.log("d", "Not caching slice result %s, it is larger than the slice cache.", self._slice_cache_key)
+        self._slice_result = None
+        return True
+
+    ##  Get a string that identifies the engine, which is part of the key of cached slice results.
+    #
+    #   The location, size and modification time of the executable change when another
+    #   version of the engine is used.
+    def _getEngineId(self):
+        location = Preferences.getInstance().getValue("backend/location")
+        try:
+            stat = os.stat(location)
+        except OSError:
+            return location
+        return "{0}:{1}:{2}".format(location, stat.st_size, stat.st_mtime)
+
+    ##  Handle a cached slice result as if the engine had just sent it.
+    #
+    #   \param result The SliceResult loaded by a LoadSliceResultJob, with the object IDs of the current slice.
+    #   \param gcode_list The decoded g-code of the result, or None if the g-code is not saved.
+    def _replaySliceResult(self, result, gcode_list):
+        if self._save_gcode and gcode_list is not None:
+            self._scene.gcode_list = gcode_list
+
+        self._onSlicedObjectListMessage(result.getSlicedObjectList())
+
+        self._slicing = False
+        if self._message:
+            self._message.hide()
+            self._message = None
+
+        self.printDurationMessage.emit(result.getPrintTime(), result.getMaterialAmount())
+        self.processingProgress.emit(1.0)
+
     def _createSocket(self):
         super()._createSocket()
         
@@ -302,6 +479,7 @@ class CuraEngineBackend(Backend):
         self._socket.registerMessageType(5, Cura_pb2.ObjectPrintTime)
         self._socket.registerMessageType(6, Cura_pb2.SettingList)
         self._socket.registerMessageType(7, Cura_pb2.GCodePrefix)
+        self._socket.registerMessageType(8, Cura_pb2.EngineCapabilities)
 
     ##  Manually triggers a reslice
     def forceSlice(self):
@@ -313,16 +491,11 @@ class CuraEngineBackend(Backend):
 
         self._change_timer.start()
 
-    def _sendSettings(self, profile):
-        msg = Cura_pb2.SettingList()
-        for key, value in profile.getAllSettingValues(include_machine = True).items():
-            s = msg.settings.add()
-            s.name = key
-            s.value = str(value).encode("utf-8")
-
-        self._socket.sendMessage(msg)
-
     def _onBackendConnected(self):
+        # A new engine reports its own capabilities after it connects, and has no meshes yet.
+        self._engine_capabilities = frozenset()
+        self._engine_mesh_ids = frozenset()
+
         if self._restart:
             self._onChanged()
             self._restart = False
@@ -340,32 +513,44 @@ class CuraEngineBackend(Backend):
             if view.getPluginId() == "LayerView":
                 self._layer_view_active = True
                 if self._stored_layer_data:
-                    job = ProcessSlicedObjectListJob.ProcessSlicedObjectListJob(self._stored_layer_data)
+                    job = ProcessSlicedObjectListJob.ProcessSlicedObjectListJob(self._stored_layer_data, self._layer_cache, self._stored_layer_cache_key)
                     job.start()
                     self._stored_layer_data = None
+                    self._stored_layer_cache_key = None
             else:
                 self._layer_view_active = False
 
-    def _handlePerObjectSettings(self, node, message):
+    ##  Get the settings that are overridden for a node.
+    #
+    #   \param node The scene node to get the settings of.
+    #   \return A list of (key, value) tuples.
+    def _getPerObjectSettings(self, node):
+        settings = []
         profile = node.callDecoration("getProfile")
         if profile:
-            for key, value in profile.getChangedSettingValues().items():
-                setting = message.settings.add()
-                setting.name = key
-                setting.value = str(value).encode()
+            settings.extend(profile.getChangedSettingValues().items())
 
         object_settings = node.callDecoration("getAllSettingValues")
-        if not object_settings:
-            return
+        if object_settings:
+            settings.extend(object_settings.items())
+
+        return settings
 
-        for key, value in object_settings.items():
-            setting = message.settings.add()
-            setting.name = key
-            setting.value = str(value).encode()
+    def _onPreferenceChanged(self, preference):
+        if preference == "backend/slice_cache_size":
+            self._slice_cache.setMaxSize(Preferences.getInstance().getValue("backend/slice_cache_size") * 1024 * 1024)
+        elif preference == "backend/layer_cache_size":
+            self._layer_cache.setMaxSize(Preferences.getInstance().getValue("backend/layer_cache_size") * 1024 * 1024)
 
     def _onInstanceChanged(self):
         self._slicing = False
         self._restart = True
+        self._slice_result = None
+        if self._start_slice_job:
+            self._start_slice_job.cancel()
+            self._start_slice_job = None
+        self._load_slice_result_job = None
+        self._pending_start_slice_job = None
         if self._process is not None:
             Logger.log("d", "Killing engine process")
             try:
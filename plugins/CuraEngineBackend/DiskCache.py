@@ -0,0 +1,126 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Logger import Logger
+
+import os
+import os.path
+import shutil
+import threading
+
+import numpy
+
+##  A size-limited cache of numpy arrays stored on disk.
+#
+#   Every entry is a directory named after its key, containing one .npy file per
+#   array. Entries are memory-mapped when they are read, so reading an entry is
+#   cheap regardless of its size. When the total size of the cache grows beyond the
+#   maximum size, the entries that were used least recently are removed.
+class DiskCache:
+    ##  Create a cache.
+    #
+    #   \param path The directory to store the cache entries in.
+    #   \param max_size The maximum total size of all entries, in bytes.
+    def __init__(self, path, max_size):
+        self._path = path
+        self._max_size = max_size
+        self._lock = threading.Lock()
+
+    def getPath(self):
+        return self._path
+
+    def getMaxSize(self):
+        return self._max_size
+
+    def setMaxSize(self, max_size):
+        self._max_size = max_size
+        self._removeOldEntries()
+
+    ##  Check whether the cache contains an entry.
+    #
+    #   \param key The key of the entry, a string that can be used as file name.
+    def hasEntry(self, key):
+        return os.path.isdir(os.path.join(self._path, key))
+
+    ##  Get the arrays of an entry.
+    #
+    #   This also marks the entry as recently used.
+    #
+    #   \param key The key of the entry, a string that can be used as file name.
+    #   \return A dict with the names of the arrays as keys and read-only memory-mapped arrays
+    #           as values, or None if the cache does not contain the entry.
+    def getEntry(self, key):
+        entry_path = os.path.join(self._path, key)
+        if not os.path.isdir(entry_path):
+            return None
+
+        arrays = {}
+        try:
+            os.utime(entry_path)
+            for file_name in os.listdir(entry_path):
+                name, extension = os.path.splitext(file_name)
+                if extension == ".npy":
+                    arrays[name] = numpy.load(os.path.join(entry_path, file_name), mmap_mode = "r")
+        except (OSError, ValueError) as e:
+            Logger.log("w", "Could not read cache entry %s: %s", entry_path, e)
+            return None
+
+        return arrays
+
+    ##  Add an entry, replacing any existing entry with the same key.
+    #
+    #   \param key The key of the entry, a string that can be used as file name.
+    #   \param arrays A dict with names as keys and numpy arrays as values.
+    def addEntry(self, key, arrays):
+        entry_path = os.path.join(self._path, key)
+        # Write to a temporary directory first so a partially written entry is never read.
+        temp_path = "{0}.{1}.tmp".format(entry_path, threading.get_ident())
+        try:
+            os.makedirs(temp_path, exist_ok = True)
+            for name, array in arrays.items():
+                numpy.save(os.path.join(temp_path, name + ".npy"), array)
+
+            with self._lock:
+                if os.path.isdir(entry_path):
+                    shutil.rmtree(entry_path, ignore_errors = True)
+                os.rename(temp_path, entry_path)
+        except OSError as e:
+            Logger.log("w", "Could not write cache entry %s: %s", entry_path, e)
+            shutil.rmtree(temp_path, ignore_errors = True)
+            return
+
+        self._removeOldEntries()
+
+    ##  Remove the least recently used entries until the cache fits its maximum size.
+    def _removeOldEntries(self):
+        if not os.path.isdir(self._path):
+            return
+
+        with self._lock:
+            entries = []
+            total_size = 0
+            try:
+                for name in os.listdir(self._path):
+                    entry_path = os.path.join(self._path, name)
+                    if name.endswith(".tmp") or not os.path.isdir(entry_path):
+                        continue
+
+                    size = 0
+                    for file_name in os.listdir(entry_path):
+                        size += os.path.getsize(os.path.join(entry_path, file_name))
+
+                    entries.append((os.path.getmtime(entry_path), size, entry_path))
+                    total_size += size
+            except OSError as e:
+                Logger.log("w", "Could not determine the size of cache %s: %s", self._path, e)
+                return
+
+            entries.sort()
+            for mtime, size, entry_path in entries:
+                if total_size <= self._max_size:
+                    break
+
+                # Entries that are still memory-mapped can not be removed on some platforms, those are tried again later.
+                shutil.rmtree(entry_path, ignore_errors = True)
+                if not os.path.isdir(entry_path):
+                    total_size -= size
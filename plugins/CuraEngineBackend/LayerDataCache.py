@@ -0,0 +1,36 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Logger import Logger
+
+from cura import LayerData
+
+from . import DiskCache
+
+##  Disk cache of processed and built layer data.
+#
+#   The key of an entry should identify everything that influences the sliced
+#   result, so a cached entry can be shown instead of processing the layer data
+#   the engine sends again.
+class LayerDataCache(DiskCache.DiskCache):
+    ##  Get cached layer data.
+    #
+    #   \param key The key of the entry.
+    #   \return A LayerData object backed by memory-mapped arrays, or None if the cache does not contain the entry.
+    def getLayerData(self, key):
+        arrays = self.getEntry(key)
+        if arrays is None:
+            return None
+
+        try:
+            return LayerData.LayerData.fromArrays(arrays)
+        except KeyError as e:
+            Logger.log("w", "Cached layer data %s is incomplete, missing %s", key, e)
+            return None
+
+    ##  Store layer data in the cache.
+    #
+    #   \param key The key of the entry.
+    #   \param layer_data The LayerData object to store. All its layers should be built.
+    def addLayerData(self, key, layer_data):
+        self.addEntry(key, layer_data.getArrays())
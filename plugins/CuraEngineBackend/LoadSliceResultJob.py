@@ -0,0 +1,59 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Job import Job
+from UM.Logger import Logger
+
+import time
+
+##  Read a result from the slice cache and prepare it for replaying, so the main thread does not wait for the disk.
+class LoadSliceResultJob(Job):
+    ##  Create a job that loads a slice result.
+    #
+    #   \param slice_cache The SliceCache to load the result from.
+    #   \param cache_key The key of the sliced input.
+    #   \param object_ids The IDs of the objects of the current slice, in the order in which they were sent to the engine.
+    #   \param save_gcode Whether the g-code layers are decoded for the scene.
+    def __init__(self, slice_cache, cache_key, object_ids, save_gcode):
+        super().__init__()
+        self._slice_cache = slice_cache
+        self._cache_key = cache_key
+        self._object_ids = object_ids
+        self._save_gcode = save_gcode
+
+        self._result = None
+        self._gcode_list = None
+
+    def getCacheKey(self):
+        return self._cache_key
+
+    ##  Get the loaded result.
+    #
+    #   The objects in its sliced object list have the IDs of the current slice.
+    #   \return A SliceResult object, or None if the cache does not contain a complete result.
+    def getResult(self):
+        return self._result
+
+    ##  Get the decoded g-code of the result, starting with the prefix.
+    #
+    #   \return A list of strings, or None if the g-code is not saved.
+    def getGCodeList(self):
+        return self._gcode_list
+
+    def run(self):
+        start_time = time.time()
+        result = self._slice_cache.getSliceResult(self._cache_key)
+        if result is None:
+            return
+
+        # Objects have the same position in the slice message as when the result was stored, but different IDs.
+        object_ids = { object_id: self._object_ids[index] for index, object_id in enumerate(result.getObjectIds()) if index < len(self._object_ids) }
+        for obj in result.getSlicedObjectList().objects:
+            obj.id = object_ids.get(obj.id, -1)
+
+        if self._save_gcode:
+            self._gcode_list = [result.getGCodePrefix().decode("utf-8", "replace")]
+            self._gcode_list.extend(layer.decode("utf-8", "replace") for layer in result.getGCodeLayers())
+
+        self._result = result
+        Logger.log("d", "Loaded slice result %s of %s bytes in %s seconds.", self._cache_key, result.getSize(), time.time() - start_time)
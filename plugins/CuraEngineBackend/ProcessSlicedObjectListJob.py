@@ -8,6 +8,8 @@ from UM.Application import Application
 from UM.Mesh.MeshData import MeshData
 
 from UM.Message import Message
+from UM.Logger import Logger
+from UM.Event import CallFunctionEvent
 from UM.i18n import i18nCatalog
 
 from cura import LayerData
@@ -15,17 +17,29 @@ from cura import LayerDataDecorator
 
 import numpy
 import struct
+import time
 
 catalog = i18nCatalog("cura")
 
 class ProcessSlicedObjectListJob(Job):
-    def __init__(self, message):
+    ##  Create a job that processes a SlicedObjectList message into layer data.
+    #
+    #   \param message The SlicedObjectList message.
+    #   \param layer_cache A LayerDataCache to look up and store the processed layer data, or None to not use a cache.
+    #   \param cache_key The key of the sliced input in the layer cache.
+    def __init__(self, message, layer_cache = None, cache_key = None):
         super().__init__()
         self._message = message
+        self._layer_cache = layer_cache
+        self._cache_key = cache_key
         self._scene = Application.getInstance().getController().getScene()
         self._progress = None
 
+        # Number of layers that are processed before the first layers are shown.
+        self._first_build_layer_count = 10
+
     def run(self):
+        start_time = time.time()
         if Application.getInstance().getController().getActiveView().getPluginId() == "LayerView":
             self._progress = Message(catalog.i18nc("@info:status", "Processing Layers"), 0, False, -1)
             self._progress.show()
@@ -33,7 +47,6 @@ class ProcessSlicedObjectListJob(Job):
         Application.getInstance().getController().activeViewChanged.connect(self._onActiveViewChanged)
 
         objectIdMap = {}
-        new_node = SceneNode()
         ## Put all nodes in a dict identified by ID
         for node in DepthFirstIterator(self._scene.getRoot()):
             if type(node) is SceneNode and node.getMeshData():
@@ -43,6 +56,16 @@ class ProcessSlicedObjectListJob(Job):
                 else:
                     objectIdMap[id(node)] = node
 
+        # The same input may have been sliced before, in which case the processed layer data is already available.
+        if self._layer_cache and self._cache_key:
+            layer_data = self._layer_cache.getLayerData(self._cache_key)
+            if layer_data is not None:
+                Logger.log("d", "Using cached layer data %s", self._cache_key)
+                self._showLayerData(self._createLayerDataNode(), layer_data)
+                if self._progress:
+                    self._progress.hide()
+                return
+
         settings = Application.getInstance().getMachineManager().getActiveProfile()
         layerHeight = settings.getSettingValue("layer_height")
 
@@ -52,51 +75,118 @@ class ProcessSlicedObjectListJob(Job):
         else:
             center = numpy.array([0.0, 0.0, 0.0])
 
-        mesh = MeshData()
-        layer_data = LayerData.LayerData()
+        # Scale from micron to millimeter and flip the Z axis. The Y axis gets filled with the layer height.
+        scale = numpy.array([1 / 1000, -1 / 1000])
+        offset = numpy.array([center[0], center[2]], numpy.float32)
+
+        # Collect the layers of all objects so they can be processed from the bottom up.
+        layers = {}
         for object in self._message.objects:
-            try:
-                node = objectIdMap[object.id]
-            except KeyError:
+            if object.id not in objectIdMap:
                 continue
 
             for layer in object.layers:
-                layer_data.addLayer(layer.id)
+                if layer.id not in layers:
+                    layers[layer.id] = []
+                layers[layer.id].append(layer)
+
+        # The point storage grows as layers are added, so the first layers do not wait for a pass over all polygons.
+        # This layer data is only used by this job. The scene gets a snapshot of it after every batch.
+        layer_data = LayerData.LayerData()
+        new_node = self._createLayerDataNode()
+
+        # The layers are built and shown in batches so the bottom layers become visible while
+        # the rest is still being processed. Batches double in size so the total work stays about the same.
+        point_count = 0
+        polygon_count = 0
+        buffer_count = 0
+        layer_ids = sorted(layers.keys())
+        next_build = self._first_build_layer_count
+        for index, layer_id in enumerate(layer_ids):
+            layer_data.addLayer(layer_id)
+
+            for layer in layers[layer_id]:
                 layer_data.setLayerHeight(layer.id, layer.height)
                 layer_data.setLayerThickness(layer.id, layer.thickness)
+
+                counts = []
+                types = []
+                line_widths = []
                 for polygon in layer.polygons:
-                    points = numpy.fromstring(polygon.points, dtype="i8") # Convert bytearray to numpy array
-                    points = points.reshape((-1,2)) # We get a linear list of pairs that make up the points, so make numpy interpret them correctly.
-                    points = numpy.asarray(points, dtype=numpy.float32)
-                    points /= 1000
-                    points = numpy.insert(points, 1, (layer.height / 1000), axis = 1)
+                    counts.append(len(polygon.points) // 16) # Each point is a pair of 64-bit integers, so 16 bytes.
+                    types.append(polygon.type)
+                    line_widths.append(polygon.line_width)
+
+                layer_points = layer_data.addPolygons(layer.id, types, line_widths, counts)
+                point_count += len(layer_points)
+                polygon_count += len(counts)
+
+                # Decode all polygons of the layer at once, straight into the point storage of the layer data.
+                # Joining the bytes of the polygons is the only allocation per layer.
+                points = numpy.frombuffer(b"".join(polygon.points for polygon in layer.polygons), dtype = "i8")
+                points = points.reshape((-1, 2)) # We get a linear list of pairs that make up the points, so make numpy interpret them correctly.
+                buffer_count += 1
 
-                    points[:,2] *= -1
+                layer_xz = layer_points[:,::2]
+                numpy.multiply(points, scale, out = layer_xz, casting = "unsafe")
+                numpy.subtract(layer_xz, offset, out = layer_xz)
+                layer_points[:,1] = (layer.height / 1000) - center[1]
 
-                    points -= numpy.array(center)
+            if index + 1 >= next_build or index + 1 == len(layer_ids):
+                # Create a mesh out of the layers that were processed since the previous batch.
+                layer_data.build()
+                self._showLayerData(new_node, layer_data.createSnapshot())
 
-                    layer_data.addPolygon(layer.id, polygon.type, points, polygon.line_width)
+                if next_build == self._first_build_layer_count:
+                    Logger.log("d", "First %s layers handed to the scene after %s seconds", index + 1, time.time() - start_time)
 
+                next_build *= 2
 
-        # We are done processing all the layers we got from the engine, now create a mesh out of the data
-        layer_data.build()
+        Logger.log("d", "Decoded %s polygons with %s points in %s seconds, with %s allocations: %s layer buffers and %s to grow the layer data",
+                   polygon_count, point_count, time.time() - start_time, buffer_count + layer_data.getAllocationCount(), buffer_count, layer_data.getAllocationCount())
+
+        if self._progress:
+            self._progress.hide()
+
+        if self._layer_cache and self._cache_key and layer_ids:
+            self._layer_cache.addLayerData(self._cache_key, layer_data)
+
+    ##  Create a scene node that will hold layer data.
+    #
+    #   The layer data is set when the node is shown, see _showLayerData.
+    def _createLayerDataNode(self):
+        node = SceneNode()
 
-        
         #Add layerdata decorator to scene node to indicate that the node has layerdata
-        decorator = LayerDataDecorator.LayerDataDecorator()
-        decorator.setLayerData(layer_data)
-        new_node.addDecorator(decorator)
-        
-        new_node.setMeshData(mesh)
-        new_node.setParent(self._scene.getRoot())
-        
+        node.addDecorator(LayerDataDecorator.LayerDataDecorator())
+
+        node.setMeshData(MeshData())
+        return node
+
+    ##  Show layer data in the scene.
+    #
+    #   The scene and the renderer may only be changed from the main thread, so this
+    #   hands the layer data over to the main thread.
+    #
+    #   \param node The scene node created by _createLayerDataNode.
+    #   \param layer_data The layer data to show. It should not be changed afterwards.
+    def _showLayerData(self, node, layer_data):
+        Application.getInstance().functionEvent(CallFunctionEvent(self._setLayerData, [node, layer_data], {}))
+
+    ##  Replace the layer data of a node and add the node to the scene if it is not in it yet.
+    #
+    #   This runs on the main thread.
+    def _setLayerData(self, node, layer_data):
+        node.callDecoration("setLayerData", layer_data)
+        if not node.getParent():
+            node.setParent(self._scene.getRoot())
+        else:
+            self._scene.sceneChanged.emit(node)
+
         view = Application.getInstance().getController().getActiveView()
         if view.getPluginId() == "LayerView":
             view.resetLayerData()
 
-        if self._progress:
-            self._progress.hide()
-
     def _onActiveViewChanged(self):
         if self.isRunning():
             if Application.getInstance().getController().getActiveView().getPluginId() == "LayerView":
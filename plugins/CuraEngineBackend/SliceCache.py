@@ -0,0 +1,131 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Logger import Logger
+
+from . import Cura_pb2
+from . import DiskCache
+
+import numpy
+
+##  The complete output of the engine for a single slice.
+#
+#   The sliced object list is kept with the IDs of the objects in the order in which
+#   they were sent to the engine, since the IDs of scene nodes differ between sessions.
+#   The messages of the engine are not copied, so the result only references data that
+#   is kept for the scene anyway.
+class SliceResult:
+    def __init__(self):
+        self._gcode_prefix = None
+        self._gcode_layers = []
+        self._sliced_object_list = None
+        self._object_ids = []
+        self._print_time = None
+        self._material_amount = None
+        self._finished = False
+        self._size = 0
+
+    def getGCodePrefix(self):
+        return self._gcode_prefix
+
+    def setGCodePrefix(self, prefix):
+        self._gcode_prefix = prefix
+        self._size += len(prefix)
+
+    def getGCodeLayers(self):
+        return self._gcode_layers
+
+    def addGCodeLayer(self, data):
+        self._gcode_layers.append(data)
+        self._size += len(data)
+
+    def getSlicedObjectList(self):
+        return self._sliced_object_list
+
+    ##  Get the IDs the objects in the sliced object list had, in the order in which they were sent to the engine.
+    def getObjectIds(self):
+        return self._object_ids
+
+    ##  Set the sliced object list.
+    #
+    #   \param message The SlicedObjectList message. It is not copied, so it should not be changed afterwards.
+    #   \param object_ids The IDs of the objects, in the order in which they were sent to the engine.
+    def setSlicedObjectList(self, message, object_ids):
+        self._sliced_object_list = message
+        self._object_ids = list(object_ids)
+        self._size += message.ByteSize()
+
+    def getPrintTime(self):
+        return self._print_time
+
+    def getMaterialAmount(self):
+        return self._material_amount
+
+    def setPrintTime(self, time, material_amount):
+        self._print_time = time
+        self._material_amount = material_amount
+
+    ##  Get the approximate size of the result in the cache, in bytes.
+    def getSize(self):
+        return self._size
+
+    ##  Mark that the engine finished the slice, so no more output is added to the result.
+    def setFinished(self):
+        self._finished = True
+
+    ##  Whether the engine finished the slice and all the messages that make up its output were received.
+    #
+    #   G-code layers are sent until the engine finishes, so a result is never complete before that.
+    def isComplete(self):
+        return self._finished and self._sliced_object_list is not None and self._print_time is not None and self._gcode_prefix is not None
+
+##  Disk cache of the output of the engine, so identical slices do not need to run the engine.
+class SliceCache(DiskCache.DiskCache):
+    ##  Get a cached slice result.
+    #
+    #   \param key The key of the entry.
+    #   \return A SliceResult object, or None if the cache does not contain the entry.
+    def getSliceResult(self, key):
+        arrays = self.getEntry(key)
+        if arrays is None:
+            return None
+
+        try:
+            result = SliceResult()
+            result.setGCodePrefix(arrays["gcode_prefix"].tobytes())
+
+            gcode = arrays["gcode"]
+            offsets = arrays["gcode_offsets"]
+            for i in range(len(offsets) - 1):
+                result.addGCodeLayer(gcode[offsets[i]:offsets[i + 1]].tobytes())
+
+            message = Cura_pb2.SlicedObjectList()
+            message.ParseFromString(arrays["sliced_object_list"].tobytes())
+            result.setSlicedObjectList(message, arrays["object_ids"].tolist())
+
+            print_time = arrays["print_time"]
+            result.setPrintTime(float(print_time[0]), float(print_time[1]))
+            result.setFinished()
+        except KeyError as e:
+            Logger.log("w", "Cached slice result %s is incomplete, missing %s", key, e)
+            return None
+
+        return result
+
+    ##  Store a slice result in the cache.
+    #
+    #   \param key The key of the entry.
+    #   \param result The SliceResult object to store. It should be complete.
+    def addSliceResult(self, key, result):
+        layers = result.getGCodeLayers()
+        offsets = numpy.zeros(len(layers) + 1, dtype = numpy.int64)
+        numpy.cumsum([len(layer) for layer in layers], out = offsets[1:])
+
+        self.addEntry(key, {
+            "gcode_prefix": numpy.frombuffer(result.getGCodePrefix(), dtype = numpy.uint8),
+            "gcode": numpy.frombuffer(b"".join(layers), dtype = numpy.uint8),
+            "gcode_offsets": offsets,
+            "sliced_object_list": numpy.frombuffer(result.getSlicedObjectList().SerializeToString(), dtype = numpy.uint8),
+            "object_ids": numpy.array(result.getObjectIds(), dtype = numpy.int64),
+            "print_time": numpy.array([result.getPrintTime(), result.getMaterialAmount()], dtype = numpy.float64)
+        })
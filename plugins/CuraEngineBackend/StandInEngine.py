@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import argparse
+import os
+import socket
+import struct
+import sys
+import threading
+
+import numpy
+
+if not __package__:
+    # Run as a script, for example as the engine of the backend, or imported without the plug-in.
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import Cura_pb2
+else:
+    from . import Cura_pb2
+
+##  Message types by the IDs they are sent with, see CuraEngineBackend._createSocket.
+_message_types = {
+    1: Cura_pb2.Slice,
+    2: Cura_pb2.SlicedObjectList,
+    3: Cura_pb2.Progress,
+    4: Cura_pb2.GCodeLayer,
+    5: Cura_pb2.ObjectPrintTime,
+    6: Cura_pb2.SettingList,
+    7: Cura_pb2.GCodePrefix,
+    8: Cura_pb2.EngineCapabilities
+}
+_message_type_ids = { message_type: type_id for type_id, message_type in _message_types.items() }
+
+##  Size of the header of a message, which is the type ID and the size of the message.
+_header_size = 8
+
+##  Send a message over a socket, framed like Arcus does.
+#
+#   \param connection The socket to send the message over.
+#   \param message The message. Its type should be one of the message types of the backend.
+#   \return The number of bytes that was sent.
+def sendMessage(connection, message):
+    data = message.SerializeToString()
+    connection.sendall(struct.pack("!ii", _message_type_ids[type(message)], len(data)) + data)
+    return _header_size + len(data)
+
+##  Receive a message from a socket, framed like Arcus does.
+#
+#   Keep-alive messages are skipped, but their bytes are counted.
+#
+#   \param connection The socket to receive the message from.
+#   \return A tuple of the message and the number of bytes that was received, or (None, bytes) if the connection was closed.
+def receiveMessage(connection):
+    received = 0
+    while True:
+        header = _receiveBytes(connection, 4)
+        if header is None:
+            return None, received
+        received += 4
+
+        type_id = struct.unpack("!i", header)[0]
+        if type_id != 0: # A type ID of 0 is a keep-alive without size or data.
+            break
+
+    size = _receiveBytes(connection, 4)
+    data = _receiveBytes(connection, struct.unpack("!i", size)[0]) if size is not None else None
+    if data is None:
+        return None, received
+    received += 4 + len(data)
+
+    message = _message_types[type_id]()
+    message.ParseFromString(data)
+    return message, received
+
+def _receiveBytes(connection, size):
+    data = b""
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+##  A stand-in for CuraEngine that records the bytes the frontend sends for every slice.
+#
+#   The stand-in connects to the backend like the engine does, and reads the messages
+#   with the framing of Arcus: the type ID and the size of every message as 32-bit
+#   big-endian integers, followed by the serialized message. A type ID of 0 keeps the
+#   connection alive and has no size or data.
+#
+#   A slice ends with a Slice message. All bytes received since the previous slice are
+#   counted for it, which includes the settings and keep-alives. Every slice is answered
+#   with an empty result, so the frontend finishes the slice as if the engine had run.
+#
+#   The stand-in reports the capabilities it is created with when it connects. Objects that
+#   refer to a mesh of the slice are transformed like the engine does, so the vertices it
+#   slices can be compared with those of objects that were sent with their vertices. With
+#   the mesh_cache capability, the meshes that a slice referred to are kept for the next one.
+#
+#   To slice with the stand-in from Cura, set the preference backend/location to this script.
+class StandInEngine:
+    ##  Create the stand-in.
+    #
+    #   \param respond Whether slices are answered with an empty result.
+    #   \param capabilities A list of the capabilities that are reported to the backend.
+    def __init__(self, respond = True, capabilities = ()):
+        self._respond = respond
+        self._capabilities = capabilities
+        self._connection = None
+        self._thread = None
+        self._slices = []
+        self._vertices = {}
+        self._meshes = {}
+        self._disconnected = False
+        self._condition = threading.Condition()
+
+    ##  Connect to the backend and start receiving messages.
+    #
+    #   \param host The host the backend listens on.
+    #   \param port The port the backend listens on.
+    def connect(self, host, port):
+        self._connection = socket.create_connection((host, port))
+        if self._capabilities:
+            capabilities = Cura_pb2.EngineCapabilities()
+            capabilities.capabilities.extend(self._capabilities)
+            sendMessage(self._connection, capabilities)
+
+        self._thread = threading.Thread(target = self._receive)
+        self._thread.daemon = True
+        self._thread.start()
+
+    ##  Close the connection.
+    def close(self):
+        if self._connection is not None:
+            try:
+                self._connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._connection.close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    ##  Get the records of the slices that were received.
+    #
+    #   \return A list with a dict per slice, with the number of bytes received for the slice ("bytes"), the size
+    #           of the settings ("settings_bytes") and of the Slice message ("slice_bytes"), the number of objects
+    #           ("objects"), the total size of the vertex data of the objects and the meshes ("vertex_bytes"),
+    #           the size of the vertex data of the meshes ("mesh_bytes") and the number of objects that refer to a
+    #           mesh that was not sent ("missing_meshes").
+    def getSlices(self):
+        with self._condition:
+            return list(self._slices)
+
+    ##  Get the vertices of the objects of the last slice as the engine slices them.
+    #
+    #   \return A dict with a numpy array with a row per vertex by object ID. Objects that refer to a mesh that was not sent have None.
+    def getVertices(self):
+        with self._condition:
+            return self._vertices
+
+    ##  Wait until a number of slices was received, or the connection was closed.
+    #
+    #   \param count The number of slices to wait for.
+    #   \param timeout The maximum time to wait, in seconds.
+    #   \return True if the slices were received.
+    def waitForSlices(self, count, timeout = None):
+        with self._condition:
+            self._condition.wait_for(lambda: len(self._slices) >= count or self._disconnected, timeout)
+            return len(self._slices) >= count
+
+    def _receive(self):
+        received = 0
+        settings_bytes = 0
+        while True:
+            try:
+                message, size = receiveMessage(self._connection)
+            except OSError:
+                message = None
+            if message is None:
+                break
+
+            received += size
+            if isinstance(message, Cura_pb2.SettingList):
+                settings_bytes += size
+            elif isinstance(message, Cura_pb2.Slice):
+                objects = [obj for object_list in message.object_lists for obj in object_list.objects]
+                meshes = dict(self._meshes)
+                meshes.update((mesh.id, mesh.vertices) for mesh in message.meshes)
+                vertices = {}
+                for obj in objects:
+                    vertices[obj.id] = self._getVertices(obj, meshes)
+
+                if "mesh_cache" in self._capabilities:
+                    self._meshes = { obj.mesh_id: meshes[obj.mesh_id] for obj in objects if obj.mesh_id in meshes }
+
+                mesh_bytes = sum(len(mesh.vertices) for mesh in message.meshes)
+                record = {
+                    "bytes": received,
+                    "settings_bytes": settings_bytes,
+                    "slice_bytes": size,
+                    "objects": len(objects),
+                    "vertex_bytes": sum(len(obj.vertices) for obj in objects) + mesh_bytes,
+                    "mesh_bytes": mesh_bytes,
+                    "missing_meshes": sum(1 for object_vertices in vertices.values() if object_vertices is None)
+                }
+                received = 0
+                settings_bytes = 0
+
+                if self._respond:
+                    self._sendResult(objects)
+
+                with self._condition:
+                    self._slices.append(record)
+                    self._vertices = vertices
+                    self._condition.notify_all()
+
+        with self._condition:
+            self._disconnected = True
+            self._condition.notify_all()
+
+    ##  Get the vertices of an object as the engine slices them.
+    #
+    #   \param obj The Object message.
+    #   \param meshes The vertex data of the meshes that the slice can refer to, by mesh ID.
+    #   \return A numpy array with a row per vertex, or None if the object refers to a mesh that was not sent.
+    def _getVertices(self, obj, meshes):
+        if not obj.mesh_id:
+            return numpy.frombuffer(obj.vertices, dtype = numpy.float32).reshape((-1, 3))
+
+        if obj.mesh_id not in meshes:
+            return None
+
+        mesh_vertices = numpy.frombuffer(meshes[obj.mesh_id], dtype = numpy.float32).reshape((-1, 3))
+        transformation = numpy.frombuffer(obj.transformation, dtype = numpy.float32).reshape((3, 4))
+        return numpy.dot(mesh_vertices, transformation[:, 0:3].T) + transformation[:, 3]
+
+    ##  Answer a slice with an empty result, in the order in which the engine sends its output.
+    def _sendResult(self, objects):
+        try:
+            progress = Cura_pb2.Progress()
+            progress.amount = 1.0
+            sendMessage(self._connection, progress)
+
+            sliced_object_list = Cura_pb2.SlicedObjectList()
+            for obj in objects:
+                sliced_object_list.objects.add().id = obj.id
+            sendMessage(self._connection, sliced_object_list)
+
+            prefix = Cura_pb2.GCodePrefix()
+            prefix.data = b";Sliced by the stand-in engine\n"
+            sendMessage(self._connection, prefix)
+
+            print_time = Cura_pb2.ObjectPrintTime()
+            print_time.id = -1
+            sendMessage(self._connection, print_time)
+        except OSError:
+            pass
+
+##  Run the stand-in with the command line of the engine, and print a line for every slice.
+def main():
+    parser = argparse.ArgumentParser(description = "Stand-in for CuraEngine that records the bytes the frontend sends for every slice.")
+    parser.add_argument("command", choices = ["connect"])
+    parser.add_argument("address", help = "The host and port of the backend, as host:port.")
+    parser.add_argument("-j", help = "Machine definition file, which is ignored.")
+    parser.add_argument("-v", action = "count", help = "Verbosity, which is ignored.")
+    parser.add_argument("--capability", action = "append", default = [], help = "A capability to report to the backend, for example mesh_references.")
+    args = parser.parse_args()
+
+    host, separator, port = args.address.rpartition(":")
+    engine = StandInEngine(capabilities = args.capability)
+    engine.connect(host, int(port))
+
+    # Report the slices while they come in, until the backend closes the connection.
+    reported = 0
+    while engine.waitForSlices(reported + 1):
+        for record in engine.getSlices()[reported:]:
+            reported += 1
+            print("Slice %d: %d bytes, of which %d bytes of settings and %d bytes of vertex data of %d objects." % (reported, record["bytes"], record["settings_bytes"], record["vertex_bytes"], record["objects"]), flush = True)
+
+    engine.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
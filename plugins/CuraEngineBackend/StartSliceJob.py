@@ -0,0 +1,261 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Job import Job
+from UM.Logger import Logger
+
+from cura import MeshHash
+
+from . import Cura_pb2
+
+import collections
+import hashlib
+import numpy
+
+##  The state of a scene node that is needed to slice it.
+#
+#   This is captured while the scene is locked, so the node itself is not accessed
+#   while the slice messages are created.
+ObjectSnapshot = collections.namedtuple("ObjectSnapshot", ["id", "mesh_data", "transformation", "settings"])
+
+##  Vertex data of a scene node in the form it is sent to the engine.
+#
+#   The mesh data and transformation it was created from are stored with it, to
+#   check whether it is still valid.
+VertexData = collections.namedtuple("VertexData", ["mesh_data", "vertex_count", "transformation", "vertices", "digest"])
+
+##  Converts from the coordinate system of the scene, where Y is up, to that of the engine, where Z is up.
+_engine_axes = numpy.array([
+    [1, 0, 0],
+    [0, 0, -1],
+    [0, 1, 0]
+], dtype = numpy.float64)
+
+##  Capability of an engine that accepts every distinct mesh once per slice, with the objects referring to it.
+#
+#   Such objects have the ID of their mesh and their transformation instead of their vertices.
+MeshReferencesCapability = "mesh_references"
+
+##  Capability of an engine that keeps the meshes that the previous slice referred to.
+#
+#   Those meshes are not sent again, so a slice of objects that were only moved only sends their transformations.
+MeshCacheCapability = "mesh_cache"
+
+##  Job that creates the messages that start a slice from a snapshot of the scene.
+#
+#   Transforming the meshes and creating the messages is done on a worker thread,
+#   so the scene does not need to be locked while doing so.
+class StartSliceJob(Job):
+    ##  Create the job.
+    #
+    #   \param settings A dict with the values of all settings of the profile to slice with.
+    #   \param object_groups A list of lists of ObjectSnapshot objects, one list per mesh group.
+    #   \param vertex_data_cache The vertex data of the previous slice, by object ID. Vertex data of
+    #                            objects that did not change is reused.
+    #   \param engine_id A string that identifies the engine that slices, so results of other engines are not reused.
+    #   \param engine_capabilities The capabilities that the engine reported, which decide the form of the slice message.
+    #   \param engine_mesh_ids The IDs of the meshes that the engine kept from the previous slice, which are not sent again.
+    def __init__(self, settings, object_groups, vertex_data_cache, engine_id = "", engine_capabilities = (), engine_mesh_ids = ()):
+        super().__init__()
+
+        self._settings = settings
+        self._engine_id = engine_id
+        self._engine_capabilities = engine_capabilities
+        self._engine_mesh_ids = engine_mesh_ids
+        self._object_groups = object_groups
+        self._previous_vertex_data_cache = vertex_data_cache
+
+        self._settings_message = None
+        self._slice_message = None
+        self._cache_key = None
+        self._object_ids = []
+        self._mesh_ids = frozenset()
+        self._vertex_data_cache = {}
+
+        self._cancelled = False
+
+    ##  Cancel the job.
+    #
+    #   If the job is already running, it stops creating messages as soon as possible.
+    def cancel(self):
+        super().cancel()
+        self._cancelled = True
+
+    def isCancelled(self):
+        return self._cancelled
+
+    def getSettingsMessage(self):
+        return self._settings_message
+
+    def getSliceMessage(self):
+        return self._slice_message
+
+    ##  Get a key that identifies all data sent to the engine.
+    def getCacheKey(self):
+        return self._cache_key
+
+    ##  Get the IDs of the objects in the slice message, in the order in which they occur in it.
+    def getObjectIds(self):
+        return self._object_ids
+
+    def getVertexDataCache(self):
+        return self._vertex_data_cache
+
+    ##  Get the capabilities of the engine that the slice message was created for.
+    def getEngineCapabilities(self):
+        return self._engine_capabilities
+
+    ##  Get the IDs of the meshes that the engine kept from the previous slice when the slice message was created.
+    def getEngineMeshIds(self):
+        return self._engine_mesh_ids
+
+    ##  Get the IDs of the meshes that the objects in the slice message refer to.
+    #
+    #   \return A frozenset of mesh IDs, which is empty if the objects have their own vertices.
+    def getMeshIds(self):
+        return self._mesh_ids
+
+    def run(self):
+        # Settings are sent sorted by name, so the same settings always give the same message and cache key.
+        settings_message = Cura_pb2.SettingList()
+        for key, value in sorted(self._settings.items(), key = lambda setting: setting[0]):
+            s = settings_message.settings.add()
+            s.name = key
+            s.value = str(value).encode("utf-8")
+
+        cache_key = hashlib.sha1(self._engine_id.encode("utf-8"))
+        cache_key.update(b"\n")
+        cache_key.update(settings_message.SerializeToString())
+
+        slice_message = Cura_pb2.Slice()
+        use_mesh_references = MeshReferencesCapability in self._engine_capabilities
+        use_mesh_cache = use_mesh_references and MeshCacheCapability in self._engine_capabilities
+
+        reused_bytes = 0
+        total_bytes = 0
+        mesh_hashes = set()
+        kept_meshes = 0
+        for group in self._object_groups:
+            group_message = slice_message.object_lists.add()
+            for snapshot in group:
+                if self._cancelled:
+                    return
+
+                obj = group_message.objects.add()
+                obj.id = snapshot.id
+                self._object_ids.append(obj.id)
+
+                mesh_hash = MeshHash.getMeshHash(snapshot.mesh_data)
+                if use_mesh_references:
+                    # Copies of a mesh share its vertices in the message, only their transformations differ.
+                    # Meshes that the engine kept from the previous slice are not sent at all.
+                    if mesh_hash not in mesh_hashes:
+                        if use_mesh_cache and mesh_hash in self._engine_mesh_ids:
+                            kept_meshes += 1
+                        else:
+                            mesh = slice_message.meshes.add()
+                            mesh.id = mesh_hash
+                            mesh.vertices = snapshot.mesh_data.getVertices().tobytes()
+                            total_bytes += len(mesh.vertices)
+                    obj.mesh_id = mesh_hash
+                    obj.transformation = self._getEngineTransformation(snapshot.mesh_data, snapshot.transformation).tobytes()
+                    digest = self._getDigest(mesh_hash, snapshot.transformation)
+                else:
+                    vertex_data = self._getVertexData(snapshot)
+                    self._vertex_data_cache[obj.id] = vertex_data
+                    obj.vertices = vertex_data.vertices
+
+                    total_bytes += len(vertex_data.vertices)
+                    if self._previous_vertex_data_cache.get(obj.id) is vertex_data:
+                        reused_bytes += len(vertex_data.vertices)
+                    digest = vertex_data.digest
+                mesh_hashes.add(mesh_hash)
+
+                self._addSettings(snapshot.settings, obj)
+
+                # The digest only depends on the mesh and the transformation, so the key is the same for both forms of the message.
+                cache_key.update(digest)
+                for setting in obj.settings:
+                    cache_key.update(setting.SerializeToString())
+
+            # Hack to add per-object settings also to the "MeshGroup" in CuraEngine
+            # We really should come up with a better solution for this.
+            self._addSettings(group[0].settings, group_message)
+
+            for setting in group_message.settings:
+                cache_key.update(setting.SerializeToString())
+            cache_key.update(b"\n") # Separate the groups, so moving an object to another group changes the key.
+
+        Logger.log("d", "Reused %s of %s bytes of vertex data from the previous slice.", reused_bytes, total_bytes)
+        Logger.log("d", "Slice message has %s objects with %s distinct meshes, of which the engine kept %s, and is %s bytes.", len(self._object_ids), len(mesh_hashes), kept_meshes, slice_message.ByteSize())
+
+        if use_mesh_references:
+            self._mesh_ids = frozenset(mesh_hashes)
+        self._settings_message = settings_message
+        self._slice_message = slice_message
+        self._cache_key = cache_key.hexdigest()
+
+    ##  Add settings to a message, sorted by name.
+    #
+    #   The sort is stable, so if a setting occurs more than once, the values stay in the order in which they override each other.
+    #
+    #   \param settings A list of (key, value) tuples.
+    #   \param message The message to add the settings to.
+    def _addSettings(self, settings, message):
+        for key, value in sorted(settings, key = lambda setting: setting[0]):
+            setting = message.settings.add()
+            setting.name = key
+            setting.value = str(value).encode()
+
+    ##  Get the vertex data of an object as it is sent to the engine.
+    #
+    #   The vertex data is transformed to world space and converted to the coordinate system of the engine.
+    #   It is only recomputed when the mesh or the transformation of the object changed since the previous slice.
+    #
+    #   \param snapshot The ObjectSnapshot to get the vertex data of.
+    #   \return A VertexData object.
+    def _getVertexData(self, snapshot):
+        mesh_data = snapshot.mesh_data
+        matrix = snapshot.transformation
+        transformation = matrix.tobytes()
+
+        vertex_data = self._previous_vertex_data_cache.get(snapshot.id)
+        if vertex_data and vertex_data.mesh_data is mesh_data and vertex_data.vertex_count == mesh_data.getVertexCount() and vertex_data.transformation == transformation:
+            return vertex_data
+
+        verts = mesh_data.getVertices()
+        engine_transformation = self._getEngineTransformation(mesh_data, matrix)
+
+        # The output is allocated for every transformation, as a job that is being cancelled may still write to the
+        # output of the previous one.
+        transformed = numpy.dot(verts, engine_transformation[:, 0:3].T)
+        transformed += engine_transformation[:, 3]
+        vertices = transformed.tobytes()
+
+        digest = self._getDigest(MeshHash.getMeshHash(mesh_data), matrix)
+
+        return VertexData(mesh_data, mesh_data.getVertexCount(), transformation, vertices, digest)
+
+    ##  Get the transformation of an object in the coordinate system of the engine.
+    #
+    #   The world transformation and the conversion to the engine's coordinate system, (x, y, z) -> (x, -z, y), are
+    #   folded into a single matrix and translation, so the vertices are transformed in one pass without intermediate copies.
+    #
+    #   \param mesh_data The MeshData of the object, which decides the type of the values.
+    #   \param matrix The world transformation of the object, as a 4x4 numpy array.
+    #   \return A 3x4 numpy array, with the matrix in the first three columns and the translation in the last.
+    def _getEngineTransformation(self, mesh_data, matrix):
+        engine_transformation = numpy.empty((3, 4), dtype = mesh_data.getVertices().dtype)
+        engine_transformation[:, 0:3] = numpy.dot(_engine_axes, matrix[0:3, 0:3])
+        engine_transformation[:, 3] = numpy.dot(_engine_axes, matrix[0:3, 3])
+        return engine_transformation
+
+    ##  Get a digest of the vertices of an object as the engine slices them.
+    #
+    #   The transformed vertices follow from the mesh and the transformation, so hash those instead of the vertices.
+    #   The hash of the mesh is shared by all copies of it, so it is only computed once per mesh.
+    #
+    #   \param mesh_hash The hash of the mesh of the object, see MeshHash.getMeshHash.
+    #   \param matrix The world transformation of the object, as a 4x4 numpy array.
+    def _getDigest(self, mesh_hash, matrix):
+        return hashlib.sha1(mesh_hash + matrix.tobytes()).digest()
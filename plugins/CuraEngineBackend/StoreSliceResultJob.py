@@ -0,0 +1,25 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Job import Job
+from UM.Logger import Logger
+
+import time
+
+##  Write the output of the engine to the slice cache, so the main thread does not wait for the disk.
+class StoreSliceResultJob(Job):
+    ##  Create a job that stores a slice result.
+    #
+    #   \param slice_cache The SliceCache to store the result in.
+    #   \param cache_key The key of the sliced input.
+    #   \param result The complete SliceResult to store.
+    def __init__(self, slice_cache, cache_key, result):
+        super().__init__()
+        self._slice_cache = slice_cache
+        self._cache_key = cache_key
+        self._result = result
+
+    def run(self):
+        start_time = time.time()
+        self._slice_cache.addSliceResult(self._cache_key, self._result)
+        Logger.log("d", "Stored slice result %s of %s bytes in %s seconds.", self._cache_key, self._result.getSize(), time.time() - start_time)
@@ -0,0 +1,110 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import mmap
+import numpy
+
+##  Number of characters that is searched for line breaks at once while indexing a chunk.
+_index_block_size = 4 * 1024 * 1024
+
+##  The lines of g-code in a list of chunks, without splitting the chunks into separate strings.
+#
+#   The lines are the same as those of splitting every chunk on "\n" and concatenating
+#   the results. Only the positions of the line breaks are stored, as numpy arrays, and
+#   a line is only created when it is accessed. This keeps the memory use of a large
+#   print low, while lines can still be accessed at random, for example to resend them.
+#
+#   Chunks can be strings, like the layers in the gcode_list of the scene, or bytes-like
+#   objects with UTF-8 data, like a memory-mapped file.
+class GCodeLines:
+    ##  Index the lines of a list of chunks.
+    #
+    #   \param chunks A list of strings or bytes-like objects. The chunks should not be changed afterwards.
+    def __init__(self, chunks):
+        self._chunks = list(chunks)
+        self._line_breaks = [_findLineBreaks(chunk) for chunk in self._chunks]
+
+        # Index of the first line of every chunk. Every chunk has one line more than it has line breaks.
+        line_counts = numpy.array([len(line_breaks) + 1 for line_breaks in self._line_breaks], dtype = numpy.int64)
+        self._first_lines = numpy.zeros(len(self._chunks), dtype = numpy.int64)
+        numpy.cumsum(line_counts[:-1], out = self._first_lines[1:])
+        self._line_count = int(line_counts.sum())
+
+        self._file = None
+
+    ##  Index the lines of a g-code file.
+    #
+    #   The file is memory-mapped, so only the parts of it that are accessed are read.
+    #
+    #   \param file_name The path of the file.
+    #   \param prefix A list of lines to put before the lines of the file.
+    @classmethod
+    def fromFile(cls, file_name, prefix = None):
+        f = open(file_name, "rb")
+        try:
+            data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        except ValueError: # Empty files can not be mapped.
+            data = b""
+
+        chunks = ["\n".join(prefix)] if prefix else []
+        lines = cls(chunks + [data])
+        lines._file = f
+        return lines
+
+    ##  Release the file this was created from, if any.
+    def close(self):
+        if self._file is not None:
+            for chunk in self._chunks:
+                if isinstance(chunk, mmap.mmap):
+                    chunk.close()
+            self._file.close()
+            self._file = None
+        self._chunks = []
+        self._line_breaks = []
+        self._first_lines = numpy.zeros(0, dtype = numpy.int64)
+        self._line_count = 0
+
+    def __len__(self):
+        return self._line_count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._line_count
+        if index < 0 or index >= self._line_count:
+            raise IndexError("g-code line index out of range")
+
+        chunk_index = int(numpy.searchsorted(self._first_lines, index, side = "right")) - 1
+        chunk = self._chunks[chunk_index]
+        line_breaks = self._line_breaks[chunk_index]
+        line = index - int(self._first_lines[chunk_index])
+
+        start = int(line_breaks[line - 1]) + 1 if line > 0 else 0
+        end = int(line_breaks[line]) if line < len(line_breaks) else len(chunk)
+
+        if isinstance(chunk, str):
+            return chunk[start:end]
+        return bytes(chunk[start:end]).decode("utf-8", "replace")
+
+    def __iter__(self):
+        for index in range(self._line_count):
+            yield self[index]
+
+##  Find the positions of the line breaks in a chunk.
+#
+#   \param chunk A string or bytes-like object.
+#   \return A numpy array with the indices of the "\n" characters in the chunk.
+def _findLineBreaks(chunk):
+    dtype = numpy.int32 if len(chunk) < 2 ** 31 else numpy.int64
+    parts = []
+    for start in range(0, len(chunk), _index_block_size):
+        block = chunk[start:start + _index_block_size]
+        if isinstance(block, str):
+            # UTF-32 has one code unit per character, so indices in it are indices in the string.
+            characters = numpy.frombuffer(block.encode("utf-32-le"), dtype = numpy.uint32)
+        else:
+            characters = numpy.frombuffer(block, dtype = numpy.uint8)
+        parts.append((numpy.flatnonzero(characters == 10) + start).astype(dtype))
+
+    if not parts:
+        return numpy.zeros(0, dtype = dtype)
+    return numpy.concatenate(parts)
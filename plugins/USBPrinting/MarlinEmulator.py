@@ -0,0 +1,404 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import os
+import pty
+import tty
+import re
+import random
+import select
+import threading
+import time
+import collections
+import functools
+
+##  Simulated Marlin firmware on a pseudo-terminal.
+#
+#   The emulator opens a pty and behaves like a printer running Marlin on the other end,
+#   so the printer connection can open it as a serial port. It implements the parts of
+#   the protocol the printer connection relies on:
+#   - Lines with a line number are checked for the line number and checksum. Errors are
+#     answered with "Resend:" and "ok", after flushing the receive buffer.
+#   - The receive buffer has a fixed size. Bytes that do not fit are lost, like on the
+#     firmware.
+#   - Received lines move to a command buffer of a few lines, and moves move on to a
+#     planner buffer. Moves take a fixed time, and "ok" is only sent for a move once it
+#     fits in the planner.
+#   - M105 is answered with temperatures, M104, M109, M140 and M190 set the target
+#     temperatures and M119 reports the endstops. While M109 and M190 wait for the
+#     temperature, the temperatures are reported periodically without a request, like
+#     Marlin does, so the printer connection keeps receiving lines during a long wait.
+#
+#   The latency of a USB serial adapter can be simulated by delaying responses, and line
+#   noise by corrupting received lines at random. Statistics about
+#   the lines that were received are collected, to benchmark the printer connection.
+class MarlinEmulator:
+    ##  Create the emulator.
+    #
+    #   \param rx_buffer_size The size of the receive buffer, in bytes.
+    #   \param command_buffer_size The number of lines in the command buffer.
+    #   \param planner_buffer_size The number of moves in the planner buffer.
+    #   \param move_time The time every move takes, in seconds.
+    #   \param error_rate The chance that a received line is corrupted.
+    #   \param latency The time by which responses are delayed, in seconds.
+    #   \param heat_rate The speed at which temperatures change, in degrees per second, or None to change them instantly.
+    #   \param wait_report_interval The time between temperature reports while waiting for a temperature, in seconds, or None to not report.
+    #   \param seed The seed for the random generator that corrupts lines.
+    def __init__(self, rx_buffer_size = 128, command_buffer_size = 4, planner_buffer_size = 16, move_time = 0.0, error_rate = 0.0, latency = 0.0, heat_rate = None, wait_report_interval = 1.0, seed = None):
+        self._rx_buffer_size = rx_buffer_size
+        self._command_buffer_size = command_buffer_size
+        self._planner_buffer_size = planner_buffer_size
+        self._move_time = move_time
+        self._error_rate = error_rate
+        self._latency = latency
+        self._heat_rate = heat_rate
+        self._wait_report_interval = wait_report_interval
+        self._random = random.Random(seed)
+
+        self._master = None
+        self._slave = None
+        self._port = None
+
+        self._running = False
+        self._reader_thread = None
+        self._firmware_thread = None
+        self._writer_thread = None
+        self._condition = threading.Condition()
+
+        self._responses = collections.deque() # Tuples of the time at which to send a response and the response.
+        self._responses_condition = threading.Condition()
+
+        self._rx_buffer = bytearray()
+        self._commands = collections.deque()
+        self._planner = collections.deque() # The times at which the moves in the planner are finished.
+        self._last_line_number = 0
+
+        self._temperature = 20.0
+        self._target_temperature = 0.0
+        self._bed_temperature = 20.0
+        self._target_bed_temperature = 0.0
+        self._temperature_time = time.time()
+        self._wait_start_time = None # The time at which the command at the front started waiting for a temperature.
+        self._wait_report_time = None
+
+        self._resend_times = {}
+        self._statistics = self._createStatistics()
+
+    ##  Get the name of the serial port to connect to.
+    def getPort(self):
+        return self._port
+
+    ##  Open the pty and start responding to commands.
+    #
+    #   \return The name of the serial port to connect to.
+    def start(self):
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        self._port = os.ttyname(self._slave)
+
+        self._running = True
+        self._reader_thread = threading.Thread(target = self._read)
+        self._reader_thread.daemon = True
+        self._reader_thread.start()
+        self._firmware_thread = threading.Thread(target = self._run)
+        self._firmware_thread.daemon = True
+        self._firmware_thread.start()
+        self._writer_thread = threading.Thread(target = self._writeResponses)
+        self._writer_thread.daemon = True
+        self._writer_thread.start()
+
+        self._write("start\n")
+        return self._port
+
+    ##  Stop responding to commands and close the pty.
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        with self._responses_condition:
+            self._responses_condition.notify_all()
+        for thread in (self._reader_thread, self._firmware_thread, self._writer_thread):
+            if thread is not None:
+                thread.join()
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = None
+        self._slave = None
+
+    ##  Get statistics about the lines that were received since the emulator started or the statistics were reset.
+    #
+    #   \return A dict with:
+    #           - "lines": The number of lines that were accepted.
+    #           - "moves": The number of moves that were finished.
+    #           - "errors": The number of lines that were rejected and requested again.
+    #           - "corrupted": The number of lines that were corrupted on purpose.
+    #           - "overflow_bytes": The number of bytes that were lost because the receive buffer was full.
+    #           - "latencies": For every accepted line, the time between taking it from the receive buffer and sending "ok" for it.
+    #           - "recovery_times": For every resend request, the time until the requested line was accepted.
+    #           - "starved_time": The time the planner was empty between the first and the last move.
+    #           - "wait_time": The time that M109 and M190 waited for the temperature.
+    #           - "wait_reports": The number of temperature reports that were sent while waiting.
+    def getStatistics(self):
+        with self._condition:
+            statistics = dict(self._statistics)
+            statistics["latencies"] = list(self._statistics["latencies"])
+            statistics["recovery_times"] = list(self._statistics["recovery_times"])
+            return statistics
+
+    def resetStatistics(self):
+        with self._condition:
+            self._statistics = self._createStatistics()
+
+    def _createStatistics(self):
+        return {
+            "lines": 0,
+            "moves": 0,
+            "errors": 0,
+            "corrupted": 0,
+            "overflow_bytes": 0,
+            "latencies": [],
+            "recovery_times": [],
+            "starved_time": 0.0,
+            "wait_time": 0.0,
+            "wait_reports": 0,
+            "last_move_time": None
+        }
+
+    ##  Receive bytes from the pty into the receive buffer. Runs on the reader thread, like the serial interrupt.
+    def _read(self):
+        while self._running:
+            try:
+                readable, _, _ = select.select([self._master], [], [], 0.1)
+                if not readable:
+                    continue
+                data = os.read(self._master, 4096)
+            except OSError:
+                return
+
+            with self._condition:
+                space = self._rx_buffer_size - len(self._rx_buffer)
+                if len(data) > space:
+                    self._statistics["overflow_bytes"] += len(data) - max(space, 0)
+                    data = data[:max(space, 0)]
+                self._rx_buffer.extend(data)
+                self._condition.notify_all()
+
+    ##  The main loop of the firmware. Runs on the firmware thread.
+    def _run(self):
+        with self._condition:
+            while self._running:
+                now = time.time()
+                self._updatePlanner(now)
+                self._updateTemperatures(now)
+                self._getCommands(now)
+
+                if self._commands and self._processCommand(*self._commands[0]):
+                    self._commands.popleft()
+                    continue
+
+                timeout = 0.01
+                if self._planner:
+                    timeout = min(timeout, max(0.0, self._planner[0] - now))
+                self._condition.wait(timeout)
+
+    ##  Move complete lines from the receive buffer to the command buffer, checking line numbers and checksums.
+    def _getCommands(self, now):
+        while len(self._commands) < self._command_buffer_size:
+            end = self._rx_buffer.find(b"\n")
+            if end < 0:
+                return
+            line = bytes(self._rx_buffer[:end]).strip(b"\r")
+            del self._rx_buffer[:end + 1]
+            if not line.strip():
+                continue
+
+            if self._error_rate > 0 and self._random.random() < self._error_rate:
+                line = self._corrupt(line)
+                self._statistics["corrupted"] += 1
+
+            command = self._checkLine(line.decode("utf-8", "replace"), now)
+            if command is not None:
+                self._commands.append((command, now))
+
+    ##  Check the line number and checksum of a line.
+    #
+    #   \return The command without line number and checksum, or None if the line was rejected.
+    def _checkLine(self, line, now):
+        if not line.startswith("N"):
+            return line.strip()
+
+        match = re.match(r"N(\d+)", line)
+        if match is None:
+            return self._requestResend("Line Number is not Last Line Number+1")
+        line_number = int(match.group(1))
+        command = line[match.end():]
+
+        if "*" not in line:
+            return self._requestResend("No Checksum with line number")
+        command, checksum = command.rsplit("*", 1)
+        if line_number != self._last_line_number + 1 and not command.strip().startswith("M110"):
+            return self._requestResend("Line Number is not Last Line Number+1")
+        expected = functools.reduce(lambda x, y: x ^ y, line[:line.rfind("*")].encode("utf-8", "replace"), 0)
+        try:
+            valid = int(checksum.strip()) == expected
+        except ValueError:
+            valid = False
+        if not valid:
+            return self._requestResend("checksum mismatch")
+
+        self._last_line_number = line_number
+        resend_time = self._resend_times.pop(line_number, None)
+        if resend_time is not None:
+            self._statistics["recovery_times"].append(now - resend_time)
+        return command.strip()
+
+    ##  Reject a line: flush the receive buffer and ask for the line after the last accepted line.
+    def _requestResend(self, error):
+        line_number = self._last_line_number + 1
+        self._statistics["errors"] += 1
+        self._resend_times.setdefault(line_number, time.time())
+        self._rx_buffer.clear()
+        self._write("Error:%s, Last Line: %d\nResend: %d\nok\n" % (error, self._last_line_number, line_number))
+        return None
+
+    ##  Change one character of a line, as line noise would.
+    def _corrupt(self, line):
+        line = bytearray(line)
+        index = self._random.randrange(1, len(line)) if len(line) > 1 else 0 # Keep the "N", so the line is still checked.
+        line[index] = (line[index] + self._random.randrange(1, 10)) % 128 or 1
+        if line[index] == ord("\n"):
+            line[index] += 1
+        return bytes(line)
+
+    ##  Execute the command at the front of the command buffer.
+    #
+    #   \return True if the command was executed, or False if it has to wait, for example for space in the planner.
+    def _processCommand(self, command, received_time):
+        code = command.split(" ", 1)[0].upper()
+        response = ""
+
+        if code in ("G0", "G1", "G2", "G3"):
+            if len(self._planner) >= self._planner_buffer_size:
+                return False
+            start = self._planner[-1] if self._planner else time.time()
+            if not self._planner and self._statistics["last_move_time"] is not None:
+                self._statistics["starved_time"] += start - self._statistics["last_move_time"]
+            self._planner.append(start + self._move_time)
+        elif code == "M400" or code == "G28":
+            if self._planner:
+                return False
+        elif code == "M105":
+            self._write("ok T:%.1f /%.1f B:%.1f /%.1f @:0 B@:0\n" % (self._temperature, self._target_temperature, self._bed_temperature, self._target_bed_temperature))
+            self._finishCommand(received_time)
+            return True
+        elif code in ("M104", "M109"):
+            self._target_temperature = self._getValue(command, "S", self._target_temperature)
+            if code == "M109" and abs(self._temperature - self._target_temperature) > 0.5:
+                self._waitForTemperature("T:%.1f E:0 W:?\n" % self._temperature)
+                return False
+        elif code in ("M140", "M190"):
+            self._target_bed_temperature = self._getValue(command, "S", self._target_bed_temperature)
+            if code == "M190" and abs(self._bed_temperature - self._target_bed_temperature) > 0.5:
+                self._waitForTemperature("T:%.1f E:0 B:%.1f\n" % (self._temperature, self._bed_temperature))
+                return False
+        elif code == "M119":
+            response = "Reporting endstop status\nx_min: open\ny_min: open\nz_min: open\nx_max: open\ny_max: open\nz_max: open\n"
+
+        if self._wait_start_time is not None:
+            self._statistics["wait_time"] += time.time() - self._wait_start_time
+            self._wait_start_time = None
+
+        self._write(response + "ok\n")
+        self._finishCommand(received_time)
+        return True
+
+    ##  Report the temperatures while a command waits for a temperature, once every report interval.
+    #
+    #   \param report The report, in the format Marlin sends for the command.
+    def _waitForTemperature(self, report):
+        now = time.time()
+        if self._wait_start_time is None:
+            self._wait_start_time = now
+            self._wait_report_time = now
+        if self._wait_report_interval is not None and now >= self._wait_report_time + self._wait_report_interval:
+            self._write(report)
+            self._statistics["wait_reports"] += 1
+            self._wait_report_time = now
+
+    def _finishCommand(self, received_time):
+        self._statistics["lines"] += 1
+        self._statistics["latencies"].append(time.time() - received_time)
+
+    ##  Remove the finished moves from the planner.
+    def _updatePlanner(self, now):
+        while self._planner and self._planner[0] <= now:
+            self._statistics["last_move_time"] = self._planner.popleft()
+            self._statistics["moves"] += 1
+
+    ##  Move the temperatures towards their targets.
+    def _updateTemperatures(self, now):
+        step = (now - self._temperature_time) * self._heat_rate if self._heat_rate is not None else float("inf")
+        self._temperature_time = now
+        self._temperature = self._approach(self._temperature, self._target_temperature, step)
+        self._bed_temperature = self._approach(self._bed_temperature, self._target_bed_temperature, step)
+
+    def _approach(self, value, target, step):
+        if target == 0: # Heaters that are off cool down to room temperature.
+            target = 20.0
+        if abs(target - value) <= step:
+            return target
+        return value + step if target > value else value - step
+
+    def _getValue(self, command, key, default):
+        match = re.search(key + r"([-0-9.]+)", command)
+        if match is None:
+            return default
+        try:
+            return float(match.group(1))
+        except ValueError:
+            return default
+
+    ##  Send a response, after the latency.
+    def _write(self, data):
+        with self._responses_condition:
+            self._responses.append((time.time() + self._latency, data.encode()))
+            self._responses_condition.notify_all()
+
+    ##  Write the responses to the pty when they are due. Runs on the writer thread.
+    def _writeResponses(self):
+        while self._running:
+            with self._responses_condition:
+                while self._running and (not self._responses or self._responses[0][0] > time.time()):
+                    self._responses_condition.wait(self._responses[0][0] - time.time() if self._responses else None)
+                if not self._running:
+                    return
+                data = self._responses.popleft()[1]
+
+            try:
+                os.write(self._master, data)
+            except OSError:
+                return
+
+##  Run the emulator until it is interrupted, printing the port to connect to.
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description = "Simulated Marlin firmware on a pseudo-terminal.")
+    parser.add_argument("--planner-buffer-size", type = int, default = 16)
+    parser.add_argument("--move-time", type = float, default = 0.0)
+    parser.add_argument("--error-rate", type = float, default = 0.0)
+    parser.add_argument("--latency", type = float, default = 0.0)
+    args = parser.parse_args()
+
+    emulator = MarlinEmulator(planner_buffer_size = args.planner_buffer_size, move_time = args.move_time, error_rate = args.error_rate, latency = args.latency)
+    print(emulator.start())
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    emulator.stop()
+
+if __name__ == "__main__":
+    main()
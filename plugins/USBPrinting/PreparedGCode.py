@@ -0,0 +1,154 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+from UM.Logger import Logger
+
+import threading
+import re
+import numpy
+
+##  Commands that change a target temperature, which the printer connection keeps track of.
+_temperature_commands = ("M104", "M109", "M140", "M190")
+
+_z_regex = re.compile(r"Z([0-9\.]*)")
+
+##  Lines of g-code in the form they are sent to the printer, prepared in batches ahead of the print.
+#
+#   Preparing a line means removing its comment and surrounding whitespace, replacing
+#   M0 and M1, which firmware handles as an LCD menu pause, by M105, and adding the line
+#   number and checksum. This is done for a whole batch of lines at once, on a worker
+#   thread that stays a few batches ahead of the line that is being sent. The checksums
+#   of a batch are computed with numpy.
+#
+#   Lines that change the Z position or a target temperature are recorded while a batch
+#   is prepared, so the printer connection does not need to parse every line it sends.
+class PreparedGCode:
+    ##  Create the prepared lines of a g-code.
+    #
+    #   \param gcode A sequence of g-code lines, for example a GCodeLines object. Line numbers are the indices in it.
+    #   \param batch_size The number of lines that is prepared at once.
+    #   \param batches_ahead The number of batches that is prepared ahead of the line that is being sent.
+    def __init__(self, gcode, batch_size = 2048, batches_ahead = 4):
+        self._gcode = gcode
+        self._batch_size = batch_size
+        self._batches_ahead = batches_ahead
+
+        self._batches = {}
+        self._requested_batch = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(target = self._prepareAhead)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __len__(self):
+        return len(self._gcode)
+
+    ##  Get a prepared line.
+    #
+    #   If the batch of the line is not prepared yet, it is prepared on the calling thread.
+    #   Batches far behind the line are forgotten; they are prepared again if a resend needs them.
+    #
+    #   \param index The line number.
+    #   \return A tuple with the bytes to send, the Z position the line moves to or None, and the
+    #           line without line number and checksum if it changes a target temperature or None.
+    def getLine(self, index):
+        batch_index = index // self._batch_size
+        with self._condition:
+            batch = self._batches.get(batch_index)
+            if batch_index != self._requested_batch:
+                self._requested_batch = batch_index
+                # Keep the previous batch, so resends of recent lines do not need to prepare it again.
+                for old_index in [i for i in self._batches if i < batch_index - 1]:
+                    del self._batches[old_index]
+                self._condition.notify()
+
+        if batch is None:
+            batch = self._prepareBatch(batch_index)
+            with self._condition:
+                self._batches[batch_index] = batch
+
+        data, changes = batch
+        offset = index - batch_index * self._batch_size
+        z, temperature_line = changes.get(offset, (None, None))
+        return data[offset], z, temperature_line
+
+    ##  Stop preparing lines.
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._batches = {}
+            self._condition.notify()
+
+    ##  Prepare the batches ahead of the requested one, until closed. Runs on the worker thread.
+    def _prepareAhead(self):
+        batch_count = (len(self._gcode) + self._batch_size - 1) // self._batch_size
+        while True:
+            with self._condition:
+                while not self._closed:
+                    missing = [i for i in range(self._requested_batch, min(self._requested_batch + self._batches_ahead + 1, batch_count)) if i not in self._batches]
+                    if missing:
+                        break
+                    self._condition.wait()
+                if self._closed:
+                    return
+                batch_index = missing[0]
+
+            try:
+                batch = self._prepareBatch(batch_index)
+            except Exception as e:
+                Logger.log("e", "Unable to prepare g-code for printing: %s", e)
+                return
+
+            with self._condition:
+                if not self._closed and batch_index >= self._requested_batch - 1:
+                    self._batches[batch_index] = batch
+
+    ##  Prepare a batch of lines.
+    #
+    #   \return A tuple with a list of the prepared lines as bytes, and a dict with (z, temperature line) tuples
+    #           of the lines that change those, by index in the batch.
+    def _prepareBatch(self, batch_index):
+        first = batch_index * self._batch_size
+        last = min(first + self._batch_size, len(self._gcode))
+
+        lines = []
+        changes = {}
+        for offset, index in enumerate(range(first, last)):
+            line = self._gcode[index]
+            if ";" in line:
+                line = line[:line.find(";")]
+            line = line.strip()
+            if line == "M0" or line == "M1":
+                line = "M105" # Don't send the M0 or M1 to the machine, as M0 and M1 are handled as an LCD menu pause.
+            lines.append(line)
+
+            if "M" in line and any(command in line for command in _temperature_commands):
+                changes[offset] = (None, line)
+            elif ("G0" in line or "G1" in line) and "Z" in line:
+                try:
+                    changes[offset] = (float(_z_regex.search(line).group(1)), None)
+                except ValueError:
+                    pass
+
+        bodies = [("N%d%s" % (index, line)).encode() for index, line in zip(range(first, last), lines)]
+        return [body + ("*%d\n" % checksum).encode() for body, checksum in zip(bodies, _getChecksums(bodies))], changes
+
+##  Compute the checksums of lines, which are the XOR of all bytes of each line.
+#
+#   The checksums of all lines are computed at once, from the cumulative XOR over their
+#   concatenation.
+#
+#   \param lines A list of bytes objects.
+#   \return A list with the checksum of every line, as int.
+def _getChecksums(lines):
+    if not lines:
+        return []
+
+    lengths = numpy.array([len(line) for line in lines], dtype = numpy.int64)
+    ends = numpy.cumsum(lengths)
+    data = numpy.frombuffer(b"".join(lines), dtype = numpy.uint8)
+    cumulative = numpy.zeros(len(data) + 1, dtype = numpy.uint8)
+    numpy.bitwise_xor.accumulate(data, out = cumulative[1:])
+    return (cumulative[ends] ^ cumulative[ends - lengths]).tolist()
@@ -2,19 +2,23 @@
 # Cura is released under the terms of the AGPLv3 or higher.
 
 from .avr_isp import stk500v2, ispBase, intelHex
+from .GCodeLines import GCodeLines
+from .PreparedGCode import PreparedGCode
+from .SendWindow import SendWindow
 import serial
 import threading
 import time
 import queue
 import re
-import functools
 import os
 import os.path
+import collections
 
 from UM.Application import Application
 from UM.Signal import Signal, SignalEmitter
 from UM.Resources import Resources
 from UM.Logger import Logger
+from UM.Preferences import Preferences
 from UM.OutputDevice.OutputDevice import OutputDevice
 from UM.OutputDevice import OutputDeviceError
 from UM.PluginRegistry import PluginRegistry
@@ -58,6 +62,16 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
         # response. If the baudrate is correct, this should make sense, else we get giberish.
         self._required_responses_auto_baud = 3
 
+        # A baud rate that was not used before is rejected early when more than this number of unreadable lines
+        # is received. A single unreadable line can be noise from the bootloader or from opening the port.
+        self._max_unreadable_lines_auto_baud = 1
+
+        # The number of devices to remember the baud rate of.
+        self._max_remembered_baud_rates = 20
+
+        # The remembered baud rates by device ID, read when connecting, as the preferences are only used from the main thread.
+        self._remembered_baud_rates = {}
+
         self._progress = 0
 
         self._listen_thread = threading.Thread(target=self._listen)
@@ -80,8 +94,24 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
         ## Keep track where in the provided g-code the print is
         self._gcode_position = 0
 
-        # List of gcode lines to be printed
-        self._gcode = []
+        # Lines of gcode to be printed
+        self._gcode = GCodeLines([])
+
+        # The lines of gcode to be printed as they are sent to the printer
+        self._prepared_gcode = None
+
+        # Lines sent to the printer that were not acknowledged yet. If the window allows more than one line,
+        # lines are sent ahead of the acknowledgements instead of one line per "ok".
+        self._send_window = SendWindow(1, 0)
+
+        # A command taken from the command queue that did not fit in the send window yet.
+        self._pending_command = None
+
+        # Number of "ok" responses that belong to resend requests instead of to lines in the send window.
+        self._resend_ok_count = 0
+
+        # Number of lines that still have to be acknowledged one at a time after a resend request.
+        self._recovery_line_count = 0
 
         # Number of extruders
         self._extruder_count = 1
@@ -119,6 +149,8 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
 
         self._control_view = None
 
+        self.connectFinished.connect(self._onConnectFinished)
+
     onError = pyqtSignal()
     progressChanged = pyqtSignal()
     extruderTemperatureChanged = pyqtSignal()
@@ -168,19 +200,27 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
             self.writeError.emit(self)
             return
 
-        self._gcode.clear()
-        for layer in gcode_list:
-            self._gcode.extend(layer.split("\n"))
-
         #Reset line number. If this is not done, first line is sometimes ignored
-        self._gcode.insert(0, "M110")
+        self._gcode = GCodeLines(["M110"] + list(gcode_list))
+        if self._prepared_gcode is not None:
+            self._prepared_gcode.close()
+        self._prepared_gcode = PreparedGCode(self._gcode)
         self._gcode_position = 0
         self._print_start_time_100 = None
         self._is_printing = True
         self._print_start_time = time.time()
 
-        for i in range(0, 4): #Push first 4 entries before accepting other inputs
-            self._sendNextGcodeLine()
+        preferences = Preferences.getInstance()
+        self._send_window = SendWindow(int(preferences.getValue("usb_printing/send_window")), int(preferences.getValue("usb_printing/rx_buffer_size")))
+        self._pending_command = None
+        self._resend_ok_count = 0
+        self._recovery_line_count = 0
+
+        if self._isWindowed():
+            self._fillSendWindow()
+        else:
+            for i in range(0, 4): #Push first 4 entries before accepting other inputs
+                self._sendNextGcodeLine()
 
         self.writeFinished.emit(self)
 
@@ -191,7 +231,8 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
 
     ##  Try to connect the serial. This simply starts the thread, which runs _connect.
     def connect(self):
-        if not self._updating_firmware and not self._connect_thread.isAlive():
+        if not self._updating_firmware and not self._connect_thread.is_alive():
+            self._remembered_baud_rates = self._getBaudRatePreference()
             self._connect_thread.start()
 
     ##  Private fuction (threaded) that actually uploads the firmware.
@@ -255,54 +296,177 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
     def _connect(self):
         Logger.log("d", "Attempting to connect to %s", self._serial_port)
         self._is_connecting = True
-        programmer = stk500v2.Stk500v2()
-        try:
-            programmer.connect(self._serial_port) # Connect with the serial, if this succeeds, it"s an arduino based usb device.
-            self._serial = programmer.leaveISP()
-        except ispBase.IspError as e:
-            Logger.log("i", "Could not establish connection on %s: %s. Device is not arduino based." %(self._serial_port,str(e)))
-        except Exception as e:
-            Logger.log("i", "Could not establish connection on %s, unknown reasons.  Device is not arduino based." % self._serial_port)
+        start_time = time.time()
+
+        serial_id = self._getSerialId()
+        remembered_baud_rate = self._remembered_baud_rates.get(serial_id)
+        baud_rates = self._getBaudrateList()
+        if remembered_baud_rate in baud_rates: # Try the baud rate that worked last time first.
+            baud_rates.remove(remembered_baud_rate)
+            baud_rates.insert(0, remembered_baud_rate)
+
+        # Opening the port or leaving ISP mode resets the printer, after which the bootloader runs for a while.
+        wait_for_bootloader = True
+
+        # The programmer only gives some debugging information, so skip it if the printer connected before.
+        if remembered_baud_rate is None:
+            programmer = stk500v2.Stk500v2()
+            try:
+                programmer.connect(self._serial_port) # Connect with the serial, if this succeeds, it"s an arduino based usb device.
+                self._serial = programmer.leaveISP()
+            except ispBase.IspError as e:
+                Logger.log("i", "Could not establish connection on %s: %s. Device is not arduino based." %(self._serial_port,str(e)))
+            except Exception as e:
+                Logger.log("i", "Could not establish connection on %s, unknown reasons.  Device is not arduino based." % self._serial_port)
 
         # If the programmer connected, we know its an atmega based version. Not all that usefull, but it does give some debugging information.
-        for baud_rate in self._getBaudrateList(): # Cycle all baud rates (auto detect)
+        attempts = 0
+        for baud_rate in baud_rates: # Cycle all baud rates (auto detect)
             Logger.log("d","Attempting to connect to printer with serial %s on baud rate %s", self._serial_port, baud_rate)
+            attempts += 1
             if self._serial is None:
                 try:
                     self._serial = serial.Serial(str(self._serial_port), baud_rate, timeout = 3, writeTimeout = 10000)
                 except serial.SerialException:
                     #Logger.log("i", "Could not open port %s" % self._serial_port)
                     continue
+                wait_for_bootloader = True
             else:
                 if not self.setBaudRate(baud_rate):
                     continue # Could not set the baud rate, go to the next
 
-            time.sleep(1.5) # Ensure that we are not talking to the bootloader. 1.5 sec seems to be the magic number
-            sucesfull_responses = 0
-            timeout_time = time.time() + 5
-            self._serial.write(b"\n")
-            self._sendCommand("M105")  # Request temperature, as this should (if baudrate is correct) result in a command with "T:" in it
-            while timeout_time > time.time():
-                line = self._readline()
-                if line is None:
+            if wait_for_bootloader:
+                if not self._waitForBootloader():
                     self.setIsConnected(False) # Something went wrong with reading, could be that close was called.
                     return
-                
-                if b"T:" in line:
-                    self._serial.timeout = 0.5
-                    sucesfull_responses += 1
-                    if sucesfull_responses >= self._required_responses_auto_baud:
-                        self._serial.timeout = 2 #Reset serial timeout
-                        self.setIsConnected(True)
-                        Logger.log("i", "Established printer connection on port %s" % self._serial_port)
-                        return 
-
-                self._sendCommand("M105") # Send M105 as long as we are listening, otherwise we end up in an undefined state
+                wait_for_bootloader = False
+
+            result = self._checkBaudRate(baud_rate == remembered_baud_rate)
+            if result is None:
+                self.setIsConnected(False) # Something went wrong with reading, could be that close was called.
+                return
+            if result:
+                self._serial.timeout = 2 #Reset serial timeout
+                self._reportConnect(True, serial_id, baud_rate, remembered_baud_rate, attempts, time.time() - start_time)
+                self.setIsConnected(True)
+                Logger.log("i", "Established printer connection on port %s" % self._serial_port)
+                return
 
         Logger.log("e", "Baud rate detection for %s failed", self._serial_port)
+        self._reportConnect(False, serial_id, None, remembered_baud_rate, attempts, time.time() - start_time)
         self.close() # Unable to connect, wrap up.
         self.setIsConnected(False)
 
+    ##  Wait until the bootloader of the printer is done, so we are not talking to the bootloader.
+    #
+    #   The firmware prints "start" when it starts, so the wait ends as soon as that is
+    #   received. Otherwise it ends after 1.5 sec, which seems to be the magic number.
+    #
+    #   \return False if reading from the serial port failed, True otherwise.
+    def _waitForBootloader(self):
+        self._serial.timeout = 0.1
+        timeout_time = time.time() + 1.5
+        while timeout_time > time.time():
+            line = self._readline()
+            if line is None:
+                return False
+            if line.strip() == b"start":
+                break
+        return True
+
+    ##  Check whether the printer responds at the current baud rate.
+    #
+    #   The printer is sent M105 commands, which it should answer with a line with "T:"
+    #   in it. At the wrong baud rate, the printer sends gibberish instead. For a baud rate
+    #   that was not used before, repeated gibberish ends the check early. A remembered baud
+    #   rate is given the full timeout, since gibberish there is more likely noise than a
+    #   wrong rate. The timeouts are shorter for a baud rate that was not used before, as
+    #   the printer responds quickly at the right baud rate.
+    #
+    #   \param remembered Whether the printer connected at this baud rate before.
+    #   \return True if the baud rate is correct, False if it is not, or None if reading from the serial port failed.
+    def _checkBaudRate(self, remembered):
+        self._serial.timeout = 0.5 if remembered else 0.25
+        timeout_time = time.time() + (5 if remembered else 2)
+        sucesfull_responses = 0
+        unreadable_lines = 0
+        self._serial.write(b"\n")
+        self._sendCommand("M105")  # Request temperature, as this should (if baudrate is correct) result in a command with "T:" in it
+        while timeout_time > time.time():
+            line = self._readline()
+            if line is None:
+                return None
+
+            if b"T:" in line:
+                sucesfull_responses += 1
+                if sucesfull_responses >= self._required_responses_auto_baud:
+                    return True
+            elif line and not self._isReadable(line):
+                unreadable_lines += 1
+                if not remembered and unreadable_lines > self._max_unreadable_lines_auto_baud:
+                    return False # Gibberish, so this is not the right baud rate.
+
+            self._sendCommand("M105") # Send M105 as long as we are listening, otherwise we end up in an undefined state
+        return False
+
+    ##  Check whether a line received from the printer consists of readable text.
+    def _isReadable(self, line):
+        return all(32 <= c < 127 or c in b"\r\n\t" for c in line)
+
+    ##  Get an ID of the device on the serial port, which stays the same when it is connected to another port.
+    #
+    #   \return The hardware ID of the USB device, which includes its serial number, or the name of the port if it is unknown.
+    def _getSerialId(self):
+        try:
+            import serial.tools.list_ports
+            for port in serial.tools.list_ports.comports():
+                if port[0] == self._serial_port and port[2] and port[2] != "n/a":
+                    return port[2]
+        except Exception as e:
+            Logger.log("w", "Could not get the hardware ID of %s: %s", self._serial_port, e)
+        return self._serial_port
+
+    ##  Remember the baud rate at which the device with an ID connected.
+    #
+    #   This changes the preferences, so it is only called from the main thread.
+    def _rememberBaudRate(self, serial_id, baud_rate):
+        baud_rates = self._getBaudRatePreference()
+        baud_rates.pop(serial_id, None)
+        baud_rates[serial_id] = baud_rate # Remembered baud rates are kept in order of use.
+        entries = ["%s=%s" % (key, value) for key, value in baud_rates.items()][-self._max_remembered_baud_rates:]
+        Preferences.getInstance().setValue("usb_printing/baud_rates", ";".join(entries))
+
+    ##  Get the remembered baud rates, as an ordered dict by device ID.
+    def _getBaudRatePreference(self):
+        baud_rates = collections.OrderedDict()
+        for entry in Preferences.getInstance().getValue("usb_printing/baud_rates").split(";"):
+            serial_id, _, baud_rate = entry.rpartition("=")
+            try:
+                baud_rates[serial_id] = int(baud_rate)
+            except ValueError:
+                continue
+        return baud_rates
+
+    ##  Log how the connection attempt went and emit connectFinished.
+    def _reportConnect(self, connected, serial_id, baud_rate, remembered_baud_rate, attempts, duration):
+        metrics = {
+            "connected": connected,
+            "serial_id": serial_id,
+            "baud_rate": baud_rate,
+            "remembered_baud_rate": remembered_baud_rate,
+            "attempts": attempts,
+            "time": duration
+        }
+        Logger.log("d", "Connecting to %s took %.2f seconds and %s attempts, at baud rate %s.", self._serial_port, duration, attempts, baud_rate)
+        self.connectFinished.emit(self._serial_port, metrics)
+
+    ##  Remember the baud rate of a successful connection.
+    #
+    #   The signal is emitted on the connect thread, and is delivered on the main thread.
+    def _onConnectFinished(self, serial_port, metrics):
+        if metrics["connected"]:
+            self._rememberBaudRate(metrics["serial_id"], metrics["baud_rate"])
+
     ##  Set the baud rate of the serial. This can cause exceptions, but we simply want to ignore those.
     def setBaudRate(self, baud_rate):
         try:
@@ -323,10 +487,14 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
 
     connectionStateChanged = Signal()
 
+    ##  Emitted when a connection attempt finished, with the serial port and a dict with "connected", "serial_id",
+    #   "baud_rate", "remembered_baud_rate", "attempts" and "time" (in seconds).
+    connectFinished = Signal()
+
     ##  Close the printer connection
     def close(self):
         Logger.log("d", "Closing the printer connection.")
-        if self._connect_thread.isAlive():
+        if self._connect_thread.is_alive():
             try:
                 self._connect_thread.join()
             except Exception as e:
@@ -375,6 +543,12 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
         if self._serial is None:
             return
 
+        self._updateTargetTemperatures(cmd)
+        self._writeSerial((cmd + "\n").encode())
+
+    ##  Keep track of the target temperatures a command sets.
+    #   \param cmd string with g-code
+    def _updateTargetTemperatures(self, cmd):
         if "M109" in cmd or "M190" in cmd:
             self._heatup_wait_start_time = time.time()
         if "M104" in cmd or "M109" in cmd:
@@ -390,15 +564,20 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
                 self._target_bed_temperature = float(re.search("S([0-9]+)", cmd).group(1))
             except:
                 pass
+
+    ##  Write a command, terminated by a newline, to the serial port.
+    #   \param command bytes to write
+    def _writeSerial(self, command):
+        if self._serial is None:
+            return
+
         try:
-            command = (cmd + "\n").encode()
-            self._serial.write(b"\n")
-            self._serial.write(command)
+            self._serial.write(b"\n" + command)
         except serial.SerialTimeoutException:
             Logger.log("w","Serial timeout while writing to serial port, trying again.")
             try:
                 time.sleep(0.5)
-                self._serial.write((cmd + "\n").encode())
+                self._serial.write(command)
             except Exception as e:
                 Logger.log("e","Unexpected error while writing serial port %s " % e)
                 self._setErrorState("Unexpected error while writing serial port %s " % e)
@@ -526,19 +705,29 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
             if self._is_printing:
                 if line == b"" and time.time() > ok_timeout:
                     line = b"ok" # Force a timeout (basicly, send next command)
+                    # Acknowledgements were lost, so consider all lines in flight processed.
+                    self._send_window.clear()
+                    self._resend_ok_count = 0
 
                 if b"ok" in line:
                     ok_timeout = time.time() + 5
-                    if not self._command_queue.empty():
+                    if self._isWindowed():
+                        if self._resend_ok_count > 0:
+                            self._resend_ok_count -= 1
+                        else:
+                            self._send_window.acknowledge()
+                            self._recovery_line_count = max(0, self._recovery_line_count - 1)
+                        self._fillSendWindow()
+                    elif not self._command_queue.empty():
                         self._sendCommand(self._command_queue.get())
                     else:
                         self._sendNextGcodeLine()
                 elif b"resend" in line.lower() or b"rs" in line: # Because a resend can be asked with "resend" and "rs"
                     try:
-                        self._gcode_position = int(line.replace(b"N:",b" ").replace(b"N",b" ").replace(b":",b" ").split()[-1])
+                        self._resendFrom(int(line.replace(b"N:",b" ").replace(b"N",b" ").replace(b":",b" ").split()[-1]))
                     except:
                         if b"rs" in line:
-                            self._gcode_position = int(line.split()[1])
+                            self._resendFrom(int(line.split()[1]))
 
             else: # Request the temperature on comm timeout (every 2 seconds) when we are not printing.)
                 if line == b"":
@@ -549,33 +738,89 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
                         self.sendCommand("M105")
         Logger.log("i", "Printer connection listen thread stopped for %s" % self._serial_port)
 
+    ##  Check whether more than one line can be in flight.
+    def _isWindowed(self):
+        return self._send_window.getMaxLines() > 1
+
+    ##  Send queued commands and lines of the print until the send window is full.
+    def _fillSendWindow(self):
+        while self._is_printing:
+            if self._recovery_line_count > 0 and self._send_window.getLineCount() > 0:
+                return # Send one line at a time until the printer recovered from a resend request.
+
+            if self._pending_command is None and not self._command_queue.empty():
+                self._pending_command = self._command_queue.get()
+
+            if self._pending_command is not None:
+                size = len(self._pending_command.encode()) + 2 # A newline is written before and after every command.
+                if not self._send_window.canSend(size):
+                    return
+                self._sendCommand(self._pending_command)
+                self._pending_command = None
+            else:
+                size = self._getNextGcodeLineSize()
+                if size is None or not self._send_window.canSend(size + 1):
+                    return
+                if not self._sendNextGcodeLine():
+                    return
+                size += 1
+            self._send_window.add(size)
+
+    ##  Continue the print from a line the printer requested again.
+    #
+    #   The printer discards all lines after a line it did not receive correctly, so in
+    #   windowed mode all lines in flight are sent again. Lines that were still in flight
+    #   cause more resend requests, and the receive buffer of the printer is flushed for
+    #   each of those. Until the printer acknowledged a window of lines, lines are sent one
+    #   at a time, so no more lines are lost to these flushes than with one line per "ok".
+    #
+    #   \param line_number The line number to continue from.
+    def _resendFrom(self, line_number):
+        if self._isWindowed():
+            # Every resend request is followed by an "ok" that does not acknowledge a line in the window.
+            self._resend_ok_count += 1
+            self._recovery_line_count = self._send_window.getMaxLines()
+            self._send_window.clear()
+        self._gcode_position = line_number
+
+    ##  Get the size of the next line of the print as it is sent, or None if there is no next line.
+    def _getNextGcodeLineSize(self):
+        prepared_gcode = self._prepared_gcode
+        if prepared_gcode is None or self._gcode_position >= len(prepared_gcode):
+            return None
+        try:
+            return len(prepared_gcode.getLine(self._gcode_position)[0])
+        except Exception as e:
+            Logger.log("e", "Unexpected error with printer connection: %s" % e)
+            self._setErrorState("Unexpected error: %s" %e)
+            return None
+
     ##  Send next Gcode in the gcode list
+    #   \return True if a line was sent.
     def _sendNextGcodeLine(self):
-        if self._gcode_position >= len(self._gcode):
+        prepared_gcode = self._prepared_gcode
+        if prepared_gcode is None or self._gcode_position >= len(prepared_gcode):
             return
         if self._gcode_position == 100:
             self._print_start_time_100 = time.time()
-        line = self._gcode[self._gcode_position]
 
-        if ";" in line:
-            line = line[:line.find(";")]
-        line = line.strip()
+        # The line is prepared ahead with its line number and checksum, and the changes to Z and the temperatures it makes.
         try:
-            if line == "M0" or line == "M1":
-                line = "M105"   #Don"t send the M0 or M1 to the machine, as M0 and M1 are handled as an LCD menu pause.
-            if ("G0" in line or "G1" in line) and "Z" in line:
-                z = float(re.search("Z([0-9\.]*)", line).group(1))
-                if self._current_z != z:
-                    self._current_z = z
+            data, z, temperature_line = prepared_gcode.getLine(self._gcode_position)
         except Exception as e:
             Logger.log("e", "Unexpected error with printer connection: %s" % e)
             self._setErrorState("Unexpected error: %s" %e)
-        checksum = functools.reduce(lambda x,y: x^y, map(ord, "N%d%s" % (self._gcode_position, line)))
+            return
+        if z is not None:
+            self._current_z = z
+        if temperature_line is not None:
+            self._updateTargetTemperatures(temperature_line)
 
-        self._sendCommand("N%d%s*%d" % (self._gcode_position, line, checksum))
+        self._writeSerial(data)
         self._gcode_position += 1 
         self.setProgress(( self._gcode_position / len(self._gcode)) * 100)
         self.progressChanged.emit()
+        return True
 
     ##  Set the progress of the print. 
     #   It will be normalized (based on max_progress) to range 0 - 100
@@ -588,7 +833,12 @@ class PrinterConnection(OutputDevice, QObject, SignalEmitter):
     def cancelPrint(self):
         self._gcode_position = 0
         self.setProgress(0)
-        self._gcode = []
+        self._gcode = GCodeLines([])
+        if self._prepared_gcode is not None:
+            self._prepared_gcode.close()
+            self._prepared_gcode = None
+        self._send_window.clear()
+        self._pending_command = None
 
         # Turn of temperatures
         self._sendCommand("M140 S0")
@@ -0,0 +1,63 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import collections
+
+##  Keeps track of the lines that were sent to the printer but not acknowledged yet.
+#
+#   The firmware acknowledges every line it processed with "ok", in the order in which
+#   the lines were sent. Sending more lines before the previous ones are acknowledged
+#   hides the round trip of the serial connection, as long as the lines in flight fit
+#   in the receive buffer of the firmware.
+class SendWindow:
+    ##  Create an empty window.
+    #
+    #   \param max_lines The maximum number of lines in flight.
+    #   \param max_bytes The maximum number of bytes in flight, which should not be more than the size of the
+    #                    receive buffer of the firmware.
+    def __init__(self, max_lines, max_bytes):
+        self._max_lines = max_lines
+        self._max_bytes = max_bytes
+        self._sizes = collections.deque()
+        self._byte_count = 0
+
+    def getMaxLines(self):
+        return self._max_lines
+
+    def getMaxBytes(self):
+        return self._max_bytes
+
+    ##  Get the number of lines in flight.
+    def getLineCount(self):
+        return len(self._sizes)
+
+    ##  Get the number of bytes in flight.
+    def getByteCount(self):
+        return self._byte_count
+
+    ##  Check whether a line can be sent without exceeding the limits of the window.
+    #
+    #   A line can always be sent if no lines are in flight, even if it is larger than the buffer.
+    #
+    #   \param size The size of the line in bytes.
+    def canSend(self, size):
+        if not self._sizes:
+            return True
+        return len(self._sizes) < self._max_lines and self._byte_count + size <= self._max_bytes
+
+    ##  Record that a line was sent.
+    #
+    #   \param size The size of the line in bytes.
+    def add(self, size):
+        self._sizes.append(size)
+        self._byte_count += size
+
+    ##  Record that the oldest line in flight was acknowledged.
+    def acknowledge(self):
+        if self._sizes:
+            self._byte_count -= self._sizes.popleft()
+
+    ##  Forget all lines in flight.
+    def clear(self):
+        self._sizes.clear()
+        self._byte_count = 0
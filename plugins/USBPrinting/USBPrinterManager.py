@@ -8,6 +8,7 @@ from UM.Scene.Iterator.DepthFirstIterator import DepthFirstIterator
 from UM.Scene.SceneNode import SceneNode
 from UM.Resources import Resources
 from UM.Logger import Logger
+from UM.Preferences import Preferences
 from UM.PluginRegistry import PluginRegistry
 from UM.OutputDevice.OutputDevicePlugin import OutputDevicePlugin
 from UM.Qt.ListModel import ListModel
@@ -44,6 +45,13 @@ class USBPrinterManager(QObject, SignalEmitter, OutputDevicePlugin, Extension):
         self._check_updates = True
         self._firmware_view = None
 
+        # Number of lines sent to a printer ahead of its acknowledgements. 1 sends one line per acknowledgement.
+        Preferences.getInstance().addPreference("usb_printing/send_window", 1)
+        # Size of the receive buffer of the firmware, which limits the number of bytes sent ahead.
+        Preferences.getInstance().addPreference("usb_printing/rx_buffer_size", 127)
+        # Baud rates at which printers connected, by hardware ID of the printer, to try first when connecting again.
+        Preferences.getInstance().addPreference("usb_printing/baud_rates", "")
+
         ## Add menu item to top menu of the application.
         self.setMenuName(i18n_catalog.i18nc("@title:menu","Firmware"))
         self.addMenuItem(i18n_catalog.i18nc("@item:inmenu", "Update Firmware"), self.updateAllFirmware)
@@ -27,6 +27,7 @@ Item
     property alias deleteAll: deleteAllAction;
     property alias reloadAll: reloadAllAction;
     property alias resetAllTranslation: resetAllTranslationAction;
+    property alias arrangeAll: arrangeAllAction;
     property alias resetAll: resetAllAction;
 
     property alias addMachine: addMachineAction;
@@ -196,6 +197,12 @@ Item
         text: catalog.i18nc("@action:inmenu","Reset All Object Positions");
     }
 
+    Action
+    {
+        id: arrangeAllAction;
+        text: catalog.i18nc("@action:inmenu","&Arrange All Objects");
+    }
+
     Action
     {
         id: resetAllAction;
@@ -126,6 +126,7 @@ UM.MainWindow
                 MenuItem { action: actions.deleteSelection; }
                 MenuItem { action: actions.deleteAll; }
                 MenuItem { action: actions.resetAllTranslation; }
+                MenuItem { action: actions.arrangeAll; }
                 MenuItem { action: actions.resetAll; }
                 MenuSeparator { }
                 MenuItem { action: actions.groupObjects;}
@@ -566,6 +567,7 @@ UM.MainWindow
 
         deleteAll.onTriggered: Printer.deleteAll()
         resetAllTranslation.onTriggered: Printer.resetAllTranslation()
+        arrangeAll.onTriggered: Printer.arrangeAll()
         resetAll.onTriggered: Printer.resetAll()
         reloadAll.onTriggered: Printer.reloadAll()
 
@@ -594,6 +596,7 @@ UM.MainWindow
         MenuItem { action: actions.deleteAll; }
         MenuItem { action: actions.reloadAll; }
         MenuItem { action: actions.resetAllTranslation; }
+        MenuItem { action: actions.arrangeAll; }
         MenuItem { action: actions.resetAll; }
         MenuItem { action: actions.groupObjects;}
         MenuItem { action: actions.mergeObjects;}
@@ -606,6 +609,7 @@ UM.MainWindow
         MenuItem { action: actions.deleteAll; }
         MenuItem { action: actions.reloadAll; }
         MenuItem { action: actions.resetAllTranslation; }
+        MenuItem { action: actions.arrangeAll; }
         MenuItem { action: actions.resetAll; }
         MenuItem { action: actions.groupObjects;}
         MenuItem { action: actions.mergeObjects;}
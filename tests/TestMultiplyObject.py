@@ -0,0 +1,148 @@
+# Copyright (c) 2015 Ultimaker B.V.
+# Cura is released under the terms of the AGPLv3 or higher.
+
+import unittest
+
+import numpy
+
+from UM.Application import Application
+from UM.Math.AxisAlignedBox import AxisAlignedBox
+from UM.Math.Polygon import Polygon
+from UM.Math.Vector import Vector
+from UM.Mesh.MeshData import MeshData
+from UM.Scene.GroupDecorator import GroupDecorator
+from UM.Scene.Scene import Scene
+from UM.Scene.SceneNode import SceneNode
+from UM.Signal import Signal
+
+from cura.ConvexHullDecorator import ConvexHullDecorator
+from cura.CuraApplication import CuraApplication
+
+##  Machine manager without a profile, for the convex hull decorators.
+class MachineManager:
+    activeProfileChanged = Signal()
+
+    def getActiveProfile(self):
+        return None
+
+##  Operation stack that performs the operations that are pushed onto it.
+class OperationStack:
+    def push(self, operation):
+        operation.redo()
+
+##  Build volume of 200 by 200 millimeters without disallowed areas.
+class BuildVolume:
+    def getBoundingBox(self):
+        return AxisAlignedBox(minimum = Vector(-100, 0, -100), maximum = Vector(100, 200, 100))
+
+    def getDisallowedAreas(self):
+        return []
+
+##  The parts of the application that multiplyObject uses, without a user interface.
+class MultiplyApplication:
+    multiplyObject = CuraApplication.multiplyObject
+    _getArrangeableNodes = CuraApplication._getArrangeableNodes
+
+    def __init__(self):
+        self._scene = Scene()
+        self._volume = BuildVolume()
+        self._machine_manager = MachineManager()
+        self._operation_stack = OperationStack()
+
+    def getController(self):
+        return self
+
+    def getScene(self):
+        return self._scene
+
+    def getMachineManager(self):
+        return self._machine_manager
+
+    def getOperationStack(self):
+        return self._operation_stack
+
+class TestMultiplyObject(unittest.TestCase):
+    def setUp(self):
+        self._previous_instance = Application._instance
+        self._application = MultiplyApplication()
+        Application._instance = self._application
+
+    def tearDown(self):
+        Application._instance = self._previous_instance
+
+    def _createNode(self, parent, x):
+        mesh_data = MeshData()
+        mesh_data.addVertices(numpy.array([[-5, 0, -5], [5, 0, -5], [0, 10, 5]], dtype = numpy.float32))
+
+        node = SceneNode(parent)
+        node.setMeshData(mesh_data)
+        node.setPosition(Vector(x, 0, 0))
+        node.addDecorator(ConvexHullDecorator())
+        node.callDecoration("setConvexHull", Polygon(numpy.array([[x - 5, -5], [x - 5, 5], [x + 5, 5], [x + 5, -5]], dtype = numpy.float32)))
+        node.callDecoration("setConvexHullTransformation", node.getWorldTransformation().getData().copy())
+        return node
+
+    def _getCopies(self, original):
+        return [node for node in self._application.getScene().getRoot().getChildren() if node is not original and type(node) is SceneNode]
+
+    def test_copiesShareMeshData(self):
+        node = self._createNode(self._application.getScene().getRoot(), 0)
+
+        self._application.multiplyObject(id(node), 3)
+
+        copies = self._getCopies(node)
+        self.assertEqual(len(copies), 3)
+        for copy in copies:
+            self.assertIs(copy.getMeshData(), node.getMeshData())
+
+    def test_copiesGetOwnHulls(self):
+        node = self._createNode(self._application.getScene().getRoot(), 0)
+        hull = node.callDecoration("getConvexHull")
+
+        self._application.multiplyObject(id(node), 3)
+
+        # The original keeps its hull, the copies start without one and without the state it was calculated with.
+        self.assertIs(node.callDecoration("getConvexHull"), hull)
+        decorators = set()
+        for copy in self._getCopies(node):
+            decorator = copy.getDecorator(ConvexHullDecorator)
+            self.assertIsNotNone(decorator)
+            self.assertIs(decorator.getNode(), copy)
+            self.assertIsNone(decorator.getConvexHull())
+            self.assertIsNone(decorator.getConvexHullHead())
+            self.assertIsNone(decorator.getConvexHullBoundary())
+            self.assertIsNone(decorator.getConvexHullNode())
+            self.assertIsNone(decorator.getConvexHullJob())
+            self.assertIsNone(decorator.getConvexHullTransformation())
+            decorators.add(decorator)
+        self.assertEqual(len(decorators), 3)
+        self.assertNotIn(node.getDecorator(ConvexHullDecorator), decorators)
+
+    def test_copiesArePlacedApart(self):
+        node = self._createNode(self._application.getScene().getRoot(), 0)
+
+        self._application.multiplyObject(id(node), 3)
+
+        positions = set((copy.getPosition().x, copy.getPosition().z) for copy in self._getCopies(node))
+        positions.add((node.getPosition().x, node.getPosition().z))
+        self.assertEqual(len(positions), 4)
+
+    def test_copiesOfGroupShareMeshData(self):
+        group = SceneNode(self._application.getScene().getRoot())
+        group.addDecorator(GroupDecorator())
+        children = [self._createNode(group, -10), self._createNode(group, 10)]
+
+        self._application.multiplyObject(id(children[0]), 2)
+
+        copies = self._getCopies(group)
+        self.assertEqual(len(copies), 2)
+        for copy in copies:
+            self.assertTrue(copy.callDecoration("isGroup"))
+            copy_children = copy.getChildren()
+            self.assertEqual(len(copy_children), 2)
+            for child, copy_child in zip(children, copy_children):
+                self.assertIs(copy_child.getMeshData(), child.getMeshData())
+                self.assertIsNone(copy_child.callDecoration("getConvexHull"))
+
+if __name__ == "__main__":
+    unittest.main()